@@ -1,8 +1,16 @@
 import abc
+import random
+from array import array
+from typing import Callable
+from typing import Iterator
 
+from querypy.datasources.statistics import TableStatistics
 from querypy.types_ import RecordBatch
 from querypy.types_ import Schema
 
+# The default number of rows of the batches that data sources produce.
+DEFAULT_BATCH_SIZE = 65_536
+
 
 class DataSource(abc.ABC):
     @abc.abstractmethod
@@ -10,5 +18,98 @@ class DataSource(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def scan(self, projection: list[str]) -> list[RecordBatch]:
+    def scan(
+        self, projection: list[str], filters: list[tuple] | None = None
+    ) -> Iterator[RecordBatch]:
+        """Reads the `projection` columns of the source (all of them if empty)
+        as a stream of record batches.
+
+        `filters` are `(column, op, value)` conditions, see `querypy.datasources.zonemap`,
+        sources can use them to skip chunks of data that cannot match, the scanned rows
+        still need to be filtered."""
         pass
+
+    def statistics(self) -> TableStatistics | None:
+        """The statistics of the source, e.g. its number of rows and the distinct
+        values of its columns, `None` if they are unknown.
+
+        Sources should collect them cheaply, without reading all their data, and
+        cache them, see `querypy.datasources.statistics`."""
+        return None
+
+    def scan_filtered(
+        self,
+        projection: list[str],
+        predicate_columns: list[str],
+        predicate: Callable[[RecordBatch], array],
+        filters: list[tuple] | None = None,
+    ) -> Iterator[RecordBatch]:
+        """Reads the `projection` columns of the rows that pass a `predicate`, see
+        `scan`.
+
+        By default every projected column is read, and the rows that do not pass
+        are left out of the selection of the batches. Sources override it to read
+        the `predicate_columns` first, and the other columns only for the rows that
+        pass, e.g. to not parse their cells.
+
+        Parameters
+        ----------
+        projection : list[str]
+            The columns to read.
+        predicate_columns : list[str]
+            The columns read by the predicate, they are projected.
+        predicate : Callable[[RecordBatch], array]
+            Takes a batch of the `predicate_columns`, in the order of the schema of
+            the source, and returns the indices of its rows that pass, see
+            `RecordBatch.selection`.
+        filters : list[tuple] | None
+            The `(column, op, value)` conditions, see `scan`.
+        """
+        for batch in self.scan(projection, filters):
+            indices = [
+                i for i, field in enumerate(batch.schema.fields)
+                if field.name in predicate_columns
+            ]
+            selection = predicate(
+                RecordBatch(
+                    batch.schema.select(predicate_columns),
+                    [batch.get_field(i) for i in indices],
+                    batch.selection,
+                )
+            )
+            if len(selection):
+                yield RecordBatch(batch.schema, batch.fields, selection)
+
+    def scan_sample(
+        self,
+        projection: list[str],
+        fraction: float,
+        seed: int | None = None,
+        filters: list[tuple] | None = None,
+    ) -> Iterator[RecordBatch]:
+        """Reads a random sample of about `fraction` of the rows of the source, see
+        `scan`.
+
+        By default every row is read and kept with a probability of `fraction`,
+        sources override it to read only some chunks of their data, e.g. blocks of
+        a file, skipping the others without parsing them.
+
+        Parameters
+        ----------
+        projection : list[str]
+            The columns to read.
+        fraction : float
+            The probability of a row to be sampled, between 0 and 1.
+        seed : int | None
+            The seed of the random sampling, the same seed samples the same rows.
+        filters : list[tuple] | None
+            The `(column, op, value)` conditions, see `scan`.
+        """
+        rng = random.Random(seed)
+        for batch in self.scan(projection, filters):
+            batch = batch.compact()
+            flags = bytes(rng.random() < fraction for _ in range(batch.row_count))
+            if any(flags):
+                yield RecordBatch(
+                    batch.schema, [field.filter(flags) for field in batch.fields]
+                )
@@ -0,0 +1,178 @@
+"""
+A per-process catalog of what is known about the files read by data sources: their
+schema, number of rows and column statistics.
+
+Entries are keyed by the path of the file, and are only valid as long as the size
+and modification time of the file do not change, so planning many queries over the
+same files only costs a `stat` per lookup. Optionally, they are persisted in a
+sidecar file next to the file, `<path>.querypy`, to be reused by other processes.
+"""
+
+import json
+import os
+
+from querypy.datasources.statistics import TableStatistics
+from querypy.types_ import ArrowTypes
+from querypy.types_ import Field
+from querypy.types_ import Schema
+
+
+class CatalogEntry:
+    """What a data source knows about a file, unknown values are `None`.
+
+    Attributes
+    ----------
+    schema : Schema | None
+        The schema of the file.
+    row_count : int | None
+        The number of rows of the file.
+    statistics : dict[str, list] | None
+        The `[min, max, null_count]` of every column of the file.
+    zone_maps : dict | None
+        The statistics of every chunk of the file, see `querypy.datasources.zonemap`.
+    table_statistics : TableStatistics | None
+        The statistics of the file for the planner, see `DataSource.statistics`.
+    """
+
+    def __init__(
+        self,
+        schema: Schema | None = None,
+        row_count: int | None = None,
+        statistics: dict[str, list] | None = None,
+        zone_maps: dict | None = None,
+        table_statistics: TableStatistics | None = None,
+    ):
+        self.schema = schema
+        self.row_count = row_count
+        self.statistics = statistics
+        self.zone_maps = zone_maps
+        self.table_statistics = table_statistics
+
+    def to_json(self) -> dict:
+        return {
+            "schema": None if self.schema is None else schema_to_json(self.schema),
+            "row_count": self.row_count,
+            "statistics": self.statistics,
+            "zone_maps": self.zone_maps,
+            "table_statistics": (
+                None
+                if self.table_statistics is None
+                else self.table_statistics.to_json()
+            ),
+        }
+
+    @classmethod
+    def from_json(cls, value: dict) -> "CatalogEntry":
+        schema = value["schema"]
+        table_statistics = value.get("table_statistics")
+        return cls(
+            None if schema is None else schema_from_json(schema),
+            value["row_count"],
+            value["statistics"],
+            value["zone_maps"],
+            None if table_statistics is None else TableStatistics.from_json(table_statistics),
+        )
+
+
+class Catalog:
+    """Caches the `CatalogEntry` of files, by path and by data source.
+
+    A file can have several entries, one per `tag`, as data sources reading the same
+    file with different options can see it differently, e.g. a different schema.
+
+    Catalogs are not shared between processes, a pickled catalog is empty.
+
+    Attributes
+    ----------
+    sidecar : bool
+        Whether entries are persisted in a sidecar file next to the files,
+        `<path>.querypy`, and loaded from it.
+    """
+
+    def __init__(self, sidecar: bool = False):
+        self.sidecar = sidecar
+        # path -> ((size, mtime), {tag: CatalogEntry})
+        self._files = {}
+
+    def entry(self, path: str, tag: str) -> CatalogEntry:
+        """The entry of `path` for `tag`, an empty one is created if there is none
+        or if the file changed since it was cached."""
+        path = os.path.abspath(path)
+        key = _file_key(path)
+        cached = self._files.get(path)
+        if cached is None or cached[0] != key:
+            cached = (key, self._load(path, key))
+            self._files[path] = cached
+        return cached[1].setdefault(tag, CatalogEntry())
+
+    def save(self, path: str):
+        """Persists the entries of `path` in its sidecar file, if enabled. Files that
+        can't be written, e.g. in read-only directories, are only cached in memory."""
+        path = os.path.abspath(path)
+        if not self.sidecar or path not in self._files:
+            return
+        key, entries = self._files[path]
+        try:
+            with open(sidecar_path(path), "w") as f:
+                json.dump(
+                    {
+                        "key": key,
+                        "entries": {tag: e.to_json() for tag, e in entries.items()},
+                    },
+                    f,
+                )
+        except OSError:
+            pass
+
+    def invalidate(self, path: str | None = None):
+        """Forgets the entries of `path`, or of every file, sidecar files
+        included."""
+        paths = [os.path.abspath(path)] if path is not None else list(self._files)
+        for path in paths:
+            self._files.pop(path, None)
+            if self.sidecar:
+                try:
+                    os.remove(sidecar_path(path))
+                except OSError:
+                    pass
+
+    def _load(self, path: str, key: list) -> dict[str, CatalogEntry]:
+        if not self.sidecar:
+            return {}
+        try:
+            with open(sidecar_path(path)) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cached["key"] != key:
+            return {}
+        return {
+            tag: CatalogEntry.from_json(entry)
+            for tag, entry in cached["entries"].items()
+        }
+
+    def __reduce__(self):
+        return Catalog, (self.sidecar,)
+
+
+# The catalog of the process, used by default by data sources, it does not write
+# sidecar files.
+CATALOG = Catalog()
+
+
+def sidecar_path(path: str) -> str:
+    return path + ".querypy"
+
+
+def schema_to_json(schema: Schema) -> list[list[str]]:
+    return [[field.name, field.type.name] for field in schema.fields]
+
+
+def schema_from_json(value: list[list[str]]) -> Schema:
+    return Schema([Field(name, getattr(ArrowTypes, type)) for name, type in value])
+
+
+def _file_key(path: str) -> list[int]:
+    # a list, to compare equal to its json.
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
@@ -0,0 +1,391 @@
+"""
+A binary columnar file format for querypy.
+
+Data is split into row groups, every row group stores each column in its own
+contiguous chunk, typed buffers are written as is, so reading them back is just
+mapping the bytes of the file, no parsing:
+
+    +-------------------------------------------+
+    | MAGIC                                     |
+    | row group 0: column 0 chunk, column 1 ... |
+    | row group 1: column 0 chunk, column 1 ... |
+    | ...                                       |
+    | footer (json)                             |
+    | footer length (8 bytes) | MAGIC           |
+    +-------------------------------------------+
+
+The footer holds the schema, the number of rows of every row group, the
+offsets of the buffers of every column chunk and its statistics, see
+`querypy.datasources.zonemap`, and the estimated number of distinct values of
+every column. Every buffer starts at an offset multiple of 8.
+
+A column chunk is encoded as:
+    - 'plain': a typed buffer, e.g. of 64-bit integers.
+    - 'string': utf-8 encoded values concatenated, plus a buffer of offsets.
+    - 'dictionary': a typed buffer of codes, plus its dictionary as a 'string' chunk.
+and an optional validity bitmap if the column has nulls.
+"""
+
+import json
+import mmap
+import os
+import random
+import struct
+from array import array
+from typing import Iterable
+from typing import Iterator
+
+from querypy.datasources import DEFAULT_BATCH_SIZE
+from querypy.datasources import DataSource
+from querypy.datasources import zonemap
+from querypy.datasources.catalog import CATALOG
+from querypy.datasources.catalog import Catalog
+from querypy.datasources.catalog import schema_from_json
+from querypy.datasources.statistics import ColumnStatistics
+from querypy.datasources.statistics import DistinctCounter
+from querypy.datasources.statistics import TableStatistics
+from querypy.types_ import ArrowTypes
+from querypy.types_ import ColumnVector
+from querypy.types_ import ColumnVectorABC
+from querypy.types_ import DictionaryVector
+from querypy.types_ import Field
+from querypy.types_ import RecordBatch
+from querypy.types_ import Schema
+from querypy.types_ import bitmap
+from querypy.types_ import buffer_typecode
+
+MAGIC = b"QPYCOL01"
+# The default number of rows of a row group.
+DEFAULT_ROW_GROUP_SIZE = 1_000_000
+
+_FOOTER_LENGTH = struct.Struct("<Q")
+
+
+class ColumnarFileWriter:
+    """Writes record batches into a querypy columnar file.
+
+    Every batch is written as one or more row groups of at most `row_group_size`
+    rows, call `close` (or use it as a context manager) to write the footer. Used as
+    a context manager, the file is removed if writing fails.
+    """
+
+    def __init__(self, path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        self.path = path
+        self.row_group_size = row_group_size
+        self.schema = None
+        self.row_groups = []
+        self.distinct_counters = []
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+
+    def write_batch(self, batch: RecordBatch):
+        batch = batch.compact()
+        if self.schema is None:
+            self.schema = batch.schema
+            self.distinct_counters = [DistinctCounter() for _ in batch.fields]
+
+        for counter, vector in zip(self.distinct_counters, batch.fields):
+            if isinstance(vector, DictionaryVector):
+                # only the dictionary is hashed, it may overcount values that no
+                # row refers to, e.g. in a slice of a bigger vector.
+                counter.update(vector.dictionary.raw_values())
+            else:
+                counter.update(vector.to_pylist())
+
+        for offset in range(0, batch.row_count, self.row_group_size):
+            row_group = batch.slice(offset, self.row_group_size)
+            self.row_groups.append(
+                {
+                    "num_rows": row_group.row_count,
+                    "columns": [self.write_column(field) for field in row_group.fields],
+                }
+            )
+
+    def write_column(self, vector: ColumnVectorABC) -> dict:
+        """Writes the buffers of a column chunk, returns its metadata."""
+        chunk = {"statistics": zonemap.column_statistics(vector), "validity": None}
+        if vector.null_count:
+            chunk["validity"] = self.write_buffer(
+                bytes(vector.validity[: bitmap.num_bytes(vector.size)])
+            )
+
+        if isinstance(vector, DictionaryVector):
+            typecode = buffer_typecode(vector.indices)
+            chunk["encoding"] = "dictionary"
+            chunk["typecode"] = typecode
+            chunk["indices"] = self.write_buffer(array(typecode, vector.indices))
+            chunk["dictionary"] = self.write_strings(vector.dictionary.to_pylist())
+            return chunk
+
+        typecode = buffer_typecode(vector.value)
+        if typecode is not None:
+            chunk["encoding"] = "plain"
+            chunk["typecode"] = typecode
+            chunk["data"] = self.write_buffer(vector.value)
+            return chunk
+
+        values = list(vector.raw_values())
+        if vector.type is ArrowTypes.StringType:
+            chunk["encoding"] = "string"
+            chunk.update(self.write_strings(values))
+            return chunk
+
+        # Numbers that did not fit the buffer of their type, e.g. big integers
+        # of an Int32Type column, or literals.
+        values = [0 if v is None else v for v in values]
+        typecode = "d" if any(isinstance(v, float) for v in values) else "q"
+        chunk["encoding"] = "plain"
+        chunk["typecode"] = typecode
+        chunk["data"] = self.write_buffer(array(typecode, values))
+        return chunk
+
+    def write_strings(self, values: list[str | None]) -> dict:
+        encoded = [b"" if v is None else v.encode() for v in values]
+        offsets = array("q", [0])
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        return {
+            "offsets": self.write_buffer(offsets),
+            "data": self.write_buffer(b"".join(encoded)),
+        }
+
+    def write_buffer(self, buffer) -> list[int]:
+        """Writes a buffer at an 8 bytes aligned offset, returns its [offset, length]."""
+        padding = -self.file.tell() % 8
+        self.file.write(b"\0" * padding)
+        offset = self.file.tell()
+        data = memoryview(buffer).cast("B")
+        self.file.write(data)
+        return [offset, len(data)]
+
+    def close(self):
+        if self.file.closed:
+            return
+        schema = self.schema or Schema([])
+        footer = json.dumps(
+            {
+                "schema": [
+                    {"name": field.name, "type": field.type.name}
+                    for field in schema.fields
+                ],
+                "row_groups": self.row_groups,
+                "distinct_counts": [c.estimate() for c in self.distinct_counters],
+            }
+        ).encode()
+        self.file.write(footer)
+        self.file.write(_FOOTER_LENGTH.pack(len(footer)))
+        self.file.write(MAGIC)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # a file without a footer cannot be read, it's removed.
+        self.file.close()
+        os.remove(self.path)
+
+
+def write_columnar(
+    path: str,
+    source: DataSource | Iterable[RecordBatch],
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+):
+    """Writes a data source or a query result to a querypy columnar file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file to write.
+    source : DataSource | Iterable[RecordBatch]
+        The data to write, every column of a data source is written. A query result
+        are the batches of an executed physical plan, e.g. `plan.execute()`.
+    row_group_size : int
+        The maximum number of rows of a row group.
+    """
+    if isinstance(source, DataSource):
+        source = source.scan([])
+    with ColumnarFileWriter(path, row_group_size) as writer:
+        for batch in source:
+            writer.write_batch(batch)
+
+
+class ColumnarFileDataSource(DataSource):
+    """A datasource to read querypy columnar files, see `write_columnar`.
+
+    The file is memory-mapped, typed buffers of the projected columns are handed out
+    as `memoryview`s of the mapped file: reading them does not copy nor parse data,
+    the operating system pages in the bytes that are actually touched.
+
+    Attributes
+    ----------
+    path : str
+        The path of the file.
+    batch_size : int
+        The maximum number of rows of the scanned record batches, bigger row groups
+        are sliced.
+    catalog : Catalog
+        Caches the schema, number of rows and statistics of the file while it does
+        not change, see `querypy.datasources.catalog`. The footer already holds them,
+        so they are never persisted in a sidecar.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        catalog: Catalog = CATALOG,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.catalog = catalog
+
+    def footer(self) -> dict:
+        """The metadata of the file."""
+        with open(self.path, "rb") as f:
+            f.seek(-(_FOOTER_LENGTH.size + len(MAGIC)), 2)
+            (length,) = _FOOTER_LENGTH.unpack(f.read(_FOOTER_LENGTH.size))
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path!r} is not a querypy columnar file")
+            f.seek(-(length + _FOOTER_LENGTH.size + len(MAGIC)), 2)
+            return json.loads(f.read(length))
+
+    def get_schema(self) -> Schema:
+        entry = self.catalog.entry(self.path, "columnar")
+        if entry.schema is None:
+            footer = self.footer()
+            entry.schema = schema_from_json(
+                [[field["name"], field["type"]] for field in footer["schema"]]
+            )
+            entry.row_count = sum(rg["num_rows"] for rg in footer["row_groups"])
+            entry.statistics = zonemap.merge_statistics(
+                [_row_group_statistics(entry.schema, rg) for rg in footer["row_groups"]]
+            )
+        return entry.schema
+
+    def statistics(self) -> TableStatistics:
+        """The statistics of the file, computed when it was written: exact number of
+        rows, min, max and null counts, and estimated distinct counts."""
+        entry = self.catalog.entry(self.path, "columnar")
+        if entry.table_statistics is None:
+            schema = self.get_schema()
+            row_count = entry.row_count
+            distinct_counts = self.footer().get(
+                "distinct_counts", [None] * len(schema.fields)
+            )
+            columns = {}
+            for field, distinct_count in zip(schema.fields, distinct_counts):
+                low, high, null_count = entry.statistics[field.name]
+                columns[field.name] = ColumnStatistics(
+                    low,
+                    high,
+                    null_count / row_count if row_count else 0.0,
+                    distinct_count,
+                )
+            entry.table_statistics = TableStatistics(
+                row_count, os.path.getsize(self.path), columns
+            )
+        return entry.table_statistics
+
+    def scan(
+        self, projection: list[str], filters: list[tuple] | None = None
+    ) -> Iterator[RecordBatch]:
+        """Reads the `projection` columns row group by row group, row groups whose
+        statistics do not match the `filters` are skipped without being read."""
+        for batch in self.read_row_groups(projection, filters):
+            for offset in range(0, batch.row_count, self.batch_size):
+                yield batch.slice(offset, self.batch_size)
+
+    def scan_sample(
+        self,
+        projection: list[str],
+        fraction: float,
+        seed: int | None = None,
+        filters: list[tuple] | None = None,
+    ) -> Iterator[RecordBatch]:
+        """Reads a random sample of the batches of the file, every batch of
+        `batch_size` rows is read with a probability of `fraction`, the pages of the
+        others are never touched."""
+        rng = random.Random(seed)
+        for batch in self.read_row_groups(projection, filters):
+            for offset in range(0, batch.row_count, self.batch_size):
+                if rng.random() < fraction:
+                    yield batch.slice(offset, self.batch_size)
+
+    def read_row_groups(
+        self, projection: list[str], filters: list[tuple] | None = None
+    ) -> Iterator[RecordBatch]:
+        """The row groups that may match the `filters`, as batches of views over the
+        mapped file."""
+        schema = self.get_schema()
+        indices = [
+            i for i, field in enumerate(schema.fields)
+            if not projection or field.name in projection
+        ]
+        projected = Schema([schema.fields[i] for i in indices])
+
+        with open(self.path, "rb") as f:
+            # The map outlives the file, and is kept alive by the views over it.
+            buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+        for row_group in self.footer()["row_groups"]:
+            statistics = _row_group_statistics(schema, row_group)
+            if filters and not zonemap.may_match(statistics, filters):
+                continue
+            num_rows = row_group["num_rows"]
+            columns = [
+                _read_column(buffer, schema.fields[i], row_group["columns"][i], num_rows)
+                for i in indices
+            ]
+            yield RecordBatch(projected, columns)
+
+
+def _row_group_statistics(schema: Schema, row_group: dict) -> dict[str, list]:
+    return {
+        field.name: chunk["statistics"]
+        for field, chunk in zip(schema.fields, row_group["columns"])
+    }
+
+
+def _read_column(
+    buffer: memoryview, field: Field, chunk: dict, num_rows: int
+) -> ColumnVectorABC:
+    validity = None
+    if chunk["validity"] is not None:
+        validity = _view(buffer, chunk["validity"])
+
+    match chunk["encoding"]:
+        case "plain":
+            values = _view(buffer, chunk["data"]).cast(chunk["typecode"])
+            return ColumnVector(field.type, values, num_rows, validity)
+        case "dictionary":
+            indices = _view(buffer, chunk["indices"]).cast(chunk["typecode"])
+            values = _read_strings(buffer, chunk["dictionary"])
+            dictionary = ColumnVector(field.type, values, len(values))
+            return DictionaryVector(field.type, indices, dictionary, validity)
+        case "string":
+            values = _read_strings(buffer, chunk)
+            if validity is not None:
+                for i, valid in enumerate(bitmap.to_flags(validity, num_rows)):
+                    if not valid:
+                        values[i] = None
+            return ColumnVector(field.type, values, num_rows, validity)
+    raise ValueError(f"Unknown encoding {chunk['encoding']!r}")
+
+
+def _read_strings(buffer: memoryview, chunk: dict) -> list[str]:
+    offsets = _view(buffer, chunk["offsets"]).cast("q")
+    data = bytes(_view(buffer, chunk["data"]))
+    text = data.decode()
+    if len(text) != len(data):
+        # Not ascii, byte offsets are not character offsets.
+        return [data[a:b].decode() for a, b in zip(offsets, offsets[1:])]
+    return [text[a:b] for a, b in zip(offsets, offsets[1:])]
+
+
+def _view(buffer: memoryview, location: list[int]) -> memoryview:
+    offset, length = location
+    return buffer[offset : offset + length]
@@ -1,122 +1,621 @@
 """_summary_."""
 
 import csv
-import functools
+import io
+import itertools
+import operator
+import os
+import random
+import re
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
 
+from querypy.datasources import DEFAULT_BATCH_SIZE
 from querypy.datasources import DataSource
+from querypy.datasources import zonemap
+from querypy.datasources.catalog import CATALOG
+from querypy.datasources.catalog import Catalog
+from querypy.datasources.catalog import CatalogEntry
+from querypy.datasources.catalog import schema_to_json
+from querypy.datasources.statistics import TableStatistics
+from querypy.datasources.statistics import sample_statistics
+from querypy.datasources.statistics import with_file_statistics
+from querypy.exceptions import ParseError
+from querypy.datasources.io import DEFAULT_RANGE_SIZE
+from querypy.datasources.io import detect_compression
+from querypy.datasources.io import open_input
+from querypy.datasources.io import open_text
+from querypy.datasources.io import read_byte_range
+from querypy.datasources.io import split_byte_ranges
+from querypy.types_ import ArrowType
 from querypy.types_ import ArrowTypes
+from querypy.types_ import ColumnVector
 from querypy.types_ import Field
 from querypy.types_ import RecordBatch
 from querypy.types_ import Schema
+from querypy.types_ import dictionary_encode
+
+
+# The size in bytes of the blocks of a file that are sampled, see `scan_sample`.
+SAMPLE_BLOCK_SIZE = 64 * 1024
 
 
 class CSVDataSource(DataSource):
     """A datasource to read csv files.
 
+    Files compressed with gzip, bz2 or xz are detected from their first bytes and
+    decompressed while they are scanned. They can't be split into byte ranges, so
+    they are always scanned sequentially, the decompression runs in a background
+    thread with `read_ahead`, and they have no zone maps.
+
     Attributes
     ----------
     path : str
         The path of the csv file.
+    batch_size : int
+        The maximum number of rows of the scanned record batches.
+    dictionary_threshold : int
+        String columns with at most this many distinct values (and no more than
+        half the rows of a batch) are dictionary-encoded.
+    schema : Schema
+        The schema of the file, if not given it's inferred from a sample of rows.
+    sample_size : int
+        The number of rows used to infer the schema.
+    workers : int
+        The number of processes that scan the file in parallel, the file is
+        scanned sequentially if it's not bigger than one.
+    range_size : int
+        The size in bytes of the ranges that are scanned in parallel.
+    ordered : bool
+        Whether a parallel scan yields the batches in file order.
+    read_ahead : bool | None
+        Whether a compressed file is decompressed in a background thread, ahead of
+        the parsing, see `open_input`. By default it is when `workers` is bigger
+        than one, compressed files are never scanned by many processes.
+    catalog : Catalog
+        Caches the schema, number of rows and statistics of the file while it does
+        not change, by default the catalog of the process, see
+        `querypy.datasources.catalog`.
 
     Methods
     -------
     get_schema()
-        The schema of the csv, it's cached so accessing it many times will not
-        trigger unnecessary I/O, to clear the cached schema run `reset_schema_cache`
-    scan(projection: list[str])
-        Reads the provided filepath, it only reads the provided columns, if not
-        provided it'll read all.
+        The schema of the csv, it's cached in the catalog so accessing it many times
+        will not trigger unnecessary I/O, to clear the cached schema run
+        `reset_schema_cache`
+    scan(projection: list[str], filters: list[tuple])
+        Reads the provided filepath in batches of `batch_size` rows, it only reads
+        the provided columns, if not provided it'll read all. Batches that cannot
+        match the filters are skipped once the zone maps of the file are built.
     """
 
-    def __init__(self, path: str):
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dictionary_threshold: int = 1024,
+        schema: Schema | None = None,
+        sample_size: int = 1000,
+        workers: int = 1,
+        range_size: int = DEFAULT_RANGE_SIZE,
+        ordered: bool = True,
+        catalog: Catalog = CATALOG,
+        read_ahead: bool | None = None,
+    ):
         self.path = path
-
-    def parse_value(self, value):
-        if value.isdigit():
-            return int(value)
-
-        if "." in value:
-            try:
-                return float(value)
-            except ValueError:
-                pass
-
-        return value
+        self.batch_size = batch_size
+        self.dictionary_threshold = dictionary_threshold
+        self.schema = schema
+        self.sample_size = sample_size
+        self.workers = workers
+        self.range_size = range_size
+        self.ordered = ordered
+        self.catalog = catalog
+        self.read_ahead = workers > 1 if read_ahead is None else read_ahead
 
     def reset_schema_cache(self):
         """
-        Resets the cached schema.
+        Resets the cached schema, and everything else the catalog knows about the file.
         """
-        raise NotImplemented()
+        self.catalog.invalidate(self.path)
+
+    def catalog_entry(self) -> CatalogEntry:
+        """The catalog entry of the file, sources that infer the schema from a
+        different number of rows do not share it."""
+        return self.catalog.entry(self.path, f"csv:{self.sample_size}")
 
-    @functools.lru_cache
     def get_schema(self) -> Schema:
-        """Gets the schema of the file. Only the first row is used to [detect] the datatypes.
+        """Gets the schema of the file. If it was not given, the datatypes are [detected]
+        from the first `sample_size` rows, widening them when needed, e.g. a column
+        with integers and floats is a float column.
 
         Returns
         -------
         Schema
             The schema of the csv file.
         """
-        with open(self.path) as f:
-            reader = csv.reader(f)
-            columns = next(reader)
-            first_row = next(reader)
-        fields = []
+        if self.schema is not None:
+            return self.schema
 
-        for name, value in zip(columns, first_row):
-            fields.append(
-                Field(name, ArrowTypes.from_pyvalue(self.parse_value(value)))
-            )
-        return Schema(fields)
+        entry = self.catalog_entry()
+        if entry.schema is None:
+            with open_text(self.path) as f:
+                reader = csv.reader(f)
+                columns = next(reader)
+                sample = list(itertools.islice(reader, self.sample_size))
+            entry.schema = infer_schema(columns, sample)
+            self.catalog.save(self.path)
+        return entry.schema
 
-    def scan(self, projection: list[str]) -> list[RecordBatch]:
+    def statistics(self) -> TableStatistics:
+        """The statistics of the file, estimated from its first `sample_size` rows and
+        cached in the catalog. The number of rows is extrapolated from the bytes of the
+        sampled rows, it's unknown for compressed files. Estimates are replaced by the
+        exact values that scans record in the catalog, see `scan_building_zone_maps`."""
+        entry = self.catalog_entry()
+        if entry.table_statistics is None:
+            entry.table_statistics = self.sample_statistics()
+            self.catalog.save(self.path)
+        return with_file_statistics(
+            entry.table_statistics, entry.row_count, entry.statistics
+        )
+
+    def sample_statistics(self) -> TableStatistics:
+        """The statistics of the first `sample_size` rows of the file."""
+        schema = self.get_schema()
+        size = os.path.getsize(self.path)
+        with open_input(self.path) as f:
+            header = f.readline()
+            lines = list(itertools.islice(f, self.sample_size))
+            exhausted = not f.read(1)
+        rows = list(csv.reader(line.decode() for line in lines))
+        batch = self.parse_rows(rows, schema, list(range(len(schema.fields))))
+
+        sampled_bytes = sum(map(len, lines))
+        if exhausted:
+            row_count = len(rows)
+        elif detect_compression(self.path) is None:
+            row_count = round(len(rows) * (size - len(header)) / sampled_bytes)
+        else:
+            row_count = None
+        return sample_statistics(batch, row_count, size)
+
+    def scan(
+        self, projection: list[str], filters: list[tuple] | None = None
+    ) -> Iterator[RecordBatch]:
         """Scans the rows sequentially, creates a lists of values e.g. [[1,2,3], ['a','b','c']]
-        and returns a `RecordBatch`.
+        and yields a `RecordBatch` every `batch_size` rows.
 
+        Only one batch is held in memory at a time, so files bigger than memory can
+        be scanned, and the first batch reaches downstream operators as soon as
+        it's read. If `workers` is bigger than one, the file is scanned in parallel,
+        see `scan_parallel`.
+
+        With `filters`, the first scan builds the zone maps of the file, the
+        statistics of every batch and its byte range, see `zone_maps`. Later scans
+        only read the byte ranges of the batches that may match.
 
         Parameters
         ----------
         projection : list[str]
             The columns to read.
+        filters : list[tuple] | None
+            The `(column, op, value)` conditions used to skip batches.
 
-        Returns
-        -------
-        list[RecordBatch]
-            The read record batch. It does not implement chunking or reading bigger than
-            memory so the list will only contain one `RecordBatch`
+        Yields
+        ------
+        RecordBatch
+            The read record batches, of at most `batch_size` rows.
+        """
+        yield from self.read_file(projection, filters)
+
+    def scan_filtered(
+        self,
+        projection: list[str],
+        predicate_columns: list[str],
+        predicate: Callable[[RecordBatch], array],
+        filters: list[tuple] | None = None,
+    ) -> Iterator[RecordBatch]:
+        """Reads the `projection` columns of the rows that pass a `predicate`, the
+        cells of the `predicate_columns` are parsed first, and the cells of the
+        other columns only for the rows that pass, see `DataSource.scan_filtered`.
+
+        Parallel scans parse their rows in worker processes, they parse every
+        column, and the predicate is evaluated on the parsed batches. So are the
+        scans that build the zone maps of the file.
         """
-        with open(self.path) as f:
+        compressed = detect_compression(self.path) is not None
+        if (self.workers > 1 and not compressed) or (
+            filters and not compressed and self.zone_maps() is None
+        ):
+            yield from super().scan_filtered(
+                projection, predicate_columns, predicate, filters
+            )
+            return
+        yield from self.read_file(projection, filters, (predicate_columns, predicate))
+
+    def read_file(
+        self,
+        projection: list[str],
+        filters: list[tuple] | None,
+        predicate: tuple[list[str], Callable] | None = None,
+    ) -> Iterator[RecordBatch]:
+        """Reads the file, see `scan` and `scan_filtered`, `predicate` is a
+        `(predicate_columns, predicate)` pair."""
+        compressed = detect_compression(self.path) is not None
+        ranges = None
+        if filters and not compressed:
+            zones = self.zone_maps()
+            if zones is not None:
+                ranges = [
+                    (zone["start"], zone["end"])
+                    for zone in zones
+                    if zonemap.may_match(zone["statistics"], filters)
+                ]
+            elif self.workers <= 1:
+                yield from self.scan_building_zone_maps(projection)
+                return
+
+        if self.workers > 1 and not compressed:
+            yield from self.scan_parallel(projection, ranges)
+            return
+
+        schema, indices = self.resolve_projection(projection)
+        if ranges is not None:
+            for start, end in ranges:
+                yield from _scan_range(self, schema, indices, start, end, predicate)
+            return
+
+        row_count = 0
+        with open_text(self.path, read_ahead=self.read_ahead) as f:
             reader = csv.reader(f)
-            columns = next(reader)
-            if projection:
-                columns = [col for col in columns if col in projection]
-            first_row = next(reader)
-
-            fields = []
-            values = [[] for _ in range(len(columns))]
-
-            for i, (name, value) in enumerate(zip(columns, first_row)):
-                v = self.parse_value(value)
-                fields.append(
-                    Field(name, ArrowTypes.from_pyvalue(
-                    v))
+            next(reader)
+            for batch in self.read_batches(reader, schema, indices, predicate):
+                row_count += batch.row_count
+                yield batch
+
+        entry = self.catalog_entry()
+        # the rows filtered out by a predicate are not counted.
+        if entry.row_count is None and predicate is None:
+            entry.row_count = row_count
+            self.catalog.save(self.path)
+
+    def scan_sample(
+        self,
+        projection: list[str],
+        fraction: float,
+        seed: int | None = None,
+        filters: list[tuple] | None = None,
+    ) -> Iterator[RecordBatch]:
+        """Reads a random sample of the blocks of `SAMPLE_BLOCK_SIZE` bytes of the
+        file, every block is read with a probability of `fraction`, the others are
+        not read nor parsed. Blocks are aligned to lines, rows that span several
+        lines are not supported.
+
+        Compressed files can't be read from the middle, all their rows are read and
+        sampled one by one, see `DataSource.scan_sample`.
+        """
+        if detect_compression(self.path) is not None:
+            yield from super().scan_sample(projection, fraction, seed, filters)
+            return
+
+        schema, indices = self.resolve_projection(projection)
+        with open(self.path, "rb") as f:
+            header_size = len(f.readline())
+        rng = random.Random(seed)
+        for start, end in split_byte_ranges(self.path, header_size, SAMPLE_BLOCK_SIZE):
+            if rng.random() < fraction:
+                yield from _scan_range(self, schema, indices, start, end)
+
+    def scan_parallel(
+        self, projection: list[str], ranges: list[tuple[int, int]] | None = None
+    ) -> Iterator[RecordBatch]:
+        """Scans the file with a pool of `workers` processes.
+
+        The file is split into byte ranges aligned to line boundaries, every range is
+        parsed in a worker process and its record batches are streamed back, in file
+        order if `ordered`, otherwise as soon as a range is parsed. At most two ranges
+        per worker are in flight, bounding the memory held by parsed ranges.
+
+        Quoted values that contain new lines are not supported, a range could
+        start in the middle of them.
+
+        Parameters
+        ----------
+        projection : list[str]
+            The columns to read.
+        ranges : list[tuple[int, int]] | None
+            The byte ranges to read, by default the whole file.
+
+        Yields
+        ------
+        RecordBatch
+            The read record batches, of at most `batch_size` rows.
+        """
+        schema, indices = self.resolve_projection(projection)
+        if ranges is None:
+            with open(self.path, "rb") as f:
+                header_size = len(f.readline())
+            ranges = split_byte_ranges(self.path, header_size, self.range_size)
+
+        ranges = iter(ranges)
+        pool = ProcessPoolExecutor(self.workers)
+        try:
+            pending = deque(
+                pool.submit(_scan_range, self, schema, indices, start, end)
+                for start, end in itertools.islice(ranges, 2 * self.workers)
+            )
+            while pending:
+                if self.ordered:
+                    future = pending.popleft()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = done.pop()
+                    pending.remove(future)
+
+                for start, end in itertools.islice(ranges, 1):
+                    pending.append(pool.submit(_scan_range, self, schema, indices, start, end))
+                yield from future.result()
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def scan_building_zone_maps(self, projection: list[str]) -> Iterator[RecordBatch]:
+        """Scans the file sequentially recording the zone maps of every batch, every
+        column is parsed to compute its statistics but only the projected ones are
+        yielded. If the file is scanned to the end, the zone maps, the number of rows
+        and the statistics of the file are kept in the catalog."""
+        schema = self.get_schema()
+        projected, indices = self.resolve_projection(projection)
+
+        zones = []
+        with open(self.path, "rb") as f:
+            f.readline()
+            lines = _LineReader(f)
+            start = lines.offset
+            batches = self.read_batches(
+                csv.reader(lines), schema, list(range(len(schema.fields)))
+            )
+            for batch in batches:
+                zones.append(
+                    {
+                        "start": start,
+                        "end": lines.offset,
+                        "row_count": batch.row_count,
+                        "statistics": zonemap.batch_statistics(batch),
+                    }
                 )
+                start = lines.offset
+                yield RecordBatch(projected, [batch.get_field(i) for i in indices])
+
+        entry = self.catalog_entry()
+        entry.zone_maps = {"schema": schema_to_json(schema), "zones": zones}
+        entry.row_count = sum(zone["row_count"] for zone in zones)
+        entry.statistics = zonemap.merge_statistics(
+            [zone["statistics"] for zone in zones]
+        )
+        self.catalog.save(self.path)
+
+    def zone_maps(self) -> list[dict] | None:
+        """The zone maps of the file: the byte range (`start`, `end`), the `row_count`
+        and the `statistics` of every batch of rows, `None` if they were not built
+        yet, or the file or its schema changed since."""
+        zone_maps = self.catalog_entry().zone_maps
+        if zone_maps is None or zone_maps["schema"] != schema_to_json(self.get_schema()):
+            return None
+        return zone_maps["zones"]
+
+    def resolve_projection(self, projection: list[str]) -> tuple[Schema, list[int]]:
+        """The schema of the projected columns and their indices in the rows
+        of the file. Columns keep the order of the file."""
+        schema = self.get_schema()
+        indices = [
+            i for i, field in enumerate(schema.fields)
+            if not projection or field.name in projection
+        ]
+        return Schema([schema.fields[i] for i in indices]), indices
+
+    def read_batches(
+        self,
+        rows: Iterable[list[str]],
+        schema: Schema,
+        indices: list[int],
+        predicate: tuple[list[str], Callable] | None = None,
+    ) -> Iterator[RecordBatch]:
+        """Parses csv rows into record batches of `batch_size` rows.
+
+        Only the cells at `indices`, the projected columns, are picked from the rows.
+        They are transposed into columns and every column is converted at once
+        with the converter of its type, there is no per cell type detection.
+
+        With a `(predicate_columns, predicate)` pair, only the rows that pass are
+        parsed, see `parse_filtered_rows`, batches without rows are skipped.
+        """
+        rows = iter(rows)
+        while batch := list(itertools.islice(rows, self.batch_size)):
+            if predicate is None:
+                yield self.parse_rows(batch, schema, indices)
+                continue
+            batch = self.parse_filtered_rows(batch, schema, indices, *predicate)
+            if batch.row_count:
+                yield batch
+
+    def parse_rows(
+        self, rows: list[list[str]], schema: Schema, indices: list[int]
+    ) -> RecordBatch:
+        """Parses csv rows into a single record batch, see `read_batches`."""
+        values = []
+        cells = _select_columns(rows, indices)
+        if not cells:
+            cells = [()] * len(schema.fields)
+        converters = [_CONVERTERS.get(field.type) for field in schema.fields]
+        for field, converter, column in zip(schema.fields, converters, cells):
+            values.append(_convert(field, converter, column))
+        return self.to_record_batch(schema, values)
+
+    def parse_filtered_rows(
+        self,
+        rows: list[list[str]],
+        schema: Schema,
+        indices: list[int],
+        predicate_columns: list[str],
+        predicate: Callable[[RecordBatch], array],
+    ) -> RecordBatch:
+        """Parses the csv rows that pass a `predicate` into a single record batch.
+        Only the cells of the `predicate_columns` are parsed for every row, the
+        cells of the other columns are parsed for the rows that pass."""
+        checked = [
+            i for i, field in enumerate(schema.fields) if field.name in predicate_columns
+        ]
+        rest = [i for i in range(len(schema.fields)) if i not in checked]
+        checked_batch = self.parse_rows(
+            rows, Schema([schema.fields[i] for i in checked]), [indices[i] for i in checked]
+        )
+        selection = predicate(checked_batch)
+        fields = checked_batch.fields
+        if len(selection) < len(rows):
+            rows = list(map(rows.__getitem__, selection))
+            fields = [field.take(selection) for field in fields]
+        rest_batch = self.parse_rows(
+            rows, Schema([schema.fields[i] for i in rest]), [indices[i] for i in rest]
+        )
+        columns = dict(zip(checked, fields)) | dict(zip(rest, rest_batch.fields))
+        return RecordBatch(schema, [columns[i] for i in range(len(schema.fields))])
+
+    def to_record_batch(self, schema: Schema, values: list[list]) -> RecordBatch:
+        """Builds a `RecordBatch` from the parsed values, low cardinality string
+        columns are dictionary-encoded."""
+        columns = []
+        for field, column in zip(schema.fields, values):
+            if field.type is ArrowTypes.StringType:
+                max_cardinality = min(self.dictionary_threshold, len(column) // 2)
+                columns.append(dictionary_encode(field.type, column, max_cardinality))
+            else:
+                columns.append(ColumnVector.from_pylist(field.type, column))
+        return RecordBatch(schema, columns)
+
+
+def _scan_range(
+    source: CSVDataSource,
+    schema: Schema,
+    indices: list[int],
+    start: int,
+    end: int,
+    predicate: tuple[list[str], Callable] | None = None,
+) -> list[RecordBatch]:
+    """Parses the rows in the `[start, end)` byte range, runs in a worker process."""
+    text = read_byte_range(source.path, start, end).decode()
+    rows = csv.reader(io.StringIO(text, newline=""))
+    return list(source.read_batches(rows, schema, indices, predicate))
+
+
+class _LineReader:
+    """Iterates the decoded lines of a binary file, tracking the offset of the
+    next line."""
+
+    def __init__(self, f):
+        self.f = f
+        self.offset = f.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode()
+
+
+# Inferred types from narrowest to widest, a column takes the widest type of its values.
+_WIDENING = [
+    ArrowTypes.Int32Type,
+    ArrowTypes.Int64Type,
+    ArrowTypes.FloatType,
+    ArrowTypes.StringType,
+]
+
+# `int` and `float` accept underscores and surrounding whitespace, e.g. "1_000" or
+# " 1", csv numbers don't have them. "nan" and "inf" are floats.
+_NOT_NUMERIC = re.compile(r"[\s_]")
+
+_CONVERTERS = {
+    ArrowTypes.Int8Type: int,
+    ArrowTypes.Int16Type: int,
+    ArrowTypes.Int32Type: int,
+    ArrowTypes.Int64Type: int,
+    ArrowTypes.FloatType: float,
+    ArrowTypes.DoubleType: float,
+}
+
+
+def infer_type(value: str) -> ArrowType | None:
+    """The narrowest type that can hold the csv `value`, `None` if it's empty."""
+    if value == "":
+        return None
+    if _NOT_NUMERIC.search(value):
+        return ArrowTypes.StringType
+    try:
+        n = int(value)
+        return ArrowTypes.Int32Type if -(2**31) <= n < 2**31 else ArrowTypes.Int64Type
+    except ValueError:
+        pass
+    try:
+        float(value)
+        return ArrowTypes.FloatType
+    except ValueError:
+        return ArrowTypes.StringType
+
+
+def infer_schema(columns: list[str], rows: list[list[str]]) -> Schema:
+    """Infers the schema of csv `rows`, every column gets the widest type of
+    its values. Columns without values are strings."""
+    ranks = [-1] * len(columns)
+    for row in rows:
+        for i, value in enumerate(row[: len(columns)]):
+            type = infer_type(value)
+            if type is not None:
+                ranks[i] = max(ranks[i], _WIDENING.index(type))
+    return Schema(
+        [
+            Field(name, _WIDENING[rank] if rank >= 0 else ArrowTypes.StringType)
+            for name, rank in zip(columns, ranks)
+        ]
+    )
 
-                # Append the first row.
-                values[i].append(v)
 
-            schema = Schema(fields)
+def _select_columns(rows: list[list[str]], indices: list[int]) -> list[tuple]:
+    """The cells of `rows` at `indices`, transposed into columns."""
+    if not indices:
+        return []
+    getter = operator.itemgetter(*indices)
+    try:
+        if len(indices) == 1:
+            return [tuple(map(getter, rows))]
+        return list(zip(*map(getter, rows)))
+    except IndexError:
+        # Rows with missing trailing cells, they are empty.
+        width = max(indices) + 1
+        rows = [row + [""] * (width - len(row)) for row in rows]
+        return _select_columns(rows, indices)
 
-            # Exhaust reader while appending values appropriately.
-            try:
-                while reader:
-                    for i, value in enumerate(next(reader)):
-                        if i < len(columns):
-                            v = self.parse_value(value)
-                            v = None if v == "" else v
-                            values[i].append(v)
-            except StopIteration:
-                pass
 
-            return [RecordBatch.from_pylists(schema, values)]
+def _convert(field: Field, converter, cells: tuple[str, ...]) -> list:
+    """Converts the cells of a column, empty cells are nulls (`None`)."""
+    # the cells are checked at once, a single search over their text.
+    if converter is not None and _NOT_NUMERIC.search("".join(cells)):
+        raise ParseError(field.name, field.type)
+    try:
+        if "" not in cells:
+            return list(cells if converter is None else map(converter, cells))
+        if converter is None:
+            return [cell if cell != "" else None for cell in cells]
+        return [converter(cell) if cell != "" else None for cell in cells]
+    except ValueError as e:
+        raise ParseError(field.name, field.type) from e
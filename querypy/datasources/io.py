@@ -0,0 +1,216 @@
+"""I/O helpers shared by the file based data sources."""
+
+import bz2
+import functools
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+import time
+from typing import BinaryIO
+from typing import Iterable
+from typing import TextIO
+
+# The default size in bytes of the byte ranges that are scanned in parallel.
+DEFAULT_RANGE_SIZE = 16 * 1024 * 1024
+
+
+def split_byte_ranges(
+    path: str, start: int, range_size: int = DEFAULT_RANGE_SIZE
+) -> list[tuple[int, int]]:
+    """Splits a line-based file into `(start, end)` byte ranges of roughly
+    `range_size` bytes, from `start` to the end of the file.
+
+    Every boundary is moved forward to the end of the line it falls in, so
+    every range holds complete lines. Records that span several lines, e.g. csv
+    quoted values with new lines, are not supported.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    start : int
+        The offset of the first line, e.g. after the header.
+    range_size : int
+        The approximate size of every range.
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        The ranges, ends are exclusive.
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        while start < size:
+            f.seek(min(start + range_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_byte_range(path: str, start: int, end: int) -> bytes:
+    """Reads the bytes of `path` in `[start, end)`."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+# The magic bytes that compressed files start with, bz2 files are followed by their
+# block size, a digit from 1 to 9.
+_MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "bz2": tuple(b"BZh%d" % level for level in range(1, 10)),
+    "xz": b"\xfd7zXZ\x00",
+}
+
+_OPENERS = {
+    "gzip": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+}
+
+
+def detect_compression(path: str) -> str | None:
+    """The codec of a compressed file, 'gzip', 'bz2' or 'xz', detected from its
+    first bytes, `None` if it's not compressed."""
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for compression, magic in _MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_input(path: str, read_ahead: bool = False) -> BinaryIO:
+    """Opens a file to read its bytes, compressed files are decompressed while they
+    are read, no temporary file is written.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    read_ahead : bool
+        Whether a compressed file is decompressed in a background thread, ahead of
+        the reads. The codecs release the GIL, so decompression runs in parallel
+        with the work done with the read bytes, e.g. parsing them.
+    """
+    compression = detect_compression(path)
+    if compression is None:
+        return open(path, "rb")
+    stream = _OPENERS[compression](path, "rb")
+    if read_ahead:
+        return io.BufferedReader(ReadAheadStream(stream))
+    return stream
+
+
+def open_text(path: str, read_ahead: bool = False) -> TextIO:
+    """Opens a file to read its text, like `open(path, newline="")`, see `open_input`."""
+    return io.TextIOWrapper(open_input(path, read_ahead), newline="")
+
+
+class BackgroundIterator:
+    """Iterates an iterable in a background thread, at most `depth` items ahead of
+    the consumer, the thread waits while the queue of items is full.
+
+    Attributes
+    ----------
+    wait_time : float
+        The seconds the consumer waited for items that were not ready.
+    waits : int
+        The number of items the consumer waited for.
+    """
+
+    _DONE = object()
+
+    def __init__(self, iterable: Iterable, depth: int = 2):
+        self.wait_time = 0.0
+        self.waits = 0
+        self._items = queue.Queue(depth)
+        self._done = False
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(iterable,), daemon=True)
+        self._thread.start()
+
+    def _run(self, iterable: Iterable):
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not self._put((item, None)):
+                    return
+            self._put((self._DONE, None))
+        except BaseException as e:
+            # e.g. querypy errors, that are not `Exception`s.
+            self._put((self._DONE, e))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    def _put(self, item) -> bool:
+        """Queues an item, unless the iterator is closed while waiting."""
+        while not self._closing.is_set():
+            try:
+                self._items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        try:
+            item, error = self._items.get_nowait()
+        except queue.Empty:
+            start = time.perf_counter()
+            item, error = self._items.get()
+            self.wait_time += time.perf_counter() - start
+            self.waits += 1
+        if item is self._DONE:
+            self._done = True
+            if error is not None:
+                raise error
+            raise StopIteration
+        return item
+
+    def close(self):
+        """Stops the background thread, the iterable is closed."""
+        self._done = True
+        self._closing.set()
+        self._thread.join()
+
+
+class ReadAheadStream(io.RawIOBase):
+    """A stream that reads another stream in a background thread, in chunks of
+    `chunk_size` bytes, keeping at most `depth` chunks ahead of the reads."""
+
+    def __init__(self, stream: BinaryIO, chunk_size: int = 1024 * 1024, depth: int = 4):
+        self.stream = stream
+        self._chunks = BackgroundIterator(
+            iter(functools.partial(stream.read, chunk_size), b""), depth
+        )
+        self._chunk = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self._chunk:
+            self._chunk = memoryview(next(self._chunks, b""))
+        n = min(len(b), len(self._chunk))
+        b[:n] = self._chunk[:n]
+        self._chunk = self._chunk[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._chunks.close()
+            self.stream.close()
+        super().close()
@@ -0,0 +1,345 @@
+"""
+A data source over newline-delimited JSON files (JSON lines), every line of the
+file is a JSON object, e.g. an event of a log:
+
+    {"id": 1, "event": "login", "user": {"name": "a"}}
+    {"id": 2, "event": "logout", "duration": 12.5}
+
+The keys of the objects are the columns of the table, missing keys are nulls.
+"""
+
+import io
+import itertools
+import json
+import os
+import random
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from typing import Iterable
+from typing import Iterator
+
+from querypy.datasources import DEFAULT_BATCH_SIZE
+from querypy.datasources import DataSource
+from querypy.datasources.catalog import CATALOG
+from querypy.datasources.catalog import Catalog
+from querypy.datasources.catalog import CatalogEntry
+from querypy.datasources.csv import SAMPLE_BLOCK_SIZE
+from querypy.datasources.io import DEFAULT_RANGE_SIZE
+from querypy.datasources.io import detect_compression
+from querypy.datasources.io import open_input
+from querypy.datasources.io import open_text
+from querypy.datasources.io import read_byte_range
+from querypy.datasources.io import split_byte_ranges
+from querypy.datasources.statistics import TableStatistics
+from querypy.datasources.statistics import sample_statistics
+from querypy.datasources.statistics import with_file_statistics
+from querypy.exceptions import ParseError
+from querypy.types_ import ArrowType
+from querypy.types_ import ArrowTypes
+from querypy.types_ import ColumnVector
+from querypy.types_ import Field
+from querypy.types_ import RecordBatch
+from querypy.types_ import Schema
+from querypy.types_ import dictionary_encode
+
+
+class JsonLinesDataSource(DataSource):
+    """A datasource to read newline-delimited JSON files.
+
+    Every line is decoded, but only the values of the projected keys are picked
+    and converted into the typed buffers of their columns. Nested objects and
+    arrays are read as strings, their JSON text.
+
+    Like csv files, compressed files are decompressed while they are scanned and
+    uncompressed files are split into byte ranges, aligned to lines, to be scanned
+    in parallel.
+
+    Attributes
+    ----------
+    path : str
+        The path of the file.
+    batch_size : int
+        The maximum number of rows of the scanned record batches.
+    dictionary_threshold : int
+        String columns with at most this many distinct values (and no more than
+        half the rows of a batch) are dictionary-encoded.
+    schema : Schema
+        The schema of the file, if not given it's inferred from a sample of lines.
+    sample_size : int
+        The number of lines used to infer the schema.
+    workers : int
+        The number of processes that scan the file in parallel, the file is
+        scanned sequentially if it's not bigger than one.
+    range_size : int
+        The size in bytes of the ranges that are scanned in parallel.
+    ordered : bool
+        Whether a parallel scan yields the batches in file order.
+    read_ahead : bool | None
+        Whether a compressed file is decompressed in a background thread, ahead of
+        the parsing, see `open_input`. By default it is when `workers` is bigger
+        than one, compressed files are never scanned by many processes.
+    catalog : Catalog
+        Caches the schema and number of rows of the file while it does not change,
+        see `querypy.datasources.catalog`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dictionary_threshold: int = 1024,
+        schema: Schema | None = None,
+        sample_size: int = 1000,
+        workers: int = 1,
+        range_size: int = DEFAULT_RANGE_SIZE,
+        ordered: bool = True,
+        catalog: Catalog = CATALOG,
+        read_ahead: bool | None = None,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.dictionary_threshold = dictionary_threshold
+        self.schema = schema
+        self.sample_size = sample_size
+        self.workers = workers
+        self.range_size = range_size
+        self.ordered = ordered
+        self.catalog = catalog
+        self.read_ahead = workers > 1 if read_ahead is None else read_ahead
+
+    def catalog_entry(self) -> CatalogEntry:
+        return self.catalog.entry(self.path, f"jsonl:{self.sample_size}")
+
+    def get_schema(self) -> Schema:
+        """Gets the schema of the file. If it was not given, the columns are the keys
+        of the first `sample_size` lines, in order of appearance, and their types
+        are the widest type of their values, see `infer_json_schema`.
+
+        Returns
+        -------
+        Schema
+            The schema of the file.
+        """
+        if self.schema is not None:
+            return self.schema
+
+        entry = self.catalog_entry()
+        if entry.schema is None:
+            with open_text(self.path) as f:
+                sample = list(itertools.islice(_decode_lines(f), self.sample_size))
+            entry.schema = infer_json_schema(sample)
+            self.catalog.save(self.path)
+        return entry.schema
+
+    def statistics(self) -> TableStatistics:
+        """The statistics of the file, estimated from its first `sample_size` lines
+        and cached in the catalog, see `CSVDataSource.statistics`."""
+        entry = self.catalog_entry()
+        if entry.table_statistics is None:
+            entry.table_statistics = self.sample_statistics()
+            self.catalog.save(self.path)
+        return with_file_statistics(entry.table_statistics, entry.row_count, None)
+
+    def sample_statistics(self) -> TableStatistics:
+        """The statistics of the first `sample_size` lines of the file."""
+        schema = self.get_schema()
+        size = os.path.getsize(self.path)
+        with open_input(self.path) as f:
+            lines = list(itertools.islice(f, self.sample_size))
+            exhausted = not f.read(1)
+        objects = list(_decode_lines(line.decode() for line in lines))
+        batch = self.to_record_batch(objects, schema)
+
+        if exhausted:
+            row_count = len(objects)
+        elif detect_compression(self.path) is None:
+            row_count = round(len(objects) * size / sum(map(len, lines)))
+        else:
+            row_count = None
+        return sample_statistics(batch, row_count, size)
+
+    def scan(
+        self, projection: list[str], filters: list[tuple] | None = None
+    ) -> Iterator[RecordBatch]:
+        """Scans the lines sequentially, yielding a `RecordBatch` every `batch_size`
+        lines, or in parallel if `workers` is bigger than one, see `scan_parallel`.
+
+        Parameters
+        ----------
+        projection : list[str]
+            The columns to read.
+        filters : list[tuple] | None
+            Not used, the file has no statistics to skip lines.
+
+        Yields
+        ------
+        RecordBatch
+            The read record batches, of at most `batch_size` rows.
+        """
+        compressed = detect_compression(self.path) is not None
+        if self.workers > 1 and not compressed:
+            yield from self.scan_parallel(projection)
+            return
+
+        schema = self.get_schema().select(projection)
+        row_count = 0
+        with open_text(self.path, read_ahead=self.read_ahead) as f:
+            for batch in self.read_batches(_decode_lines(f), schema):
+                row_count += batch.row_count
+                yield batch
+
+        entry = self.catalog_entry()
+        if entry.row_count is None:
+            entry.row_count = row_count
+            self.catalog.save(self.path)
+
+    def scan_sample(
+        self,
+        projection: list[str],
+        fraction: float,
+        seed: int | None = None,
+        filters: list[tuple] | None = None,
+    ) -> Iterator[RecordBatch]:
+        """Reads a random sample of the blocks of `SAMPLE_BLOCK_SIZE` bytes of the
+        file, see `CSVDataSource.scan_sample`."""
+        if detect_compression(self.path) is not None:
+            yield from super().scan_sample(projection, fraction, seed, filters)
+            return
+
+        schema = self.get_schema().select(projection)
+        rng = random.Random(seed)
+        for start, end in split_byte_ranges(self.path, 0, SAMPLE_BLOCK_SIZE):
+            if rng.random() < fraction:
+                yield from _scan_range(self, schema, start, end)
+
+    def scan_parallel(self, projection: list[str]) -> Iterator[RecordBatch]:
+        """Scans the file with a pool of `workers` processes, every byte range of
+        `range_size` bytes is decoded in a worker process. At most two ranges per
+        worker are in flight."""
+        schema = self.get_schema().select(projection)
+        ranges = iter(split_byte_ranges(self.path, 0, self.range_size))
+        pool = ProcessPoolExecutor(self.workers)
+        try:
+            pending = deque(
+                pool.submit(_scan_range, self, schema, start, end)
+                for start, end in itertools.islice(ranges, 2 * self.workers)
+            )
+            while pending:
+                if self.ordered:
+                    future = pending.popleft()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = done.pop()
+                    pending.remove(future)
+
+                for start, end in itertools.islice(ranges, 1):
+                    pending.append(pool.submit(_scan_range, self, schema, start, end))
+                yield from future.result()
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def read_batches(
+        self, objects: Iterable[dict], schema: Schema
+    ) -> Iterator[RecordBatch]:
+        """Picks the values of the `schema` keys of the decoded lines, in record
+        batches of `batch_size` rows, every column is converted at once."""
+        objects = iter(objects)
+        while batch := list(itertools.islice(objects, self.batch_size)):
+            yield self.to_record_batch(batch, schema)
+
+    def to_record_batch(self, objects: list[dict], schema: Schema) -> RecordBatch:
+        """Builds a `RecordBatch` from the values of the `schema` keys of decoded
+        lines, low cardinality string columns are dictionary-encoded."""
+        columns = []
+        for field in schema.fields:
+            values = _convert(field, [obj.get(field.name) for obj in objects])
+            if field.type is ArrowTypes.StringType:
+                max_cardinality = min(self.dictionary_threshold, len(values) // 2)
+                columns.append(dictionary_encode(field.type, values, max_cardinality))
+            else:
+                columns.append(ColumnVector.from_pylist(field.type, values))
+        return RecordBatch(schema, columns)
+
+
+def _scan_range(
+    source: JsonLinesDataSource, schema: Schema, start: int, end: int
+) -> list[RecordBatch]:
+    """Decodes the lines in the `[start, end)` byte range, runs in a worker process."""
+    text = read_byte_range(source.path, start, end).decode()
+    return list(source.read_batches(_decode_lines(io.StringIO(text)), schema))
+
+
+def _decode_lines(lines: Iterable[str]) -> Iterator[dict]:
+    """The objects of the non-blank lines."""
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+# Inferred types from narrowest to widest, a column takes the widest type of its values.
+_WIDENING = [
+    ArrowTypes.Int32Type,
+    ArrowTypes.Int64Type,
+    ArrowTypes.FloatType,
+    ArrowTypes.StringType,
+]
+
+
+def infer_json_type(value) -> ArrowType | None:
+    """The narrowest type that can hold the JSON `value`, `None` if it's null."""
+    match value:
+        case None:
+            return None
+        case bool():
+            return ArrowTypes.BooleanType
+        case int():
+            return ArrowTypes.Int32Type if -(2**31) <= value < 2**31 else ArrowTypes.Int64Type
+        case float():
+            return ArrowTypes.FloatType
+        case _:
+            return ArrowTypes.StringType
+
+
+def infer_json_schema(objects: list[dict]) -> Schema:
+    """Infers the schema of decoded JSON lines, every key is a column of the
+    widest type of its values. Booleans mixed with other values, and columns
+    without values, are strings."""
+    types = {}
+    for obj in objects:
+        for key, value in obj.items():
+            types.setdefault(key, set()).add(infer_json_type(value))
+
+    fields = []
+    for key, column_types in types.items():
+        column_types.discard(None)
+        if column_types == {ArrowTypes.BooleanType}:
+            type = ArrowTypes.BooleanType
+        elif not column_types or ArrowTypes.BooleanType in column_types:
+            type = ArrowTypes.StringType
+        else:
+            type = _WIDENING[max(_WIDENING.index(t) for t in column_types)]
+        fields.append(Field(key, type))
+    return Schema(fields)
+
+
+def _convert(field: Field, values: list) -> list:
+    """Converts the values of a column to its type, nested values of string columns
+    are their JSON text."""
+    if field.type is ArrowTypes.StringType:
+        return [
+            v if v is None or isinstance(v, str) else json.dumps(v) for v in values
+        ]
+    if field.type is ArrowTypes.BooleanType:
+        valid = (bool,)
+    elif ArrowTypes.typecode(field.type) == "d":
+        valid = (int, float)
+    else:
+        valid = (int,)
+    # exact types, booleans are not integers.
+    if any(v is not None and type(v) not in valid for v in values):
+        raise ParseError(field.name, field.type)
+    if float in valid:
+        return [v if v is None else float(v) for v in values]
+    return values
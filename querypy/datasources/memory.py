@@ -0,0 +1,282 @@
+"""
+In-memory tables, and a cache of the columns scanned from other data sources.
+"""
+
+import os
+from collections import OrderedDict
+from typing import Hashable
+from typing import Iterator
+
+from querypy.datasources import DEFAULT_BATCH_SIZE
+from querypy.datasources import DataSource
+from querypy.datasources import zonemap
+from querypy.datasources.statistics import ColumnStatistics
+from querypy.datasources.statistics import TableStatistics
+from querypy.exceptions import UnknownTableError
+from querypy.types_ import ColumnVectorABC
+from querypy.types_ import RecordBatch
+from querypy.types_ import Schema
+from querypy.types_ import concat_vectors
+
+
+class MemoryDataSource(DataSource):
+    """A datasource over record batches held in memory.
+
+    Attributes
+    ----------
+    schema : Schema
+        The schema of the batches.
+    batches : list[RecordBatch]
+        The batches of the table.
+    """
+
+    def __init__(self, schema: Schema, batches: list[RecordBatch]):
+        self.schema = schema
+        self.batches = batches
+        self._zone_maps = None
+        self._statistics = None
+
+    @classmethod
+    def from_source(cls, source: DataSource) -> "MemoryDataSource":
+        """Reads every batch of `source` into memory."""
+        return cls(source.get_schema(), list(source.scan([])))
+
+    def get_schema(self) -> Schema:
+        return self.schema
+
+    def zone_maps(self) -> list[dict[str, list]]:
+        """The zone maps of the batches, computed the first time they are needed."""
+        if self._zone_maps is None:
+            self._zone_maps = [zonemap.batch_statistics(b) for b in self.batches]
+        return self._zone_maps
+
+    def statistics(self) -> TableStatistics:
+        """The exact statistics of the table, computed the first time they are
+        needed, the data is already in memory."""
+        if self._statistics is None:
+            row_count = sum(batch.row_count for batch in self.batches)
+            merged = zonemap.merge_statistics(self.zone_maps())
+            columns = {}
+            for i, field in enumerate(self.schema.fields):
+                distinct = set()
+                for batch in self.batches:
+                    distinct.update(batch.compact().get_field(i).to_pylist())
+                distinct.discard(None)
+                low, high, null_count = merged.get(field.name, [None, None, 0])
+                columns[field.name] = ColumnStatistics(
+                    low,
+                    high,
+                    null_count / row_count if row_count else 0.0,
+                    len(distinct),
+                )
+            size_bytes = sum(
+                column.nbytes() for batch in self.batches for column in batch.fields
+            )
+            self._statistics = TableStatistics(row_count, size_bytes, columns, exact=True)
+        return self._statistics
+
+    def scan(
+        self, projection: list[str], filters: list[tuple] | None = None
+    ) -> Iterator[RecordBatch]:
+        """Yields the batches with the projected columns, batches that cannot
+        match the `filters` are skipped. Columns are not copied."""
+        indices = [
+            i for i, field in enumerate(self.schema.fields)
+            if not projection or field.name in projection
+        ]
+        schema = Schema([self.schema.fields[i] for i in indices])
+        for i, batch in enumerate(self.batches):
+            if filters and not zonemap.may_match(self.zone_maps()[i], filters):
+                continue
+            yield RecordBatch(
+                schema, [batch.get_field(j) for j in indices], batch.selection
+            )
+
+
+# Tables registered by name, see `register_table`.
+TABLES: dict[str, DataSource] = {}
+
+
+def register_table(name: str, source: DataSource):
+    """Registers a datasource as a named table, e.g. a `MemoryDataSource` to
+    keep a hot table in memory, see `DataFrame.table`."""
+    TABLES[name] = source
+
+
+def get_table(name: str) -> DataSource:
+    try:
+        return TABLES[name]
+    except KeyError:
+        raise UnknownTableError(name) from None
+
+
+class ScanCache:
+    """A cache of the columns scanned from data sources, bounded by a budget of
+    bytes, see `CachedDataSource`.
+
+    Every entry is a whole column of a source, concatenated in a single vector, and
+    a `version` of the source, e.g. the modification time of its file. An entry
+    is discarded when its source has a different version. When the cache is over
+    budget, the least recently used entries are evicted.
+
+    Attributes
+    ----------
+    max_bytes : int
+        The budget of the cache, see `ColumnVectorABC.nbytes`.
+    nbytes : int
+        The bytes held by the cache.
+    hits : int
+        The number of columns read from the cache.
+    misses : int
+        The number of columns that were not in the cache.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        # (source key, column) -> (version, vector, nbytes)
+        self._entries = OrderedDict()
+
+    def get(self, key: Hashable, version: Hashable, column: str) -> ColumnVectorABC | None:
+        entry = self._entries.get((key, column))
+        if entry is None or entry[0] != version:
+            if entry is not None:
+                self._remove((key, column))
+            self.misses += 1
+            return None
+        self._entries.move_to_end((key, column))
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, version: Hashable, column: str, vector: ColumnVectorABC):
+        """Caches a column, columns bigger than the budget are not cached."""
+        nbytes = vector.nbytes()
+        if nbytes > self.max_bytes:
+            return
+        if (key, column) in self._entries:
+            self._remove((key, column))
+        while self.nbytes + nbytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+        self._entries[(key, column)] = (version, vector, nbytes)
+        self.nbytes += nbytes
+
+    def invalidate(self, key: Hashable | None = None):
+        """Discards the columns of the source `key`, or every column."""
+        for entry_key in list(self._entries):
+            if key is None or entry_key[0] == key:
+                self._remove(entry_key)
+
+    def _remove(self, entry_key: tuple):
+        _, _, nbytes = self._entries.pop(entry_key)
+        self.nbytes -= nbytes
+
+
+# The cache of the session, used by default by `CachedDataSource`.
+SCAN_CACHE = ScanCache()
+
+
+class CachedDataSource(DataSource):
+    """Caches the columns scanned from a datasource in a `ScanCache`.
+
+    A scan reads the columns that are not cached from `source`, yielding its batches
+    as they are read and caching them once the scan finishes. Cached columns are
+    served as slices of `batch_size` rows, so a projection reuses the columns
+    loaded by any earlier scan. Filters are not used, cached columns are already
+    in memory.
+
+    The source must scan its rows in the same order every time, e.g. a parallel
+    `CSVDataSource` must be `ordered`.
+
+    Attributes
+    ----------
+    source : DataSource
+        The cached datasource.
+    key : Hashable
+        The key of the source in the cache, by default the type of the source
+        and its path.
+    cache : ScanCache
+        The cache, by default the cache of the session.
+    batch_size : int
+        The number of rows of the batches served from the cache.
+    """
+
+    def __init__(
+        self,
+        source: DataSource,
+        key: Hashable | None = None,
+        cache: ScanCache = SCAN_CACHE,
+        batch_size: int | None = None,
+    ):
+        self.source = source
+        self.key = key if key is not None else (
+            type(source).__name__, getattr(source, "path", id(source))
+        )
+        self.cache = cache
+        self.batch_size = batch_size or getattr(source, "batch_size", DEFAULT_BATCH_SIZE)
+
+    def version(self) -> Hashable:
+        """The version of the source: the size and modification time of its
+        files, `None` if it has no files."""
+        path = getattr(self.source, "path", None)
+        if path is None:
+            return None
+        if hasattr(self.source, "files"):
+            paths = [p for p, _ in self.source.files()]
+        else:
+            paths = [path]
+        stats = [(p, os.stat(p)) for p in paths]
+        return tuple((p, stat.st_size, stat.st_mtime_ns) for p, stat in stats)
+
+    def get_schema(self) -> Schema:
+        return self.source.get_schema()
+
+    def statistics(self) -> TableStatistics | None:
+        return self.source.statistics()
+
+    def scan(
+        self, projection: list[str], filters: list[tuple] | None = None
+    ) -> Iterator[RecordBatch]:
+        schema = self.get_schema().select(projection)
+        version = self.version()
+        columns = {
+            field.name: self.cache.get(self.key, version, field.name)
+            for field in schema.fields
+        }
+        missing = [name for name, column in columns.items() if column is None]
+
+        if not missing:
+            yield from self.cached_batches(schema, columns)
+            return
+
+        # Every row of the missing columns is read, to be cached.
+        read = {name: [] for name in missing}
+        offset = 0
+        for batch in self.source.scan(missing):
+            batch = batch.compact()
+            fields = []
+            for field in schema.fields:
+                if columns[field.name] is not None:
+                    fields.append(columns[field.name].slice(offset, batch.row_count))
+                else:
+                    column = batch.get_field(batch.schema.get_index_by_name(field.name))
+                    read[field.name].append(column)
+                    fields.append(column)
+            offset += batch.row_count
+            yield RecordBatch(schema, fields)
+
+        for name, vectors in read.items():
+            if vectors:
+                self.cache.put(self.key, version, name, concat_vectors(vectors))
+
+    def cached_batches(
+        self, schema: Schema, columns: dict[str, ColumnVectorABC]
+    ) -> Iterator[RecordBatch]:
+        """Slices of `batch_size` rows of the cached columns."""
+        size = columns[schema.fields[0].name].size if schema.fields else 0
+        for offset in range(0, size, self.batch_size):
+            yield RecordBatch(
+                schema,
+                [columns[f.name].slice(offset, self.batch_size) for f in schema.fields],
+            )
@@ -0,0 +1,336 @@
+"""
+Data sources of many files read as one table, e.g. Hive-partitioned directories:
+
+    sales/
+        dt=2024-01-01/part-0.csv
+        dt=2024-01-01/part-1.csv
+        dt=2024-01-02/part-0.csv
+
+The `key=value` directories are partition columns of the table, the rows of a
+file take the values of its directories.
+"""
+
+import glob
+import inspect
+import itertools
+import os
+import random
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from typing import Iterator
+
+from querypy.datasources import DataSource
+from querypy.datasources import zonemap
+from querypy.datasources.csv import CSVDataSource
+from querypy.datasources.csv import infer_schema
+from querypy.datasources.statistics import ColumnStatistics
+from querypy.datasources.statistics import TableStatistics
+from querypy.datasources.statistics import merge_table_statistics
+from querypy.types_ import ArrowType
+from querypy.types_ import ArrowTypes
+from querypy.types_ import Field
+from querypy.types_ import LiteralValueVector
+from querypy.types_ import RecordBatch
+from querypy.types_ import Schema
+
+# Files that are not data, e.g. '_SUCCESS' markers or catalog sidecars.
+_IGNORED_PREFIXES = (".", "_")
+_IGNORED_SUFFIXES = (".querypy",)
+
+
+class PartitionedDataSource(DataSource):
+    """A datasource that reads the files of a directory, or the files matching a
+    glob pattern, as a single stream of record batches.
+
+    Partition columns, from `key=value` directories, are added after the columns
+    of the files, their type is inferred from their values. Filters on partition
+    columns skip whole files, other filters are passed to the sources of the files.
+    The files must share the same columns.
+
+    Attributes
+    ----------
+    path : str
+        A directory, read recursively, or a glob pattern, e.g. 'sales/dt=*/*.csv'.
+    file_format : type[DataSource]
+        The datasource that reads every file, called as `file_format(path, **options)`.
+    options : dict
+        The options of the datasources of the files, e.g. `{'batch_size': 1000}`.
+    workers : int
+        The number of processes that read files in parallel, the files are read
+        sequentially if it's not bigger than one.
+    ordered : bool
+        Whether a parallel scan yields the batches in file order.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        file_format: type[DataSource] = CSVDataSource,
+        options: dict | None = None,
+        workers: int = 1,
+        ordered: bool = True,
+    ):
+        self.path = path
+        self.file_format = file_format
+        self.options = options or {}
+        self.workers = workers
+        self.ordered = ordered
+        self._file_schema = None
+
+    def files(self) -> list[tuple[str, dict[str, str]]]:
+        """The data files, sorted, with the raw values of their partition columns."""
+        if glob.has_magic(self.path):
+            root = self.path[: min(self.path.find(c) for c in "*?[" if c in self.path)]
+            root = os.path.dirname(root)
+            paths = [p for p in glob.glob(self.path, recursive=True) if os.path.isfile(p)]
+        else:
+            root = self.path
+            paths = [
+                os.path.join(directory, name)
+                for directory, _, names in os.walk(self.path)
+                for name in names
+            ]
+
+        files = []
+        for path in sorted(paths):
+            parts = os.path.relpath(path, root).split(os.sep)
+            if any(part.startswith(_IGNORED_PREFIXES) for part in parts):
+                continue
+            if path.endswith(_IGNORED_SUFFIXES):
+                continue
+            partitions = dict(part.split("=", 1) for part in parts[:-1] if "=" in part)
+            files.append((path, partitions))
+        return files
+
+    def partition_fields(self) -> list[Field]:
+        """The partition columns, the type of a column is the widest type of its
+        values, see `querypy.datasources.csv.infer_schema`."""
+        partitions = [partitions for _, partitions in self.files()]
+        keys = list(dict.fromkeys(key for p in partitions for key in p))
+        rows = [[p.get(key, "") for key in keys] for p in partitions]
+        return infer_schema(keys, rows).fields
+
+    def file_source(self, path: str) -> DataSource:
+        """The datasource of a file. Unless the `options` have a schema, it's given
+        the schema of the first file, if it takes one, so that every file is read
+        with the same types instead of the types inferred from its own rows."""
+        options = self.options
+        if (
+            options.get("schema") is None
+            and "schema" in inspect.signature(self.file_format).parameters
+        ):
+            options = {**options, "schema": self.file_schema()}
+        return self.file_format(path, **options)
+
+    def file_schema(self) -> Schema:
+        """The schema of the files, the schema of the first one, read once."""
+        if self._file_schema is None:
+            files = self.files()
+            if not files:
+                raise FileNotFoundError(f"No files found in {self.path!r}")
+            source = self.file_format(files[0][0], **self.options)
+            self._file_schema = source.get_schema()
+        return self._file_schema
+
+    def get_schema(self) -> Schema:
+        return Schema(self.file_schema().fields + self.partition_fields())
+
+    def statistics(self) -> TableStatistics | None:
+        """The statistics of the table, merged from the statistics of its files, see
+        `merge_table_statistics`, `None` if the files have none. The statistics of
+        the partition columns are computed from the values of the files."""
+        files = self.partitions()
+        statistics = [self.file_source(path).statistics() for path, _ in files]
+        if not files or None in statistics:
+            return None
+        merged = merge_table_statistics(statistics)
+
+        for field in self.partition_fields():
+            values = [
+                (s.row_count, partitions[field.name])
+                for s, (_, partitions) in zip(statistics, files)
+            ]
+            present = [value for _, value in values if value is not None]
+            if merged.row_count:
+                null_rows = sum(rows for rows, value in values if value is None)
+                null_fraction = null_rows / merged.row_count
+            else:
+                null_fraction = None
+            merged.columns[field.name] = ColumnStatistics(
+                min(present, default=None),
+                max(present, default=None),
+                null_fraction,
+                len(set(present)),
+            )
+        return merged
+
+    def scan(
+        self, projection: list[str], filters: list[tuple] | None = None
+    ) -> Iterator[RecordBatch]:
+        """Scans the files whose partition values may match `filters`, one after
+        the other, or in parallel if `workers` is bigger than one.
+
+        Parameters
+        ----------
+        projection : list[str]
+            The columns to read, file or partition columns.
+        filters : list[tuple] | None
+            The `(column, op, value)` conditions used to skip files and chunks of files.
+
+        Yields
+        ------
+        RecordBatch
+            The read record batches, with the projected columns in schema order.
+        """
+        filters = filters or []
+        schema = self.get_schema().select(projection)
+        partition_fields = {field.name: field for field in self.partition_fields()}
+        file_filters = [f for f in filters if f[0] not in partition_fields]
+
+        files = []
+        for path, partitions in self.partitions():
+            statistics = {key: [value, value, 0] for key, value in partitions.items()}
+            if zonemap.may_match(statistics, filters):
+                files.append((path, partitions))
+
+        if self.workers > 1:
+            yield from self.scan_parallel(files, schema, file_filters)
+            return
+
+        for path, partitions in files:
+            yield from self.scan_file(path, partitions, schema, file_filters)
+
+    def scan_parallel(
+        self,
+        files: list[tuple[str, dict]],
+        schema: Schema,
+        filters: list[tuple],
+    ) -> Iterator[RecordBatch]:
+        """Scans the files with a pool of `workers` processes, at most two files per
+        worker are in flight."""
+        files = iter(files)
+        pool = ProcessPoolExecutor(self.workers)
+        try:
+            pending = deque(
+                pool.submit(_scan_file, self, path, partitions, schema, filters)
+                for path, partitions in itertools.islice(files, 2 * self.workers)
+            )
+            while pending:
+                if self.ordered:
+                    future = pending.popleft()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = done.pop()
+                    pending.remove(future)
+
+                for path, partitions in itertools.islice(files, 1):
+                    pending.append(
+                        pool.submit(_scan_file, self, path, partitions, schema, filters)
+                    )
+                yield from future.result()
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def scan_sample(
+        self,
+        projection: list[str],
+        fraction: float,
+        seed: int | None = None,
+        filters: list[tuple] | None = None,
+    ) -> Iterator[RecordBatch]:
+        """Reads a random sample of the rows of every file, with the sampling of its
+        datasource, see `DataSource.scan_sample`. Files are read sequentially."""
+        schema = self.get_schema().select(projection)
+        partition_names = {field.name for field in self.partition_fields()}
+        filters = [f for f in filters or [] if f[0] not in partition_names]
+        rng = random.Random(seed)
+        for path, partitions in self.partitions():
+            # every file gets its own seed, drawn from the seed of the scan.
+            file_seed = rng.getrandbits(64)
+            yield from self.scan_file(
+                path,
+                partitions,
+                schema,
+                filters,
+                lambda source, columns, seed=file_seed: source.scan_sample(
+                    columns, fraction, seed, filters
+                ),
+            )
+
+    def partitions(self) -> list[tuple[str, dict]]:
+        """The files with the values of their partition columns, of their inferred
+        type, files outside of a partition directory have a null value."""
+        partition_fields = self.partition_fields()
+        return [
+            (
+                path,
+                {
+                    field.name: _convert_partition(
+                        raw_partitions.get(field.name, ""), field.type
+                    )
+                    for field in partition_fields
+                },
+            )
+            for path, raw_partitions in self.files()
+        ]
+
+    def scan_file(
+        self,
+        path: str,
+        partitions: dict,
+        schema: Schema,
+        filters: list[tuple],
+        scan=None,
+    ) -> Iterator[RecordBatch]:
+        """Scans the columns of `schema` of a file, partition columns are
+        `LiteralValueVector`s of the values of the file. `scan(source, columns)`
+        reads the file columns, by default `source.scan(columns, filters)`."""
+        source = self.file_source(path)
+        file_columns = [f.name for f in schema.fields if f.name not in partitions]
+        if not file_columns:
+            # Only partition columns, one column is read to count the rows.
+            file_columns = [source.get_schema().fields[0].name]
+
+        if scan is None:
+            batches = source.scan(file_columns, filters)
+        else:
+            batches = scan(source, file_columns)
+        for batch in batches:
+            size = batch.physical_row_count
+            columns = []
+            for field in schema.fields:
+                if field.name in partitions:
+                    columns.append(
+                        LiteralValueVector(field.type, partitions[field.name], size)
+                    )
+                else:
+                    columns.append(
+                        batch.get_field(batch.schema.get_index_by_name(field.name))
+                    )
+            yield RecordBatch(schema, columns, batch.selection)
+
+
+def _scan_file(
+    source: PartitionedDataSource,
+    path: str,
+    partitions: dict,
+    schema: Schema,
+    filters: list[tuple],
+) -> list[RecordBatch]:
+    """Scans a file, runs in a worker process."""
+    return list(source.scan_file(path, partitions, schema, filters))
+
+
+def _convert_partition(value: str, type: ArrowType):
+    """The value of a partition column, of its inferred `type`."""
+    if value == "":
+        return None
+    match ArrowTypes.typecode(type):
+        case None:
+            return value
+        case "d":
+            return float(value)
+        case _:
+            return int(value)
@@ -0,0 +1,61 @@
+"""
+Prefetching of the record batches of a data source.
+"""
+
+from typing import Iterator
+
+from querypy.datasources import DataSource
+from querypy.datasources.io import BackgroundIterator
+from querypy.datasources.statistics import TableStatistics
+from querypy.types_ import RecordBatch
+from querypy.types_ import Schema
+
+
+class PrefetchingDataSource(DataSource):
+    """Scans a datasource in a background thread, reading and decoding the next
+    batches while operators process the current one.
+
+    At most `depth` batches are read ahead, the thread waits while operators are
+    behind. The thread releases the GIL while it waits for I/O, so read latency, e.g.
+    of network storage, is hidden behind the work of the operators.
+
+    Attributes
+    ----------
+    source : DataSource
+        The prefetched datasource.
+    depth : int
+        The maximum number of batches read ahead.
+    wait_time : float
+        The seconds operators waited for batches that were not read yet, if it's
+        close to zero the scans are not bound by I/O. Updated when a scan finishes.
+    waits : int
+        The number of batches operators waited for.
+    batches : int
+        The number of scanned batches.
+    """
+
+    def __init__(self, source: DataSource, depth: int = 2):
+        self.source = source
+        self.depth = depth
+        self.wait_time = 0.0
+        self.waits = 0
+        self.batches = 0
+
+    def get_schema(self) -> Schema:
+        return self.source.get_schema()
+
+    def statistics(self) -> TableStatistics | None:
+        return self.source.statistics()
+
+    def scan(
+        self, projection: list[str], filters: list[tuple] | None = None
+    ) -> Iterator[RecordBatch]:
+        batches = BackgroundIterator(self.source.scan(projection, filters), self.depth)
+        try:
+            for batch in batches:
+                self.batches += 1
+                yield batch
+        finally:
+            batches.close()
+            self.wait_time += batches.wait_time
+            self.waits += batches.waits
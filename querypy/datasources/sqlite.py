@@ -0,0 +1,181 @@
+"""
+A data source over the tables of SQLite databases.
+
+Scans are translated into a `SELECT` of the projected columns, and the pushed
+down filters become its `WHERE` clause, so SQLite can use the indexes of the table
+and rows that cannot match never cross into Python.
+"""
+
+import os
+import sqlite3
+from typing import Iterator
+from urllib.request import pathname2url
+
+from querypy.datasources import DEFAULT_BATCH_SIZE
+from querypy.datasources import DataSource
+from querypy.datasources.statistics import TableStatistics
+from querypy.datasources.statistics import sample_statistics
+from querypy.types_ import ArrowType
+from querypy.types_ import ArrowTypes
+from querypy.types_ import ColumnVector
+from querypy.types_ import Field
+from querypy.types_ import RecordBatch
+from querypy.types_ import Schema
+from querypy.types_ import dictionary_encode
+
+# The operators of the filters that can be pushed into the `WHERE` clause.
+_OPERATORS = {"=", ">", ">=", "<", "<="}
+
+
+class SQLiteDataSource(DataSource):
+    """A datasource to read a table, or a view, of a SQLite database.
+
+    The database is opened read-only, the rows are streamed with `fetchmany`, in
+    record batches of `batch_size` rows.
+
+    The type of a column comes from its declared type, following the affinity rules
+    of SQLite: 'INT' types are 64-bit integers, 'REAL', 'FLOA' and 'DOUB' types
+    are doubles, any other type is a string.
+
+    Attributes
+    ----------
+    path : str
+        The path of the database file.
+    table : str
+        The name of the table.
+    batch_size : int
+        The maximum number of rows of the scanned record batches.
+    dictionary_threshold : int
+        String columns with at most this many distinct values (and no more than
+        half the rows of a batch) are dictionary-encoded.
+    sample_size : int
+        The number of rows used to estimate the statistics of the table.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        table: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dictionary_threshold: int = 1024,
+        sample_size: int = 1000,
+    ):
+        self.path = path
+        self.table = table
+        self.batch_size = batch_size
+        self.dictionary_threshold = dictionary_threshold
+        self.sample_size = sample_size
+        self._statistics = None
+
+    def connect(self) -> sqlite3.Connection:
+        """A read-only connection to the database, a missing database is an error
+        instead of a new empty one."""
+        uri = f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro"
+        return sqlite3.connect(uri, uri=True)
+
+    def get_schema(self) -> Schema:
+        connection = self.connect()
+        try:
+            columns = connection.execute(
+                f"PRAGMA table_info({quote_identifier(self.table)})"
+            ).fetchall()
+        finally:
+            connection.close()
+        if not columns:
+            raise FileNotFoundError(f"No table {self.table!r} in {self.path!r}")
+        # (cid, name, type, notnull, default value, pk)
+        return Schema([Field(column[1], column_type(column[2])) for column in columns])
+
+    def statistics(self) -> TableStatistics:
+        """The statistics of the table, the number of rows is counted by SQLite, the
+        statistics of the columns are estimated from its first `sample_size` rows.
+        They are computed once, the size is the size of the whole database."""
+        if self._statistics is None:
+            schema = self.get_schema()
+            query, parameters = self.query(schema, [])
+            connection = self.connect()
+            try:
+                (row_count,) = connection.execute(
+                    f"SELECT COUNT(*) FROM {quote_identifier(self.table)}"
+                ).fetchone()
+                rows = connection.execute(
+                    query + " LIMIT ?", parameters + [self.sample_size]
+                ).fetchall()
+            finally:
+                connection.close()
+            self._statistics = sample_statistics(
+                self.to_record_batch(schema, rows), row_count, os.path.getsize(self.path)
+            )
+        return self._statistics
+
+    def scan(
+        self, projection: list[str], filters: list[tuple] | None = None
+    ) -> Iterator[RecordBatch]:
+        """Reads the `projection` columns of the rows that match the `filters`.
+
+        Parameters
+        ----------
+        projection : list[str]
+            The columns to read, all of them if empty.
+        filters : list[tuple] | None
+            The `(column, op, value)` conditions, they are evaluated by SQLite.
+
+        Yields
+        ------
+        RecordBatch
+            The read record batches, of at most `batch_size` rows.
+        """
+        schema = self.get_schema().select(projection)
+        query, parameters = self.query(schema, filters or [])
+        connection = self.connect()
+        try:
+            cursor = connection.execute(query, parameters)
+            while rows := cursor.fetchmany(self.batch_size):
+                yield self.to_record_batch(schema, rows)
+        finally:
+            connection.close()
+
+    def query(self, schema: Schema, filters: list[tuple]) -> tuple[str, list]:
+        """The `SELECT` statement of a scan of the `schema` columns, and its
+        parameters, the values of the `filters`."""
+        columns = ", ".join(quote_identifier(field.name) for field in schema.fields)
+        query = f"SELECT {columns} FROM {quote_identifier(self.table)}"
+        conditions = [
+            (column, op, value) for column, op, value in filters if op in _OPERATORS
+        ]
+        if conditions:
+            query += " WHERE " + " AND ".join(
+                f"{quote_identifier(column)} {op} ?" for column, op, _ in conditions
+            )
+        return query, [value for _, _, value in conditions]
+
+    def to_record_batch(self, schema: Schema, rows: list[tuple]) -> RecordBatch:
+        """Builds a `RecordBatch` from the fetched rows, low cardinality string
+        columns are dictionary-encoded."""
+        columns = []
+        values = list(zip(*rows)) or [()] * len(schema.fields)
+        for field, column in zip(schema.fields, values):
+            column = list(column)
+            if field.type is ArrowTypes.StringType:
+                max_cardinality = min(self.dictionary_threshold, len(column) // 2)
+                columns.append(dictionary_encode(field.type, column, max_cardinality))
+            else:
+                columns.append(ColumnVector.from_pylist(field.type, column))
+        return RecordBatch(schema, columns)
+
+
+def column_type(declared_type: str) -> ArrowType:
+    """The type of a column of `declared_type`, see the type affinity of
+    SQLite: https://www.sqlite.org/datatype3.html#determination_of_column_affinity"""
+    declared_type = declared_type.upper()
+    if "INT" in declared_type:
+        return ArrowTypes.Int64Type
+    if any(name in declared_type for name in ("CHAR", "CLOB", "TEXT")):
+        return ArrowTypes.StringType
+    if any(name in declared_type for name in ("REAL", "FLOA", "DOUB")):
+        return ArrowTypes.DoubleType
+    return ArrowTypes.StringType
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
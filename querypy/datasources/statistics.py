@@ -0,0 +1,264 @@
+"""
+Table statistics, what the planner knows about the size and the values of a data
+source before reading it, e.g. to choose the build side of a join.
+
+Statistics are estimates: data sources collect them cheaply, from a sample of
+rows or when a file is written, and cache them. Exact statistics are flagged as
+such.
+"""
+
+import math
+from collections import Counter
+from typing import Any
+from typing import Iterable
+
+from querypy.types_ import RecordBatch
+
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+
+class ColumnStatistics:
+    """The statistics of a column, unknown values are `None`.
+
+    Attributes
+    ----------
+    min : Any
+        The smallest value of the column.
+    max : Any
+        The biggest value of the column.
+    null_fraction : float | None
+        The fraction of the rows that are null.
+    distinct_count : int | None
+        The number of distinct values, nulls excluded.
+    """
+
+    def __init__(
+        self,
+        min: Any = None,
+        max: Any = None,
+        null_fraction: float | None = None,
+        distinct_count: int | None = None,
+    ):
+        self.min = min
+        self.max = max
+        self.null_fraction = null_fraction
+        self.distinct_count = distinct_count
+
+    def to_json(self) -> list:
+        return [self.min, self.max, self.null_fraction, self.distinct_count]
+
+    @classmethod
+    def from_json(cls, value: list) -> "ColumnStatistics":
+        return cls(*value)
+
+    def __repr__(self):
+        return (
+            f"ColumnStatistics(min={self.min!r}, max={self.max!r}, "
+            f"null_fraction={self.null_fraction}, distinct_count={self.distinct_count})"
+        )
+
+
+class TableStatistics:
+    """The statistics of a data source, unknown values are `None`.
+
+    Attributes
+    ----------
+    row_count : int | None
+        The number of rows.
+    size_bytes : int | None
+        The size of the data, e.g. of its files.
+    columns : dict[str, ColumnStatistics]
+        The statistics of the columns, by name.
+    exact : bool
+        Whether the statistics were computed from every row, otherwise they are
+        estimated, e.g. from a sample.
+    """
+
+    def __init__(
+        self,
+        row_count: int | None = None,
+        size_bytes: int | None = None,
+        columns: dict[str, ColumnStatistics] | None = None,
+        exact: bool = False,
+    ):
+        self.row_count = row_count
+        self.size_bytes = size_bytes
+        self.columns = columns or {}
+        self.exact = exact
+
+    def to_json(self) -> dict:
+        return {
+            "row_count": self.row_count,
+            "size_bytes": self.size_bytes,
+            "columns": {name: c.to_json() for name, c in self.columns.items()},
+            "exact": self.exact,
+        }
+
+    @classmethod
+    def from_json(cls, value: dict) -> "TableStatistics":
+        return cls(
+            value["row_count"],
+            value["size_bytes"],
+            {
+                name: ColumnStatistics.from_json(c)
+                for name, c in value["columns"].items()
+            },
+            value["exact"],
+        )
+
+    def __repr__(self):
+        return (
+            f"TableStatistics(row_count={self.row_count}, size_bytes={self.size_bytes}, "
+            f"exact={self.exact}, columns={self.columns})"
+        )
+
+
+def sample_statistics(
+    batch: RecordBatch, row_count: int | None, size_bytes: int | None
+) -> TableStatistics:
+    """Estimates the statistics of a table of `row_count` rows from a `batch` of
+    sampled rows. If the sample holds every row, the statistics are exact.
+
+    Distinct counts are extrapolated with `estimate_distinct_count`.
+    """
+    batch = batch.compact()
+    sampled = batch.row_count
+    exact = row_count is not None and sampled >= row_count
+    columns = {}
+    for field, vector in zip(batch.schema.fields, batch.fields):
+        values = [v for v in vector.to_pylist() if v is not None]
+        if exact or row_count is None or not sampled:
+            non_null_count = len(values)
+        else:
+            non_null_count = round(row_count * len(values) / sampled)
+        columns[field.name] = ColumnStatistics(
+            min(values, default=None),
+            max(values, default=None),
+            vector.null_count / sampled if sampled else None,
+            estimate_distinct_count(values, non_null_count),
+        )
+    return TableStatistics(row_count, size_bytes, columns, exact)
+
+
+def estimate_distinct_count(sample: list, row_count: int) -> int:
+    """Estimates the distinct values of a column of `row_count` non-null values from
+    a sample of them, with the GEE estimator (Charikar et al., 2000):
+    `sqrt(row_count / len(sample)) * f1 + sum(fj, j >= 2)`, where `fj` is the number
+    of values that appear `j` times in the sample."""
+    if not sample:
+        return 0
+    frequencies = Counter(Counter(sample).values())
+    if len(sample) >= row_count:
+        return sum(frequencies.values())
+    singletons = frequencies.pop(1, 0)
+    estimate = math.sqrt(row_count / len(sample)) * singletons + sum(frequencies.values())
+    return min(round(estimate), row_count)
+
+
+class DistinctCounter:
+    """Estimates the number of distinct values of a stream of values, with a k
+    minimum values sketch: only the `k` smallest hashes of the values are kept, if
+    hashes are uniform, the distinct count is `(k - 1) / kth_smallest_hash`.
+
+    Memory is bounded by `k`, with a relative error around `1 / sqrt(k)`, values are
+    counted exactly while there are less than `k` distinct hashes.
+
+    Hashes are those of the process, the sketch is not meant to be persisted.
+    """
+
+    def __init__(self, k: int = 1024):
+        self.k = k
+        self._hashes = set()
+        self._threshold = _HASH_MASK
+
+    def update(self, values: Iterable):
+        """Counts the non-null `values`."""
+        hashes = self._hashes
+        threshold = self._threshold
+        for value in values:
+            if value is None:
+                continue
+            h = _mix(hash(value))
+            if h < threshold and h not in hashes:
+                hashes.add(h)
+                if len(hashes) > 2 * self.k:
+                    threshold = self._shrink()
+                    hashes = self._hashes
+        self._shrink()
+
+    def estimate(self) -> int:
+        if len(self._hashes) < self.k:
+            return len(self._hashes)
+        return round((self.k - 1) * (_HASH_MASK + 1) / (self._threshold + 1))
+
+    def _shrink(self) -> int:
+        """Keeps the `k` smallest hashes, returns the biggest one kept."""
+        if len(self._hashes) >= self.k:
+            self._hashes = set(sorted(self._hashes)[: self.k])
+            self._threshold = max(self._hashes)
+        return self._threshold
+
+
+def _mix(h: int) -> int:
+    """Scrambles a Python hash into a uniform 64-bit value (splitmix64 finalizer),
+    hashes of small integers are the integers themselves."""
+    h &= _HASH_MASK
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _HASH_MASK
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _HASH_MASK
+    return h ^ (h >> 31)
+
+
+def with_file_statistics(
+    statistics: TableStatistics,
+    row_count: int | None,
+    column_statistics: dict[str, list] | None,
+) -> TableStatistics:
+    """The `statistics` of a file with its estimates replaced by the exact values
+    known of the file, e.g. counted by a scan: its number of rows and the
+    `[min, max, null_count]` of its columns, see `querypy.datasources.zonemap`."""
+    if row_count is None:
+        return statistics
+    columns = {}
+    for name, column in statistics.columns.items():
+        column = ColumnStatistics(
+            column.min, column.max, column.null_fraction, column.distinct_count
+        )
+        if column_statistics is not None and name in column_statistics:
+            column.min, column.max, null_count = column_statistics[name]
+            column.null_fraction = null_count / row_count if row_count else 0.0
+        if column.distinct_count is not None:
+            column.distinct_count = min(column.distinct_count, row_count)
+        columns[name] = column
+    return TableStatistics(row_count, statistics.size_bytes, columns, statistics.exact)
+
+
+def merge_table_statistics(statistics: list[TableStatistics]) -> TableStatistics:
+    """The statistics of the union of tables, e.g. of the files of a directory. The
+    distinct count of a column is the biggest of the tables, they are assumed to
+    hold the same values."""
+    known = [s.row_count for s in statistics if s.row_count is not None]
+    row_count = sum(known) if len(known) == len(statistics) else None
+    sizes = [s.size_bytes for s in statistics if s.size_bytes is not None]
+    size_bytes = sum(sizes) if len(sizes) == len(statistics) else None
+
+    columns = {}
+    for name in dict.fromkeys(name for s in statistics for name in s.columns):
+        parts = [(s.row_count, s.columns[name]) for s in statistics if name in s.columns]
+        lows = [c.min for _, c in parts if c.min is not None]
+        highs = [c.max for _, c in parts if c.max is not None]
+        fractions = [(rows, c.null_fraction) for rows, c in parts]
+        if all(rows is not None and f is not None for rows, f in fractions) and row_count:
+            null_fraction = sum(rows * f for rows, f in fractions) / row_count
+        else:
+            null_fraction = None
+        distinct_counts = [c.distinct_count for _, c in parts]
+        columns[name] = ColumnStatistics(
+            min(lows, default=None),
+            max(highs, default=None),
+            null_fraction,
+            None if None in distinct_counts else max(distinct_counts, default=0),
+        )
+    # distinct counts of many tables are estimates.
+    exact = len(statistics) == 1 and statistics[0].exact
+    return TableStatistics(row_count, size_bytes, columns, exact)
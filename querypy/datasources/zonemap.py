@@ -0,0 +1,98 @@
+"""
+Zone maps, the min/max/null count statistics of the chunks of a data source.
+
+A data source splits its data in chunks (row groups, byte ranges...) and records the
+statistics of every column of every chunk, as `[min, max, null_count]`. A scan
+with filters skips the chunks whose statistics prove that no row can match.
+
+Filters are conjunctions of `(column, op, value)` tuples, `op` is one of
+`=`, `>`, `>=`, `<`, `<=`, e.g. `[("salary", ">", 40000)]`. They are only a hint:
+rows of the chunks that are not skipped do not necessarily match them.
+"""
+
+from itertools import compress
+from typing import Any
+
+from querypy.types_ import ColumnVectorABC
+from querypy.types_ import DictionaryVector
+from querypy.types_ import RecordBatch
+from querypy.types_ import bitmap
+
+Filter = tuple[str, str, Any]
+
+
+def column_statistics(vector: ColumnVectorABC) -> list:
+    """The `[min, max, null_count]` of a vector, min and max are `None` if every
+    value is null."""
+    if isinstance(vector, DictionaryVector):
+        codes = vector.indices
+        if vector.null_count:
+            codes = compress(codes, bitmap.to_flags(vector.validity, vector.size))
+        dictionary = vector.dictionary.raw_values()
+        values = [dictionary[code] for code in set(codes)]
+    elif vector.null_count:
+        values = list(
+            compress(vector.raw_values(), bitmap.to_flags(vector.validity, vector.size))
+        )
+    else:
+        values = vector.raw_values()
+    return [min(values, default=None), max(values, default=None), vector.null_count]
+
+
+def batch_statistics(batch: RecordBatch) -> dict[str, list]:
+    """The statistics of every column of `batch`, by column name."""
+    batch = batch.compact()
+    return {
+        field.name: column_statistics(column)
+        for field, column in zip(batch.schema.fields, batch.fields)
+    }
+
+
+def merge_statistics(statistics: list[dict[str, list]]) -> dict[str, list]:
+    """The statistics of the union of chunks, from the statistics of every chunk."""
+    merged = {}
+    for chunk in statistics:
+        for column, (low, high, null_count) in chunk.items():
+            if column not in merged:
+                merged[column] = [low, high, null_count]
+                continue
+            m = merged[column]
+            if low is not None:
+                m[0] = low if m[0] is None else min(m[0], low)
+                m[1] = high if m[1] is None else max(m[1], high)
+            m[2] += null_count
+    return merged
+
+
+def may_match(statistics: dict[str, list], filters: list[Filter]) -> bool:
+    """Whether a chunk with `statistics` may hold rows matching `filters`.
+
+    Filters on columns without statistics, or with values that cannot be compared to
+    the statistics, may always match.
+    """
+    for column, op, value in filters:
+        if column not in statistics:
+            continue
+        low, high, _ = statistics[column]
+        if low is None:
+            # only nulls, comparing a null never matches.
+            return False
+        try:
+            match op:
+                case "=":
+                    matches = low <= value <= high
+                case ">":
+                    matches = high > value
+                case ">=":
+                    matches = high >= value
+                case "<":
+                    matches = low < value
+                case "<=":
+                    matches = low <= value
+                case _:
+                    matches = True
+        except TypeError:
+            matches = True
+        if not matches:
+            return False
+    return True
@@ -16,3 +16,13 @@ class UnknownColumnError(QueryEngineError):
 class AlreadyExistsColumnError(QueryEngineError):
     def __init__(self, col: str):
         super().__init__(f"Column {col} already exists")
+
+
+class ParseError(QueryEngineError):
+    def __init__(self, col: str, type):
+        super().__init__(f"Column {col!r} has values that are not {type!r}")
+
+
+class UnknownTableError(QueryEngineError):
+    def __init__(self, table: str):
+        super().__init__(f"No table named {table!r}")
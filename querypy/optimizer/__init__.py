@@ -10,7 +10,9 @@ from querypy.planner.expressions.logical import (
     Literal,
     Aggregate as AggregateExpr,
 )
-from querypy.planner.plans.logical import Aggregate, Projection, Filter, Scan
+from querypy.planner.plans.logical import Aggregate, Projection, Filter, Scan, Limit
+from querypy.planner.plans.logical import Join
+from querypy.planner.plans.logical import Sample
 from querypy.utils import get_text_tree
 
 
@@ -69,6 +71,31 @@ class ProjectionPushDown(OptimizerRule):
                     column_names.extend(extract_columns([ex], columns=column_names))
                 input = self.push_down(plan.input, column_names)
                 return Aggregate(input, plan.group_by, plan.aggregate)
+            case Limit():
+                input = self.push_down(plan.input, column_names)
+                return Limit(input, plan.limit, plan.offset)
+            case Sample():
+                input = self.push_down(plan.input, column_names)
+                return Sample(
+                    input, plan.fraction, plan.rows, plan.seed, plan.extrapolate
+                )
+            case Join():
+                # every side reads the columns it has, and its keys.
+                left_names = {f.name for f in plan.left.get_schema().fields}
+                right_names = {f.name for f in plan.right.get_schema().fields}
+                if not column_names:
+                    # every column of the join is read.
+                    column_names = [f.name for f in plan.get_schema().fields]
+                left = [name for name in column_names if name in left_names]
+                right = [name for name in column_names if name in right_names]
+                left += [l.name for l, _ in plan.on]
+                right += [r.name for _, r in plan.on]
+                return Join(
+                    self.push_down(plan.left, left),
+                    self.push_down(plan.right, right),
+                    plan.on,
+                    plan.how,
+                )
             case Scan():
                 column_names = list(set(column_names))
                 column_names.sort()
@@ -1,4 +1,15 @@
+import glob
+import os
+
+from querypy.datasources import DEFAULT_BATCH_SIZE
+from querypy.datasources.columnar import ColumnarFileDataSource
 from querypy.datasources.csv import CSVDataSource
+from querypy.datasources.jsonl import JsonLinesDataSource
+from querypy.datasources.memory import CachedDataSource
+from querypy.datasources.memory import get_table
+from querypy.datasources.partitioned import PartitionedDataSource
+from querypy.datasources.prefetch import PrefetchingDataSource
+from querypy.datasources.sqlite import SQLiteDataSource
 from querypy.planner.expressions import (
     LogicalExpression,
     LogicalPlan,
@@ -20,6 +31,12 @@ class DataFrame:
         Adds a filter plan, it parses strings into `logical.Column`
     aggregate(group_by: list[LogicalExpression] | list[str], aggr: list[AggregateExpr])
         Adds an aggregate plan.
+    limit(limit: int, offset: int)
+        Adds a limit plan.
+    sample(fraction: float, rows: int, seed: int, extrapolate: bool)
+        Adds a sample plan.
+    join(other: DataFrame, on: str | list[str] | list[tuple[str, str]], how: str)
+        Adds a join plan.
     schema()
         The schema of the logical plan.
     logical_plan()
@@ -159,8 +176,103 @@ class DataFrame:
             ]
         return DataFrame(logical_plan.OrderBy(self._plan, columns))
 
+    def limit(self, limit: int, offset: int = 0) -> "DataFrame":
+        """Keeps at most `limit` rows, skipping the first `offset` rows.
+
+        Parameters
+        ----------
+        limit : int
+            The maximum number of rows.
+        offset : int
+            The number of rows to skip (Default value = 0)
+
+        Returns
+        -------
+        DataFrame
+            A dataframe with a limit in its query plan.
+        """
+        return DataFrame(logical_plan.Limit(self._plan, limit, offset))
+
+    def sample(
+        self,
+        fraction: float | None = None,
+        rows: int | None = None,
+        seed: int | None = None,
+        extrapolate: bool = False,
+    ) -> "DataFrame":
+        """Keeps a random sample of the rows, e.g. for approximate queries.
+
+        A sample of a scan is read natively by data sources that can, only some
+        blocks of a file are read and parsed, see `DataSource.scan_sample`.
+
+        Parameters
+        ----------
+        fraction : float | None
+            The probability of every row to be sampled, between 0 and 1.
+        rows : int | None
+            The number of rows to sample, uniformly.
+        seed : int | None
+            The seed of the random sampling (Default value = None)
+        extrapolate : bool
+            Whether `SUM` and `COUNT` aggregates over the sample are scaled up to
+            estimate their value over every row (Default value = False)
+
+        Returns
+        -------
+        DataFrame
+            A dataframe with a sample in its query plan.
+        """
+        return DataFrame(
+            logical_plan.Sample(self._plan, fraction, rows, seed, extrapolate)
+        )
+
+    def join(
+        self,
+        other: "DataFrame",
+        on: str | list[str] | list[tuple[str, str]],
+        how: str = "inner",
+    ) -> "DataFrame":
+        """Joins the rows of this dataframe, the left one, and the rows of `other`
+        whose `on` columns are equal, see `querypy.planner.plans.logical.Join`.
+
+        Parameters
+        ----------
+        other : DataFrame
+            The right dataframe.
+        on : str | list[str] | list[tuple[str, str]]
+            The columns to join on, a name of a column of both dataframes, or
+            `(left column, right column)` pairs of names.
+        how : str
+            The type of the join: 'inner', 'left', 'semi' or 'anti'
+            (Default value = 'inner')
+
+        Returns
+        -------
+        DataFrame
+            A dataframe with a join in its query plan.
+
+        Raises
+        ------
+        ValueError
+            If `how` is not a type of join, or `on` is empty.
+        """
+        if isinstance(on, str):
+            on = [on]
+        on = [(name, name) if isinstance(name, str) else name for name in on]
+        on = [(Column(l), Column(r)) for l, r in on]
+        return DataFrame(logical_plan.Join(self._plan, other._plan, on, how))
+
     @classmethod
-    def scan_csv(cls, path: str, fields: list[str] = None) -> "DataFrame":
+    def scan_csv(
+        cls,
+        path: str,
+        fields: list[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers: int = 1,
+        schema: Schema | None = None,
+        cache: bool = False,
+        prefetch: bool = False,
+    ) -> "DataFrame":
         """Reads the `fields` from a csv files in a given `path`.
 
         It performs very basic csv parsing, more diverse csv formats might not be
@@ -169,17 +281,171 @@ class DataFrame:
         Parameters
         ----------
         path : str
-            The local filesystem path for the csv. e.g. 'employees.csv', it only supports
-             one file.
+            The local filesystem path for the csv. e.g. 'employees.csv', a directory or
+            a glob pattern reads many files as one table, with the `key=value`
+            directories as columns, see `PartitionedDataSource`.
         fields : list[str]
             The fields to read (Default value = None)
+        batch_size : int
+            The maximum number of rows of every scanned record batch.
+        workers : int
+            The number of processes that parse the file in parallel, compressed files
+            are parsed by a single process, and decompressed in a background thread
+            if it's bigger than one (Default value = 1)
+        schema : Schema | None
+            The schema of the file, it skips inferring it (Default value = None)
+        cache : bool
+            Whether the parsed columns are kept in the scan cache of the session, to be
+            reused while the file does not change, see `CachedDataSource`
+            (Default value = False)
+        prefetch : bool
+            Whether the file is read in a background thread, ahead of the operators,
+            see `PrefetchingDataSource` (Default value = False)
 
         Returns
         -------
         'DataFrame'
             A dataframe with a plan to read csv in its logical plan.
         """
-        return DataFrame(logical_plan.Scan(path, CSVDataSource(path), fields))
+        if os.path.isdir(path) or glob.has_magic(path):
+            datasource = PartitionedDataSource(
+                path,
+                CSVDataSource,
+                {"batch_size": batch_size, "schema": schema},
+                workers=workers,
+            )
+        else:
+            datasource = CSVDataSource(
+                path, batch_size=batch_size, schema=schema, workers=workers
+            )
+        if cache:
+            datasource = CachedDataSource(datasource)
+        if prefetch:
+            datasource = PrefetchingDataSource(datasource)
+        return DataFrame(logical_plan.Scan(path, datasource, fields))
+
+    @classmethod
+    def table(cls, name: str, fields: list[str] = None) -> "DataFrame":
+        """Reads the `fields` of a table registered with `register_table`.
+
+        Parameters
+        ----------
+        name : str
+            The name of the table.
+        fields : list[str]
+            The fields to read (Default value = None)
+
+        Returns
+        -------
+        'DataFrame'
+            A dataframe with a plan to read the table in its logical plan.
+
+        Raises
+        ------
+        UnknownTableError
+            If there is no table named `name`.
+        """
+        return DataFrame(logical_plan.Scan(name, get_table(name), fields))
+
+    @classmethod
+    def scan_columnar(
+        cls,
+        path: str,
+        fields: list[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> "DataFrame":
+        """Reads the `fields` from a querypy columnar file, see `write_columnar`.
+
+        Parameters
+        ----------
+        path : str
+            The local filesystem path of the file.
+        fields : list[str]
+            The fields to read (Default value = None)
+        batch_size : int
+            The maximum number of rows of every scanned record batch.
+
+        Returns
+        -------
+        'DataFrame'
+            A dataframe with a plan to read the file in its logical plan.
+        """
+        return DataFrame(
+            logical_plan.Scan(
+                path, ColumnarFileDataSource(path, batch_size=batch_size), fields
+            )
+        )
+
+    @classmethod
+    def scan_jsonl(
+        cls,
+        path: str,
+        fields: list[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers: int = 1,
+        schema: Schema | None = None,
+    ) -> "DataFrame":
+        """Reads the `fields` from a newline-delimited JSON file, see
+        `JsonLinesDataSource`.
+
+        Parameters
+        ----------
+        path : str
+            The local filesystem path of the file.
+        fields : list[str]
+            The fields to read (Default value = None)
+        batch_size : int
+            The maximum number of rows of every scanned record batch.
+        workers : int
+            The number of processes that parse the file in parallel, compressed files
+            are parsed by a single process, and decompressed in a background thread
+            if it's bigger than one (Default value = 1)
+        schema : Schema | None
+            The schema of the file, it skips inferring it (Default value = None)
+
+        Returns
+        -------
+        'DataFrame'
+            A dataframe with a plan to read the file in its logical plan.
+        """
+        datasource = JsonLinesDataSource(
+            path, batch_size=batch_size, schema=schema, workers=workers
+        )
+        return DataFrame(logical_plan.Scan(path, datasource, fields))
+
+    @classmethod
+    def scan_sqlite(
+        cls,
+        path: str,
+        table: str,
+        fields: list[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> "DataFrame":
+        """Reads the `fields` of a table of a SQLite database.
+
+        Parameters
+        ----------
+        path : str
+            The local filesystem path of the database.
+        table : str
+            The name of the table, or view.
+        fields : list[str]
+            The fields to read (Default value = None)
+        batch_size : int
+            The maximum number of rows of every scanned record batch.
+
+        Returns
+        -------
+        'DataFrame'
+            A dataframe with a plan to read the table in its logical plan.
+        """
+        return DataFrame(
+            logical_plan.Scan(
+                f"{path}:{table}",
+                SQLiteDataSource(path, table, batch_size=batch_size),
+                fields,
+            )
+        )
 
 
 def col(name: str) -> logical_expression.Column:
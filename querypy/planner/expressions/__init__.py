@@ -1,4 +1,5 @@
 import abc
+from typing import Iterator
 
 from querypy.types_ import ColumnVector, RecordBatch, Schema
 from querypy.types_ import Field
@@ -68,7 +69,14 @@ class PhysicalPlan(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def execute(self) -> list[RecordBatch]:
+    def execute(self) -> Iterator[RecordBatch]:
+        """Executes the plan as a stream of record batches, pulled one at a time.
+
+        Operators pull the batches of their inputs as they need them: non-blocking
+        operators, e.g. a filter, yield a batch per input batch, so only about one
+        batch per pipeline is held in memory. Blocking operators, e.g. an aggregate,
+        read their whole input and emit their result once, at the end.
+        """
         pass
 
     @abc.abstractmethod
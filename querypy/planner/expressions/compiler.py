@@ -0,0 +1,218 @@
+"""
+A compiler of physical expression trees into Python functions.
+
+An expression tree, e.g. `#5 * (1 - #6) * (1 + #7)`, is evaluated node by node:
+every `Binary` node evaluates its children into vectors and computes a new one, so
+a tree of `n` operators allocates `n - 1` intermediate vectors. The compiler
+generates the source of a function that evaluates the whole tree in a single
+comprehension over the input columns, without intermediate vectors:
+
+    def evaluate(c5, c6, c7, k0, k1):
+        return [((v5 * (k0 - v6)) * (k1 + v7)) for v5, v6, v7 in zip(c5, c6, c7)]
+
+Literals are parameters of the function, so trees that only differ in their
+literals share it. Functions are cached by their source, the fingerprint of the
+tree.
+"""
+
+import operator
+from array import array
+from typing import Callable
+
+from querypy.planner.expressions import PhysicalExpression
+from querypy.planner.expressions import kernels
+from querypy.planner.expressions import physical
+from querypy.types_ import ArrowType
+from querypy.types_ import ArrowTypes
+from querypy.types_ import ColumnVector
+from querypy.types_ import ColumnVectorABC
+from querypy.types_ import RecordBatch
+
+# The Python operators of the physical operators.
+_SYMBOLS = {
+    operator.add: "+",
+    operator.sub: "-",
+    operator.mul: "*",
+    operator.truediv: "/",
+    operator.eq: "==",
+    operator.gt: ">",
+    operator.lt: "<",
+}
+
+# The types of the literals.
+_LITERAL_TYPES = {
+    physical.LiteralInteger: ArrowTypes.Int32Type,
+    physical.LiteralFloat: ArrowTypes.FloatType,
+    physical.LiteralString: ArrowTypes.StringType,
+}
+
+# source -> compiled function
+_FUNCTIONS: dict[str, Callable] = {}
+
+
+class CompiledExpression(PhysicalExpression):
+    """
+    A physical expression evaluated by a compiled function, see
+    `compile_expression`.
+
+    The function handles the common case, input columns without nulls, otherwise
+    the expression is evaluated node by node, e.g. so that nulls are propagated,
+    and so are the errors of unsupported types.
+
+    Attributes
+    ----------
+    expr : PhysicalExpression
+        The compiled expression.
+    columns : list[int]
+        The indices of the input columns of the function, in order of its
+        parameters.
+    literals : list
+        The values of the literals, the last parameters of the function.
+    source : str
+        The source of the function.
+    function : Callable
+        The compiled function, it returns the list of the values of the expression.
+    """
+
+    def __init__(self, expr: PhysicalExpression):
+        self.expr = expr
+        self.columns = []
+        self.literals = []
+        body = self._generate(expr)
+        if len(self.columns) == 1:
+            loop = f"for v{self.columns[0]} in c{self.columns[0]}"
+        else:
+            values = ", ".join(f"v{i}" for i in self.columns)
+            columns = ", ".join(f"c{i}" for i in self.columns)
+            loop = f"for {values} in zip({columns})"
+        parameters = [f"c{i}" for i in self.columns]
+        parameters += [f"k{i}" for i in range(len(self.literals))]
+        self.source = (
+            f"def evaluate({', '.join(parameters)}):\n"
+            f"    return [{body} {loop}]\n"
+        )
+        self.function = _compile(self.source)
+
+    def _generate(self, expr: PhysicalExpression) -> str:
+        """The Python expression of `expr`, over the values `v<i>` of the columns
+        and the literals `k<i>`."""
+        match expr:
+            case physical.Column():
+                if expr.i not in self.columns:
+                    self.columns.append(expr.i)
+                return f"v{expr.i}"
+            case physical.Literal():
+                self.literals.append(expr.value)
+                return f"k{len(self.literals) - 1}"
+            case physical.MathOperation() | physical.Boolean():
+                l = self._generate(expr.l)
+                r = self._generate(expr.r)
+                return f"({l} {_SYMBOLS[expr.op]} {r})"
+        raise TypeError(f"{expr!r} cannot be compiled")
+
+    def evaluate(self, input: RecordBatch) -> ColumnVectorABC:
+        vectors = [input.get_field(i) for i in self.columns]
+        result_type = _result_type(self.expr, input)
+        if result_type is None or any(v.null_count for v in vectors):
+            return self.expr.evaluate(input)
+
+        values = self.function(*(v.raw_values() for v in vectors), *self.literals)
+        if isinstance(self.expr, physical.Boolean):
+            mask = array("b", bytes(values))
+            return ColumnVector(ArrowTypes.Int8Type, mask, len(mask))
+        try:
+            values = array(ArrowTypes.typecode(result_type), values)
+        except OverflowError:
+            # e.g. a product that overflows an `Int32Type`, see `from_pylist`.
+            pass
+        return ColumnVector(result_type, values, len(values))
+
+    def __repr__(self):
+        return repr(self.expr)
+
+
+def _compile(source: str) -> Callable:
+    """The function defined by `source`, compiled once."""
+    function = _FUNCTIONS.get(source)
+    if function is None:
+        namespace = {}
+        exec(compile(source, "<compiled expression>", "exec"), namespace)
+        function = _FUNCTIONS[source] = namespace["evaluate"]
+    return function
+
+
+def _result_type(expr: PhysicalExpression, input: RecordBatch) -> ArrowType | None:
+    """The type of the values of `expr` evaluated over `input`, `None` if an
+    operation is not supported for the types of its operands."""
+    match expr:
+        case physical.Column():
+            return input.get_field(expr.i).type
+        case physical.Literal():
+            return _LITERAL_TYPES[type(expr)]
+        case physical.MathOperation() | physical.Boolean():
+            l = _result_type(expr.l, input)
+            r = _result_type(expr.r, input)
+            if l is None or r is None or not expr.is_operation_supported(l, r):
+                return None
+            if isinstance(expr, physical.Boolean):
+                return ArrowTypes.Int8Type
+            return kernels.arithmetic_result_type(expr.op, l, r)
+    return None
+
+
+def _operations(expr: PhysicalExpression) -> int:
+    """The number of operators of the tree, `-1` if it cannot be compiled."""
+    if isinstance(expr, physical.Column) or type(expr) in _LITERAL_TYPES:
+        return 0
+    if isinstance(expr, (physical.MathOperation, physical.Boolean)):
+        l, r = _operations(expr.l), _operations(expr.r)
+        return -1 if l < 0 or r < 0 or expr.op not in _SYMBOLS else l + r + 1
+    return -1
+
+
+def compile_expression(expr: PhysicalExpression) -> PhysicalExpression:
+    """Compiles an expression tree of at least two operators over some column, e.g.
+    `#1 * (1 - #2)`, into a `CompiledExpression`. Other expressions are returned as
+    they are: a single operator is already evaluated by a vectorized kernel, see
+    `querypy.planner.expressions.kernels`."""
+    if _operations(expr) < 2 or not _has_column(expr):
+        return expr
+    return CompiledExpression(expr)
+
+
+def _has_column(expr: PhysicalExpression) -> bool:
+    if isinstance(expr, physical.Column):
+        return True
+    if isinstance(expr, physical.Binary):
+        return _has_column(expr.l) or _has_column(expr.r)
+    return False
+
+
+def referenced_columns(expr: PhysicalExpression) -> set[int]:
+    """The indices of the columns read by an expression tree."""
+    match expr:
+        case CompiledExpression():
+            return referenced_columns(expr.expr)
+        case physical.Column():
+            return {expr.i}
+        case physical.Binary():
+            return referenced_columns(expr.l) | referenced_columns(expr.r)
+    return set()
+
+
+def rebind_columns(
+    expr: PhysicalExpression, mapping: dict[int, int]
+) -> PhysicalExpression:
+    """A copy of an expression tree of operators that reads the column
+    `mapping[i]` instead of every column `i`, e.g. to evaluate it over a batch of
+    only the columns it reads."""
+    match expr:
+        case CompiledExpression():
+            return CompiledExpression(rebind_columns(expr.expr, mapping))
+        case physical.Column():
+            return physical.Column(mapping[expr.i])
+        case physical.Binary():
+            l = rebind_columns(expr.l, mapping)
+            r = rebind_columns(expr.r, mapping)
+            return type(expr)(l, r)
+    return expr
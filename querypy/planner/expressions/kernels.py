@@ -0,0 +1,172 @@
+"""
+Vectorized kernels of the binary expressions.
+
+A kernel computes an operator over whole columns at once, e.g. `Gt(#0, 10)` is
+`map(operator.gt, values, repeat(10))`, instead of a Python loop that calls
+`get_value` on both vectors and the operator method of the expression per row.
+The loop runs in C, only the operator itself is called per row.
+
+Kernels are specialized by the shape of their operands: a literal operand is a
+`LiteralValueVector`, its value is used as a scalar and never expanded into a
+column, and an operation of two literals is computed once.
+
+Kernels are looked up in a registry keyed by `(operator, left shape, right
+shape)`, see `get_kernel`. They don't depend on the types of the operands: the
+values of typed buffers and lists are Python objects once they are iterated,
+and there are no array-level operations over typed buffers in the standard
+library. The types only decide the type of the result, see
+`arithmetic_result_type`.
+"""
+
+import operator
+from array import array
+from itertools import repeat
+from typing import Any
+from typing import Callable
+from typing import Iterable
+
+from querypy.types_ import ArrowType
+from querypy.types_ import ArrowTypes
+from querypy.types_ import ColumnVector
+from querypy.types_ import ColumnVectorABC
+from querypy.types_ import LiteralValueVector
+from querypy.types_ import bitmap
+
+# The shapes of the operands of a kernel.
+VECTOR = "vector"
+SCALAR = "scalar"
+
+# (operator, left shape, right shape) -> kernel
+_KERNELS: dict[tuple, Callable[[Any, Any], Iterable]] = {}
+
+
+def get_kernel(
+    op: Callable, left_shape: str, right_shape: str
+) -> Callable[[Any, Any], Iterable]:
+    """The kernel of `op` for operands of the given shapes. It takes the values of
+    the operands, a scalar or the raw values of a vector, and returns the results,
+    an iterable for vectors, the value for two scalars.
+
+    Kernels are built the first time they are needed.
+    """
+    key = (op, left_shape, right_shape)
+    kernel = _KERNELS.get(key)
+    if kernel is None:
+        kernel = _KERNELS[key] = _build_kernel(op, left_shape, right_shape)
+    return kernel
+
+
+def _build_kernel(op: Callable, left_shape: str, right_shape: str) -> Callable:
+    if left_shape == SCALAR and right_shape == SCALAR:
+        return op
+    if right_shape == SCALAR:
+        return lambda values, scalar: map(op, values, repeat(scalar))
+    if left_shape == SCALAR:
+        return lambda scalar, values: map(op, repeat(scalar), values)
+    return lambda left, right: map(op, left, right)
+
+
+def _operand(vector: ColumnVectorABC) -> tuple[str, Any]:
+    """The shape of an operand, and its values: the value of a literal, or the
+    raw values of a vector."""
+    if isinstance(vector, LiteralValueVector):
+        return SCALAR, vector.value
+    return VECTOR, vector.raw_values()
+
+
+def arithmetic_result_type(
+    op: Callable, left: ArrowType, right: ArrowType
+) -> ArrowType:
+    """The type of the result of an arithmetic `op`, the type of its widest operand.
+    Integers are widened to floats by a division or a float operand, and they are
+    at least `Int32Type`, e.g. the sum of two masks."""
+    floats = ArrowTypes.typecode(left) == "d" or ArrowTypes.typecode(right) == "d"
+    if op is operator.truediv or floats:
+        if ArrowTypes.DoubleType in (left, right):
+            return ArrowTypes.DoubleType
+        return ArrowTypes.FloatType
+    if max(left.maxsize, right.maxsize) > 32:
+        return ArrowTypes.Int64Type
+    return ArrowTypes.Int32Type
+
+
+def arithmetic(
+    op: Callable, left: ColumnVectorABC, right: ColumnVectorABC
+) -> ColumnVectorABC:
+    """Computes an arithmetic `op`, e.g. `operator.add`, of two vectors.
+
+    The result of two literals is a literal. Null slots only hold placeholders,
+    they are not operated on, e.g. to not divide by a placeholder zero.
+    """
+    result_type = arithmetic_result_type(op, left.type, right.type)
+    (left_shape, l), (right_shape, r) = _operand(left), _operand(right)
+    if _is_null_scalar(left_shape, l) or _is_null_scalar(right_shape, r):
+        return LiteralValueVector(result_type, None, left.size)
+    kernel = get_kernel(op, left_shape, right_shape)
+    if left_shape == SCALAR and right_shape == SCALAR:
+        return LiteralValueVector(result_type, kernel(l, r), left.size)
+
+    validity = bitmap.bitmap_and(left.validity, right.validity, left.size)
+    if validity is None:
+        try:
+            values = array(ArrowTypes.typecode(result_type), kernel(l, r))
+        except OverflowError:
+            # e.g. a product that overflows an `Int32Type`, see `from_pylist`.
+            values = list(kernel(l, r))
+        return ColumnVector(result_type, values, len(values))
+
+    flags = bitmap.to_flags(validity, left.size)
+    l = repeat(l, left.size) if left_shape == SCALAR else l
+    r = repeat(r, right.size) if right_shape == SCALAR else r
+    values = [op(a, b) if v else 0 for a, b, v in zip(l, r, flags)]
+    return ColumnVector.from_pylist(result_type, values, validity)
+
+
+def compare(
+    op: Callable, left: ColumnVectorABC, right: ColumnVectorABC
+) -> ColumnVector:
+    """Computes a comparison `op`, e.g. `operator.gt`, of two vectors into a mask,
+    a 0/1 `Int8Type` vector.
+
+    Comparing a null is null, its placeholder is 0 so the row never passes a
+    filter.
+    """
+    (left_shape, l), (right_shape, r) = _operand(left), _operand(right)
+    size = left.size
+    if _is_null_scalar(left_shape, l) or _is_null_scalar(right_shape, r):
+        return ColumnVector(
+            ArrowTypes.Int8Type, array("b", bytes(size)), size,
+            bytearray(bitmap.num_bytes(size)),
+        )
+    kernel = get_kernel(op, left_shape, right_shape)
+    if left_shape == SCALAR and right_shape == SCALAR:
+        return ColumnVector(
+            ArrowTypes.Int8Type, array("b", bytes([kernel(l, r)]) * size), size
+        )
+
+    validity = bitmap.bitmap_and(left.validity, right.validity, size)
+    if validity is None:
+        # bytes of the booleans, then reinterpreted as a buffer of int8.
+        return ColumnVector(ArrowTypes.Int8Type, array("b", bytes(kernel(l, r))), size)
+
+    flags = bitmap.to_flags(validity, size)
+    if _is_typed(left, left_shape) and _is_typed(right, right_shape):
+        # placeholders of typed buffers are numbers, they are compared and masked.
+        mask = bytes(map(operator.and_, kernel(l, r), flags))
+    else:
+        l = repeat(l, size) if left_shape == SCALAR else l
+        r = repeat(r, size) if right_shape == SCALAR else r
+        mask = bytes(op(a, b) if v else 0 for a, b, v in zip(l, r, flags))
+    return ColumnVector(ArrowTypes.Int8Type, array("b", mask), size, validity)
+
+
+def _is_null_scalar(shape: str, value: Any) -> bool:
+    """Whether the operand is a null literal, e.g. a missing partition value, any
+    operation with it is null."""
+    return shape == SCALAR and value is None
+
+
+def _is_typed(vector: ColumnVectorABC, shape: str) -> bool:
+    """Whether the null placeholders of the operand can be operated on."""
+    return shape == SCALAR or ArrowTypes.typecode(vector.type) is not None
+
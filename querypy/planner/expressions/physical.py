@@ -1,13 +1,21 @@
 import abc
+import operator
 import typing
+from array import array
+from itertools import compress
+from itertools import repeat
+from operator import and_
 
 from querypy.planner.expressions import PhysicalExpression
+from querypy.planner.expressions import kernels
 from querypy.types_ import ArrowType
 from querypy.types_ import ArrowTypes
 from querypy.types_ import ColumnVector
 from querypy.types_ import ColumnVectorABC
+from querypy.types_ import DictionaryVector
 from querypy.types_ import LiteralValueVector
 from querypy.types_ import RecordBatch
+from querypy.types_ import bitmap
 
 
 class Column(PhysicalExpression):
@@ -48,7 +56,7 @@ class LiteralString(Literal):
         return LiteralValueVector(
             ArrowTypes.StringType,
             self.value,
-            input.row_count
+            input.physical_row_count
         )
 
 
@@ -62,7 +70,7 @@ class LiteralInteger(Literal):
 
     def evaluate(self, input: RecordBatch) -> ColumnVectorABC:
         return LiteralValueVector(ArrowTypes.Int32Type, self.value,
-                                  input.row_count)
+                                  input.physical_row_count)
 
 
 class LiteralFloat(Literal):
@@ -75,7 +83,7 @@ class LiteralFloat(Literal):
 
     def evaluate(self, input: RecordBatch) -> ColumnVectorABC:
         return LiteralValueVector(ArrowTypes.FloatType, self.value,
-                                  input.row_count)
+                                  input.physical_row_count)
 
 
 class Binary(PhysicalExpression):
@@ -108,62 +116,87 @@ class Binary(PhysicalExpression):
 
 
 class MathOperation(Binary):
+    """
+    An arithmetic operation, computed by a vectorized kernel of its operator `op`,
+    see `querypy.planner.expressions.kernels`.
+    """
+
+    op: typing.Callable
+
     def evaluate(self, input: RecordBatch) -> ColumnVectorABC:
         ll, lr = super().evaluate(input)
-        result = [
-            self.operate(ll.get_value(i), lr.get_value(i)) for i in
-            range(len(ll))
-        ]
-        return ColumnVector(ArrowTypes.from_pyvalue(result[0]), result, ll.size)
+        return kernels.arithmetic(self.op, ll, lr)
+
+    def operate(self, l, r):
+        return self.op(l, r)
 
     def is_operation_supported(self, ty_l, ty_r) -> bool:
         # probably should go in the logical layer
-        match ty_l, ty_r:
-            case (ArrowTypes.FloatType, ArrowTypes.Int32Type):
-                return True
-            case (ArrowTypes.Int32Type, ArrowTypes.FloatType):
-                return True
-            case (ArrowTypes.Int32Type, ArrowTypes.Int32Type):
-                return True
-            case (ArrowTypes.FloatType, ArrowTypes.FloatType):
-                return True
-            case _:
-                return False
+        # numbers of any width, see `kernels.arithmetic_result_type`.
+        return (ArrowTypes.typecode(ty_l) is not None
+                and ArrowTypes.typecode(ty_r) is not None)
 
 
 class Subtract(MathOperation):
-    def operate(self, l, r):
-        return l - r
+    op = operator.sub
 
 
 class Add(MathOperation):
-    def operate(self, l, r):
-        return l + r
+    op = operator.add
 
 
 class Multiply(MathOperation):
-    def operate(self, l, r):
-        return l * r
+    op = operator.mul
 
 
 class Divide(MathOperation):
-    def operate(self, l, r):
-        return l / r
+    op = operator.truediv
 
 
 class Boolean(Binary):
+    """
+    A comparison, computed by a vectorized kernel of its operator `op`, see
+    `querypy.planner.expressions.kernels`.
+    """
+
+    op: typing.Callable
+
+    def is_operation_supported(self, ty_l, ty_r) -> bool:
+        if ty_l is ty_r:
+            return True
+        # numbers of different widths can be compared.
+        return (ArrowTypes.typecode(ty_l) is not None
+                and ArrowTypes.typecode(ty_r) is not None)
+
     def evaluate(self, input: RecordBatch) -> ColumnVectorABC:
         ll, lr = super().evaluate(input)
-        mask = [
-            int(self.compare(ll.get_value(i), lr.get_value(i), ll.type))
-            for i in range(len(ll))
-        ]
-        return ColumnVector(ArrowTypes.Int8Type, mask, ll.size)
+        if isinstance(ll, DictionaryVector) and isinstance(lr, LiteralValueVector):
+            validity = bitmap.bitmap_and(ll.validity, lr.validity, ll.size)
+            return self.evaluate_dictionary(ll, lr.value, False, validity)
+        if isinstance(lr, DictionaryVector) and isinstance(ll, LiteralValueVector):
+            validity = bitmap.bitmap_and(ll.validity, lr.validity, ll.size)
+            return self.evaluate_dictionary(lr, ll.value, True, validity)
+        return kernels.compare(self.op, ll, lr)
+
+    def evaluate_dictionary(
+        self, vector: DictionaryVector, literal, reversed: bool,
+        validity: bytearray | None
+    ) -> ColumnVector:
+        """Compares a dictionary-encoded vector against a literal, the literal is
+        compared once per distinct value, then the results are mapped to the codes."""
+        dictionary = vector.dictionary.raw_values()
+        if reversed:
+            results = bytes(map(self.op, repeat(literal), dictionary))
+        else:
+            results = bytes(map(self.op, dictionary, repeat(literal)))
+        mask = array("b", map(results.__getitem__, vector.indices))
+        if validity is not None:
+            mask = array("b", map(and_, mask, bitmap.to_flags(validity, vector.size)))
+        return ColumnVector(ArrowTypes.Int8Type, mask, vector.size, validity)
 
-    @abc.abstractmethod
     def compare(self, l, r, t: ArrowType) -> bool:
         """Evaluates the left and right value to boolean operation"""
-        pass
+        return self.op(l, r)
 
 
 class Eq(Boolean):
@@ -171,27 +204,33 @@ class Eq(Boolean):
     Physical implementation of equality.
     """
 
-    def compare(self, l, r, t) -> bool:
-        # We currently don't use the type, since most python object
-        # implement equality without much work.
-        return l == r
+    # We currently don't use the type, since most python object
+    # implement equality without much work.
+    op = operator.eq
 
 
 class Gt(Boolean):
-    def compare(self, l, r, t: ArrowType) -> bool:
-        return l > r
+    op = operator.gt
 
 
 class Lt(Boolean):
-    def compare(self, l, r, t: ArrowType) -> bool:
-        return l < r
+    op = operator.lt
 
 
 class Accumulator(abc.ABC):
+    """Accumulates the values of a group into a final value, null values are
+    ignored unless stated otherwise."""
+
     @abc.abstractmethod
     def accumulate(self, value):
         pass
 
+    def accumulate_vector(self, vector: ColumnVectorABC):
+        """Accumulates every value of `vector`, accumulators override it with
+        whole-vector operations."""
+        for i in range(vector.size):
+            self.accumulate(vector.get_value(i))
+
     @abc.abstractmethod
     def final_value(self) -> typing.Any:
         pass
@@ -204,44 +243,80 @@ class Accumulator(abc.ABC):
         )
 
 
+def _valid_values(vector: ColumnVectorABC) -> typing.Iterable:
+    """The values of a vector skipping nulls, without per row checks when
+    there are no nulls."""
+    if vector.null_count == 0:
+        return vector.raw_values()
+    return compress(vector.raw_values(),
+                    bitmap.to_flags(vector.validity, vector.size))
+
+
 class MaxAccumulator(Accumulator):
     def __init__(self):
         self.accumulated_values = 0
         self.value = None
 
     def accumulate(self, value):
+        if value is None:
+            return
         if self.value is None or value > self.value:
             self.value = value
         self.accumulated_values += 1
 
+    def accumulate_vector(self, vector: ColumnVectorABC):
+        value = max(_valid_values(vector), default=None)
+        if value is None:
+            return
+        if self.value is None or value > self.value:
+            self.value = value
+        self.accumulated_values += vector.size - vector.null_count
+
     def final_value(self) -> typing.Any:
         return self.value
 
 
 class CountAccumulator(Accumulator):
+    """Counts every value, including nulls, e.g. `COUNT(*)`."""
+
     def __init__(self):
         self.accumulated_values = 0
 
     def accumulate(self, _):
         self.accumulated_values += 1
 
+    def accumulate_vector(self, vector: ColumnVectorABC):
+        self.accumulated_values += vector.size
+
     def final_value(self) -> typing.Any:
         return self.accumulated_values
 
+
 class NullableAwareCountAccumulator(CountAccumulator):
     def accumulate(self, value):
         if value is not None:
             super().accumulate(value)
 
+    def accumulate_vector(self, vector: ColumnVectorABC):
+        # one pass over the bitmap.
+        self.accumulated_values += vector.size - vector.null_count
+
+
 class AvgAccumulator(Accumulator):
     def __init__(self):
         self.count = 0
         self.accumulated_values = 0
 
     def accumulate(self, value):
+        if value is None:
+            return
         self.count += 1
         self.accumulated_values += value
 
+    def accumulate_vector(self, vector: ColumnVectorABC):
+        self.count += vector.size - vector.null_count
+        self.accumulated_values += sum(_valid_values(vector))
+
     def final_value(self) -> typing.Any:
         if self.count == 0: return 0
         return self.accumulated_values / self.count
@@ -252,7 +327,11 @@ class SumAccumulator(Accumulator):
         self.accumulated_values = 0
 
     def accumulate(self, value):
-        self.accumulated_values += value
+        if value is not None:
+            self.accumulated_values += value
+
+    def accumulate_vector(self, vector: ColumnVectorABC):
+        self.accumulated_values += sum(_valid_values(vector))
 
     def final_value(self) -> typing.Any:
         return self.accumulated_values
@@ -307,6 +386,52 @@ class Sum(Aggregate):
         pass
 
 
+class ScaledAccumulator(Accumulator):
+    """Scales up the final value of another accumulator by the `scale_factor` of a
+    sample, read when the value is finalized. Integer values stay integers."""
+
+    def __init__(self, accumulator: Accumulator, sample):
+        self.accumulator = accumulator
+        self.sample = sample
+
+    @property
+    def accumulated_values(self):
+        return self.accumulator.accumulated_values
+
+    def accumulate(self, value):
+        self.accumulator.accumulate(value)
+
+    def accumulate_vector(self, vector: ColumnVectorABC):
+        self.accumulator.accumulate_vector(vector)
+
+    def final_value(self) -> typing.Any:
+        value = self.accumulator.final_value()
+        if value is None:
+            return None
+        scaled = value * self.sample.scale_factor
+        return round(scaled) if isinstance(value, int) else scaled
+
+
+class Extrapolated(Aggregate):
+    """An aggregate over a sample, e.g. a `Sum` or a `Count`, whose value is
+    extrapolated to the whole input of the sample. `sample` is the physical sample
+    plan, its `scale_factor` is known once it's executed."""
+
+    def __init__(self, aggregate: Aggregate, sample):
+        super().__init__(aggregate.expr)
+        self.aggregate = aggregate
+        self.sample = sample
+
+    def create_accumulator(self) -> Accumulator:
+        return ScaledAccumulator(self.aggregate.create_accumulator(), self.sample)
+
+    def evaluate(self, input: RecordBatch) -> ColumnVector:
+        pass
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.aggregate!r})"
+
+
 class Alias(Column):
     """Renames the column to the new name. It does not implement
     anything in the physical layer as this is just a metadata change
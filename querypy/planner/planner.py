@@ -7,6 +7,8 @@ from querypy.planner.expressions import (
 )
 from querypy.planner.expressions import logical as logical_expressions
 from querypy.planner.expressions import physical as physical_expressions
+from querypy.planner.expressions.compiler import compile_expression
+from querypy.planner.expressions.compiler import referenced_columns
 from querypy.planner.expressions.logical import MathOp
 from querypy.planner.plans import logical as logical_plans
 from querypy.planner.plans import physical as physical_plans
@@ -68,6 +70,34 @@ def create_physical_expr(
         f"Physical expression is not implemented for {type(expr), expr}")
 
 
+# The scan filter operators of the boolean expressions, and the operator used when
+# the column is on the right side, e.g. `5 < a` is `a > 5`.
+_SCAN_FILTER_OPS = {
+    "eq": ("=", "="),
+    "gt": (">", "<"),
+    "gteq": (">=", "<="),
+    "lt": ("<", ">"),
+    "lteq": ("<=", ">="),
+}
+
+
+def extract_scan_filters(expr: LogicalExpression) -> list[tuple]:
+    """The conditions of a filter expression that a scan can use to skip data,
+    as `(column, op, value)`: comparisons between a column and a literal, from
+    the conjunctions (`AND`) of the expression."""
+    match expr:
+        case logical_expressions.Boolean(name="and"):
+            return extract_scan_filters(expr.l) + extract_scan_filters(expr.r)
+        case logical_expressions.Boolean(name=name) if name in _SCAN_FILTER_OPS:
+            op, flipped_op = _SCAN_FILTER_OPS[name]
+            match expr.l, expr.r:
+                case logical_expressions.Column(), logical_expressions.Literal():
+                    return [(expr.l.name, op, expr.r.value)]
+                case logical_expressions.Literal(), logical_expressions.Column():
+                    return [(expr.r.name, flipped_op, expr.l.value)]
+    return []
+
+
 def create_physical_plan(plan: LogicalPlan) -> PhysicalPlan:
     match plan:
         case logical_plans.Scan():
@@ -77,50 +107,74 @@ def create_physical_plan(plan: LogicalPlan) -> PhysicalPlan:
             input = create_physical_plan(plan.input)
             projection_schema = Schema(
                 [e.to_field(plan.input) for e in plan.expr])
-            projection_expr = [create_physical_expr(e, plan.input) for e in
-                               plan.expr]
+            projection_expr = [
+                compile_expression(create_physical_expr(e, plan.input))
+                for e in plan.expr
+            ]
+            if (
+                isinstance(input, physical_plans.FusedScan)
+                and input.projection_expr is None
+            ):
+                # the projection is fused in the pipeline of the scan and the filter.
+                return physical_plans.FusedScan(
+                    input.scan, input.expr, projection_expr, projection_schema
+                )
             return physical_plans.Projection(input, projection_schema,
                                              projection_expr)
         case logical_plans.Filter():
             input = create_physical_plan(plan.input)
-            filter_expr = create_physical_expr(plan.expr, plan.input)
+            if isinstance(input, physical_plans.Scan):
+                # The scan skips the data that cannot match, the rest is filtered.
+                input = physical_plans.Scan(
+                    input.datasource,
+                    input.projection,
+                    extract_scan_filters(plan.expr),
+                    input.sample,
+                )
+            filter_expr = compile_expression(create_physical_expr(plan.expr, plan.input))
+            if (
+                isinstance(input, physical_plans.Scan)
+                and input.sample is None
+                and referenced_columns(filter_expr)
+            ):
+                # The scan only reads the other columns of the rows that pass.
+                return physical_plans.FusedScan(input, filter_expr)
             return physical_plans.Filter(input, filter_expr)
         case logical_plans.Aggregate():
             input = create_physical_plan(plan.input)
             group_expr = [
-                create_physical_expr(expr, plan.input) for expr in plan.group_by
+                compile_expression(create_physical_expr(expr, plan.input))
+                for expr in plan.group_by
             ]
             aggr = []
             for expr in plan.aggregate:
+                aggr_input = compile_expression(create_physical_expr(expr.expr, plan.input))
                 match expr.name:
                     case "MAX":
-                        aggr.append(
-                            physical_expressions.Max(
-                                create_physical_expr(expr.expr, plan.input)
-                            )
-                        )
+                        aggr.append(physical_expressions.Max(aggr_input))
                     case "COUNT":
                         aggr.append(
                             physical_expressions.Count(
-                                create_physical_expr(expr.expr, plan.input),
+                                aggr_input,
                                 ignore_nulls=expr.expr.name == '*',
                             )
                         )
                     case "AVG":
-                        aggr.append(
-                            physical_expressions.Avg(
-                                create_physical_expr(expr.expr, plan.input)
-                            )
-                        )
+                        aggr.append(physical_expressions.Avg(aggr_input))
                     case "SUM":
-                        aggr.append(
-                            physical_expressions.Sum(
-                                create_physical_expr(expr.expr, plan.input)
-                            )
-                        )
+                        aggr.append(physical_expressions.Sum(aggr_input))
                     case _ as e:
                         raise NotImplementedError(f"Not implemented for {e}")
 
+            sample = _input_sample(input)
+            if sample is not None and sample.extrapolate:
+                aggr = [
+                    physical_expressions.Extrapolated(expr, sample)
+                    if isinstance(expr, (physical_expressions.Sum, physical_expressions.Count))
+                    else expr
+                    for expr in aggr
+                ]
+
             return HashAggregate(
                 input,
                 group_expr=group_expr,
@@ -134,5 +188,86 @@ def create_physical_plan(plan: LogicalPlan) -> PhysicalPlan:
                 for (expr, ascending) in plan.order_by
             ]
             return physical_plans.OrderBy(input, order_by)
+        case logical_plans.Limit():
+            input = create_physical_plan(plan.input)
+            return physical_plans.Limit(input, plan.limit, plan.offset)
+        case logical_plans.Sample():
+            input = create_physical_plan(plan.input)
+            fraction = plan.fraction
+            fallback = None
+            if fraction is None and isinstance(input, physical_plans.Scan):
+                # A sample of rows is drawn from a sample of the scan, twice as big
+                # as needed, if the number of rows of the datasource is known. The
+                # whole scan is read if the sample is too small.
+                statistics = input.datasource.statistics()
+                if statistics is not None and statistics.row_count:
+                    fraction = 2 * plan.rows / statistics.row_count
+                    fraction = fraction if fraction < 1 else None
+                    fallback = input
+
+            sampled_input = False
+            if (
+                fraction is not None
+                and isinstance(input, physical_plans.Scan)
+                and input.sample is None
+            ):
+                input = physical_plans.Scan(
+                    input.datasource, input.projection, input.filters, (fraction, plan.seed)
+                )
+                sampled_input = True
+            return physical_plans.Sample(
+                input,
+                fraction,
+                plan.rows,
+                plan.seed,
+                sampled_input,
+                plan.extrapolate,
+                fallback,
+            )
+        case logical_plans.Join():
+            left = create_physical_plan(plan.left)
+            right = create_physical_plan(plan.right)
+            left_keys = [create_physical_expr(l, plan.left) for l, _ in plan.on]
+            right_keys = [create_physical_expr(r, plan.right) for _, r in plan.on]
+            # The hash table is built on the smaller input, the right one unless
+            # the statistics of both inputs tell otherwise.
+            left_rows = _estimated_row_count(left)
+            right_rows = _estimated_row_count(right)
+            build_left = (
+                left_rows is not None
+                and right_rows is not None
+                and left_rows < right_rows
+            )
+            return physical_plans.HashJoin(
+                left,
+                right,
+                left_keys,
+                right_keys,
+                plan.how,
+                plan.get_schema(),
+                plan.right_columns(),
+                "left" if build_left else "right",
+            )
     raise NotImplementedError(
         f"Physical plan is not implemented for {type(plan)}")
+
+
+def _input_sample(plan: PhysicalPlan) -> physical_plans.Sample | None:
+    """The sample that the rows of `plan` come from, through the plans that do not
+    change the number of rows they stand for."""
+    while isinstance(plan, (physical_plans.Filter, physical_plans.Projection)):
+        plan = plan.input
+    return plan if isinstance(plan, physical_plans.Sample) else None
+
+
+def _estimated_row_count(plan: PhysicalPlan) -> int | None:
+    """The number of rows of the datasource that `plan` scans, through the plans
+    that only drop rows or columns, `None` if it's unknown."""
+    while isinstance(
+        plan, (physical_plans.Filter, physical_plans.Projection, physical_plans.FusedScan)
+    ):
+        plan = plan.scan if isinstance(plan, physical_plans.FusedScan) else plan.input
+    if not isinstance(plan, physical_plans.Scan):
+        return None
+    statistics = plan.datasource.statistics()
+    return None if statistics is None else statistics.row_count
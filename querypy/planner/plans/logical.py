@@ -11,13 +11,16 @@ class Scan(LogicalPlan):
     """
     A logical scan, reading data from a given datasource,
     it mostly delegates work to the datasource.
+
+    The schema is derived the first time it's needed, creating a scan does not read
+    the datasource.
     """
 
     def __init__(self, path: str, datasource: DataSource, projection: list[str]):
         self.path = path
         self.datasource = datasource
         self.projection = projection
-        self.schema = self.derive_schema()
+        self.schema = None
 
     def derive_schema(self) -> Schema:
         """
@@ -34,6 +37,8 @@ class Scan(LogicalPlan):
         return schema
 
     def get_schema(self) -> Schema:
+        if self.schema is None:
+            self.schema = self.derive_schema()
         return self.schema
 
     def children(self) -> list["LogicalPlan"]:
@@ -135,3 +140,127 @@ class OrderBy(LogicalPlan):
             super().__repr__()
             + f"({[(col, ascending) for col, ascending in self.order_by]})"
         )
+
+
+class Limit(LogicalPlan):
+    """
+    A plan that keeps at most `limit` rows of its input, after skipping
+    `offset` rows.
+    """
+
+    def __init__(self, input: LogicalPlan, limit: int, offset: int = 0):
+        self.input = input
+        self.limit = limit
+        self.offset = offset
+
+    def get_schema(self) -> Schema:
+        return self.input.get_schema()
+
+    def children(self) -> list["LogicalPlan"]:
+        return [self.input]
+
+    def __repr__(self):
+        return super().__repr__() + f"(limit={self.limit}, offset={self.offset})"
+
+
+class Sample(LogicalPlan):
+    """
+    A plan that keeps a random sample of the rows of its input: every row with a
+    probability of `fraction`, or `rows` rows chosen uniformly, or `rows` rows out of
+    a `fraction` of the input if both are given.
+
+    With `extrapolate`, `SUM` and `COUNT` aggregates over the sample are scaled up
+    to estimate their value over the whole input.
+    """
+
+    def __init__(
+        self,
+        input: LogicalPlan,
+        fraction: float | None = None,
+        rows: int | None = None,
+        seed: int | None = None,
+        extrapolate: bool = False,
+    ):
+        if fraction is None and rows is None:
+            raise ValueError("A sample needs a fraction or a number of rows")
+        if fraction is not None and not 0 <= fraction <= 1:
+            raise ValueError(f"The fraction of a sample must be in [0, 1], not {fraction}")
+        self.input = input
+        self.fraction = fraction
+        self.rows = rows
+        self.seed = seed
+        self.extrapolate = extrapolate
+
+    def get_schema(self) -> Schema:
+        return self.input.get_schema()
+
+    def children(self) -> list["LogicalPlan"]:
+        return [self.input]
+
+    def __repr__(self):
+        return super().__repr__() + (
+            f"(fraction={self.fraction}, rows={self.rows}, seed={self.seed}, "
+            f"extrapolate={self.extrapolate})"
+        )
+
+
+# The types of joins, see `Join`.
+JOIN_TYPES = ("inner", "left", "semi", "anti")
+
+
+class Join(LogicalPlan):
+    """
+    A plan that joins the rows of two inputs whose `on` columns are equal, `on` is a
+    list of `(left column, right column)` pairs.
+
+    `how` is the type of the join:
+    * inner: the pairs of matching rows.
+    * left: the pairs of matching rows, and the rows of the left input without a
+      match, with nulls as values of the right columns.
+    * semi: the rows of the left input with a match.
+    * anti: the rows of the left input without a match.
+
+    The rows of inner and left joins have the columns of both inputs, except the
+    right `on` columns named like their left column, they hold the same values.
+    Semi and anti joins only have the columns of the left input.
+    """
+
+    def __init__(
+        self,
+        left: LogicalPlan,
+        right: LogicalPlan,
+        on: list[tuple[Column, Column]],
+        how: str = "inner",
+    ):
+        if how not in JOIN_TYPES:
+            raise ValueError(f"The type of a join must be one of {JOIN_TYPES}, not {how!r}")
+        if not on:
+            raise ValueError("A join needs at least a pair of columns")
+        self.left = left
+        self.right = right
+        self.on = on
+        self.how = how
+
+    def right_columns(self) -> list[int]:
+        """The indices of the columns of the right input that are columns of the
+        join."""
+        if self.how in ("semi", "anti"):
+            return []
+        duplicated = {r.name for l, r in self.on if l.name == r.name}
+        return [
+            i for i, field in enumerate(self.right.get_schema().fields)
+            if field.name not in duplicated
+        ]
+
+    def get_schema(self) -> Schema:
+        right_fields = self.right.get_schema().fields
+        return Schema(
+            self.left.get_schema().fields
+            + [right_fields[i] for i in self.right_columns()]
+        )
+
+    def children(self) -> list["LogicalPlan"]:
+        return [self.left, self.right]
+
+    def __repr__(self):
+        return super().__repr__() + f"(how={self.how}, on={self.on})"
@@ -1,23 +1,54 @@
+import random
+from array import array
 from collections import defaultdict
+from itertools import compress
+from itertools import repeat
+from operator import and_
 from typing import Any
 from typing import Generator
+from typing import Iterable
+from typing import Iterator
+from typing import Sequence
 
 from querypy.datasources import DataSource
 from querypy.planner.expressions import PhysicalExpression
 from querypy.planner.expressions import PhysicalPlan
+from querypy.planner.expressions.compiler import rebind_columns
+from querypy.planner.expressions.compiler import referenced_columns
 from querypy.planner.expressions.physical import Accumulator
 from querypy.planner.expressions.physical import Aggregate
-from querypy.types_ import ColumnVector, RecordBatch, Schema
+from querypy.types_ import RecordBatch, Schema
+from querypy.types_ import ColumnVector
+from querypy.types_ import ColumnVectorABC
+from querypy.types_ import DictionaryVector
+from querypy.types_ import LiteralValueVector
+from querypy.types_ import concat_vectors
+from querypy.types_ import bitmap
 
 
 class Scan(PhysicalPlan):
     """
     Physical implementation of a Scan operation.
+
+    `filters` are `(column, op, value)` conditions pushed down from a filter, the
+    datasource uses them to skip chunks of data that cannot match them, see
+    `querypy.datasources.zonemap`. They do not filter rows.
+
+    `sample` is a `(fraction, seed)` pushed down from a sample, the datasource only
+    reads a sample of its rows, see `DataSource.scan_sample`.
     """
 
-    def __init__(self, datasource: DataSource, projection: list[str]):
+    def __init__(
+        self,
+        datasource: DataSource,
+        projection: list[str],
+        filters: list[tuple] | None = None,
+        sample: tuple[float, int | None] | None = None,
+    ):
         self.datasource = datasource
         self.projection = projection
+        self.filters = filters or []
+        self.sample = sample
 
     def schema(self) -> Schema:
         return self.datasource.get_schema().select(self.projection)
@@ -25,11 +56,24 @@ class Scan(PhysicalPlan):
     def children(self) -> list["PhysicalPlan"]:
         return []
 
-    def execute(self) -> list[RecordBatch]:
-        return self.datasource.scan(self.projection)
+    def execute(self) -> Generator[RecordBatch, Any, None]:
+        if self.sample is not None:
+            fraction, seed = self.sample
+            yield from self.datasource.scan_sample(
+                self.projection, fraction, seed, self.filters or None
+            )
+        elif self.filters:
+            yield from self.datasource.scan(self.projection, self.filters)
+        else:
+            yield from self.datasource.scan(self.projection)
 
     def __repr__(self):
-        return f"{self.__class__.__name__}: schema={self.schema()}, projection={self.projection}"
+        r = f"{self.__class__.__name__}: schema={self.schema()}, projection={self.projection}"
+        if self.filters:
+            r += f", filters={self.filters}"
+        if self.sample is not None:
+            r += f", sample={self.sample}"
+        return r
 
 
 class Projection(PhysicalPlan):
@@ -37,11 +81,11 @@ class Projection(PhysicalPlan):
         self, input: PhysicalPlan, schema: Schema, expr: list[PhysicalExpression]
     ):
         self.input = input
-        self.schema = schema
+        self._schema = schema
         self.expr = expr
 
     def schema(self) -> Schema:
-        return self.schema
+        return self._schema
 
     def children(self) -> list["PhysicalPlan"]:
         return [self.input]
@@ -50,17 +94,63 @@ class Projection(PhysicalPlan):
         result = self.input.execute()
 
         for batch in result:
-            columns = [expr.evaluate(batch) for expr in self.expr]
-            yield RecordBatch(self.schema, columns)
+            batch = compact_columns(batch, self.expr)
+            yield RecordBatch(self._schema, [expr.evaluate(batch) for expr in self.expr])
 
     def __repr__(self):
         return f"{super().__repr__()}({', '.join(str(i) for i in self.expr)})"
 
 
+def compact_columns(
+    batch: RecordBatch, exprs: Iterable[PhysicalExpression]
+) -> RecordBatch:
+    """A batch of the selected rows of the columns read by `exprs`, so that they are
+    never evaluated over rows that were filtered out, e.g. a division by zero. The
+    other columns are not copied, they are nulls in the new batch."""
+    if batch.selection is None:
+        return batch
+    read = set().union(*(referenced_columns(expr) for expr in exprs))
+    size = len(batch.selection)
+    return RecordBatch(
+        batch.schema,
+        [
+            field.take(batch.selection)
+            if i in read
+            else LiteralValueVector(field.type, None, size)
+            for i, field in enumerate(batch.fields)
+        ],
+    )
+
+
+def select_rows(batch: RecordBatch, expr: PhysicalExpression) -> array:
+    """The selection of the (selected) rows of `batch` that pass the boolean `expr`,
+    see `RecordBatch.selection`."""
+    # the mask of the selected rows only, see `compact_columns`.
+    mask = expr.evaluate(compact_columns(batch, [expr]))
+    flags = mask.value
+    if mask.null_count:
+        # A null comparison never passes the filter.
+        flags = bytes(map(and_, flags, bitmap.to_flags(mask.validity, mask.size)))
+    return array("q", compress(batch.rows(), flags))
+
+
 class Filter(PhysicalPlan):
-    def __init__(self, input: PhysicalPlan, expr: PhysicalExpression):
+    """
+    Filters the rows of the input batches.
+
+    The columns of the batches are not copied, the surviving rows are
+    recorded in a selection vector of the batch. When only a few rows survive,
+    less than `compact_ratio` of the rows of a batch, the batch is compacted
+    instead: copying them is cheap and downstream operators stop carrying
+    the dead rows.
+    """
+
+    def __init__(
+        self, input: PhysicalPlan, expr: PhysicalExpression, compact_ratio: float = 0.1
+    ):
         self.input = input
         self.expr = expr
+        self.compact_ratio = compact_ratio
 
     def schema(self) -> Schema:
         return self.input.schema()
@@ -68,25 +158,104 @@ class Filter(PhysicalPlan):
     def children(self):
         return [self.input]
 
-    def execute(self) -> list[RecordBatch]:
-        """We apply the obtained bitmask to every field of the record batch(s)"""
-        input = self.input.execute()
-        new_record_batches = []
-        for batch in input:
-            mask = self.expr.evaluate(batch)
-            new_fields = []
-            for field in batch.fields:
-                new_values = [v for v, b in zip(field.value, mask.value) if b]
-                new_field = ColumnVector(field.type, new_values, len(new_values))
-                new_fields.append(new_field)
-            new_record_batches.append(RecordBatch(batch.schema, new_fields))
-        return new_record_batches
+    def execute(self) -> Generator[RecordBatch, Any, None]:
+        """We apply the obtained bitmask to the (selected) rows of the record batch(s)"""
+        for batch in self.input.execute():
+            selection = select_rows(batch, self.expr)
+            if len(selection) == batch.physical_row_count:
+                yield batch
+                continue
+
+            filtered = RecordBatch(batch.schema, batch.fields, selection)
+            if len(selection) < self.compact_ratio * batch.physical_row_count:
+                filtered = filtered.compact()
+            yield filtered
 
     def __repr__(self):
         return f"{self.__class__.__name__}: {self.expr!r}"
 
 
+class FusedScan(PhysicalPlan):
+    """
+    A pipeline of a scan, a filter and optionally a projection fused in a single
+    operator, see `querypy.planner.planner.create_physical_plan`.
+
+    The datasource reads the columns of the predicate first, and the other columns
+    only for the rows that pass, see `DataSource.scan_filtered`, e.g. a csv file
+    does not parse the cells of the rows that are filtered out. The projections are
+    only evaluated for the rows that pass.
+
+    Attributes
+    ----------
+    scan : Scan
+        The fused scan, it's not executed.
+    expr : PhysicalExpression
+        The boolean expression of the filter, over the columns of the scan.
+    projection_expr : list[PhysicalExpression] | None
+        The expressions of the projection, the filtered batches are yielded as they
+        are if `None`.
+    projection_schema : Schema | None
+        The schema of the projection.
+    """
+
+    def __init__(
+        self,
+        scan: Scan,
+        expr: PhysicalExpression,
+        projection_expr: list[PhysicalExpression] | None = None,
+        projection_schema: Schema | None = None,
+    ):
+        self.scan = scan
+        self.expr = expr
+        self.projection_expr = projection_expr
+        self.projection_schema = projection_schema
+
+    def schema(self) -> Schema:
+        if self.projection_expr is None:
+            return self.scan.schema()
+        return self.projection_schema
+
+    def children(self) -> list["PhysicalPlan"]:
+        return [self.scan]
+
+    def execute(self) -> Generator[RecordBatch, Any, None]:
+        # The predicate reads a batch of its own columns, its columns are renumbered.
+        scan_schema = self.scan.schema()
+        columns = sorted(referenced_columns(self.expr))
+        predicate_expr = rebind_columns(
+            self.expr, {i: j for j, i in enumerate(columns)}
+        )
+        batches = self.scan.datasource.scan_filtered(
+            self.scan.projection,
+            [scan_schema.fields[i].name for i in columns],
+            lambda batch: select_rows(batch, predicate_expr),
+            self.scan.filters or None,
+        )
+        for batch in batches:
+            if self.projection_expr is None:
+                yield batch
+                continue
+            batch = compact_columns(batch, self.projection_expr)
+            columns = [expr.evaluate(batch) for expr in self.projection_expr]
+            yield RecordBatch(self.projection_schema, columns)
+
+    def __repr__(self):
+        r = f"{self.__class__.__name__}: filter={self.expr!r}"
+        if self.projection_expr is not None:
+            r += f", projection=({', '.join(str(e) for e in self.projection_expr)})"
+        return r
+
+
 class HashAggregate(PhysicalPlan):
+    """
+    Groups the rows of the input by the values of `group_expr` and aggregates every
+    group with `aggregate_expr`.
+
+    It's a blocking operator: the whole input is accumulated, and the groups are
+    emitted once, in a single batch, after the input is exhausted. A global
+    aggregation, without `group_expr`, always emits one row.
+    """
+
     def __init__(
         self,
         input: PhysicalPlan,
@@ -97,18 +266,21 @@ class HashAggregate(PhysicalPlan):
         self.input = input
         self.group_expr = group_expr
         self.aggregate_expr = aggregate_expr
-        self.schema = schema
+        self._schema = schema
 
     def schema(self) -> Schema:
-        return self.input.schema()
+        return self._schema
 
     def children(self) -> list["PhysicalPlan"]:
         return [self.input]
 
-    def execute(self) -> list[RecordBatch]:
+    def execute(self) -> Generator[RecordBatch, Any, None]:
         groups: defaultdict[tuple, list[Accumulator]] = defaultdict()
-        rbs = []
         for batch in self.input.execute():
+            batch = compact_columns(
+                batch,
+                self.group_expr + [aggr.expr for aggr in self.aggregate_expr],
+            )
             # the vectors that will be grouped.
             group_input = [expr.evaluate(batch) for expr in self.group_expr]
             assert len({obj.size for obj in group_input}) <= 1, \
@@ -120,7 +292,33 @@ class HashAggregate(PhysicalPlan):
                 aggr.expr.evaluate(batch) for aggr in self.aggregate_expr
             ]
 
-            for row_i in range(batch.row_count):
+            if not self.group_expr:
+                # A global aggregation, one group that accumulates whole vectors.
+                accumulators = groups.setdefault(
+                    (), [expr.create_accumulator() for expr in self.aggregate_expr]
+                )
+                for accumulator, vector in zip(accumulators, aggr_input_values):
+                    accumulator.accumulate_vector(vector)
+                continue
+
+            # Dictionary-encoded group columns are grouped by their codes, the
+            # (batch local) codes are decoded once per distinct key, not per row.
+            key_columns = []
+            decoders = []
+            for vector in group_input:
+                if isinstance(vector, DictionaryVector) and vector.null_count == 0:
+                    key_columns.append(vector.indices)
+                    decoders.append(vector.dictionary.value.__getitem__)
+                else:
+                    key_columns.append(vector.to_pylist())
+                    decoders.append(None)
+
+            # groups of this batch by their (encoded) keys.
+            batch_groups: dict[tuple, list[Accumulator]] = {}
+            aggr_rows = zip(*[vector.to_pylist() for vector in aggr_input_values]) \
+                if aggr_input_values else repeat(())
+
+            for row_keys, row_values in zip(zip(*key_columns), aggr_rows):
                 # a tuple containing keys for a group, for example in a schema of 'id' and 'name'
                 # it could be (1, 'John'). This key group will serve as keys for a grouping
                 # that will be used for storing the appropriate accumulators.
@@ -128,38 +326,42 @@ class HashAggregate(PhysicalPlan):
                 # the total group_keys will be the total number of unique group keys.
 
                 # the total accumulators will be group_keys * aggr functions.
-                group_keys = tuple(
-                    group_key.get_value(row_i) for group_key in group_input
-                )
-
-                accumulators = groups.setdefault(
-                    group_keys,
-                    [expr.create_accumulator() for expr in self.aggregate_expr],
-                )
+                accumulators = batch_groups.get(row_keys)
+                if accumulators is None:
+                    group_keys = tuple(
+                        key if decode is None else decode(key)
+                        for key, decode in zip(row_keys, decoders)
+                    )
+                    accumulators = batch_groups[row_keys] = groups.setdefault(
+                        group_keys,
+                        [expr.create_accumulator() for expr in self.aggregate_expr],
+                    )
 
                 # accumulate values, every accumulator will only see the rows of it group_keys
-                for idx, accumulator in enumerate(accumulators):
-                    value = aggr_input_values[idx].get_value(row_i)
+                for accumulator, value in zip(accumulators, row_values):
                     accumulator.accumulate(value)
 
-            # at this point, data is already accumulated, but we only have a dictionary
-            # of unique key groups, and it's accumulated (from the aggregations) values, like:
-            # ('Alice', 1) [MaxAccumulator(accumulated_values=1, value=1)]
-            # so we need to transform this into actual data to return, in this case:
-            # [('Alice'), (1), (1)]
-            num_group_cols = len(self.group_expr)
-            num_aggr_cols = len(self.aggregate_expr)
-            columns = [[] for _ in range(num_group_cols + num_aggr_cols)]
-
-            for row_key, accumulators in groups.items():
-                for i, key_val in enumerate(row_key):
-                    columns[i].append(key_val)
-
-                # aggregate columns (final values)
-                for j, accum in enumerate(accumulators):
-                    columns[num_group_cols + j].append(accum.final_value())
-            rbs.append(RecordBatch.from_pylists(self.schema, columns))
-        return rbs
+        if not self.group_expr and not groups:
+            # A global aggregation of no rows, e.g. `COUNT(*)` is 0.
+            groups[()] = [expr.create_accumulator() for expr in self.aggregate_expr]
+
+        # at this point, data is already accumulated, but we only have a dictionary
+        # of unique key groups, and it's accumulated (from the aggregations) values, like:
+        # ('Alice', 1) [MaxAccumulator(accumulated_values=1, value=1)]
+        # so we need to transform this into actual data to return, in this case:
+        # [('Alice'), (1), (1)]
+        num_group_cols = len(self.group_expr)
+        num_aggr_cols = len(self.aggregate_expr)
+        columns = [[] for _ in range(num_group_cols + num_aggr_cols)]
+
+        for row_key, accumulators in groups.items():
+            for i, key_val in enumerate(row_key):
+                columns[i].append(key_val)
+
+            # aggregate columns (final values)
+            for j, accum in enumerate(accumulators):
+                columns[num_group_cols + j].append(accum.final_value())
+        yield RecordBatch.from_pylists(self._schema, columns)
 
     def __repr__(self):
         return super().__repr__() + (
@@ -168,6 +370,14 @@ class HashAggregate(PhysicalPlan):
 
 
 class OrderBy(PhysicalPlan):
+    """
+    Sorts the rows of the input by the values of `order_by`, `(expression,
+    ascending)` pairs, nulls are sorted after any value in ascending order.
+
+    It's a blocking operator: the whole input is read, sorted, and emitted once,
+    in a single batch.
+    """
+
     def __init__(
         self, input: PhysicalPlan, order_by: list[tuple[PhysicalExpression, bool]]
     ):
@@ -181,22 +391,405 @@ class OrderBy(PhysicalPlan):
         return [self.input]
 
     def execute(self) -> Generator[RecordBatch, Any, None]:
-        for batch in self.input.execute():
-            ascending = self.order_by[0][1]
-            order = sorted(
-                range(batch.row_count),
-                key=lambda i: tuple(
-                    batch.get_field(col.i).get_value(i) for col, _ in self.order_by
-                ),
-                reverse=ascending == False,
+        # only the selected rows are sorted, compacting materializes the selection.
+        batches = [batch.compact() for batch in self.input.execute()]
+        batches = [batch for batch in batches if batch.row_count]
+        if not batches:
+            return
+        schema = batches[0].schema
+        fields = [
+            concat_vectors([batch.get_field(i) for batch in batches])
+            for i in range(batches[0].column_count)
+        ]
+        batch = RecordBatch(schema, fields)
+
+        # sorts are stable, sorting by the last key first sorts by every key.
+        order = list(range(batch.row_count))
+        for expr, ascending in reversed(self.order_by):
+            values = expr.evaluate(batch).to_pylist()
+            order.sort(
+                key=lambda i: (values[i] is None, values[i]), reverse=not ascending
             )
+        yield RecordBatch(schema, [field.take(order) for field in fields])
 
-            for i, field in enumerate(batch.fields):
-                field = ColumnVector(
-                    field.type, [field.get_value(v) for v in order], field.size
-                )
-                batch.fields[i] = field
+    def __repr__(self):
+        return super().__repr__() + repr(self.order_by)
+
+
+class Limit(PhysicalPlan):
+    """
+    Keeps at most `limit` rows after skipping `offset` rows. Batches are
+    truncated with zero-copy slices and no more input is pulled once the limit
+    is reached.
+    """
+
+    def __init__(self, input: PhysicalPlan, limit: int, offset: int = 0):
+        self.input = input
+        self.limit = limit
+        self.offset = offset
+
+    def schema(self) -> Schema:
+        return self.input.schema()
+
+    def children(self) -> list["PhysicalPlan"]:
+        return [self.input]
+
+    def execute(self) -> Generator[RecordBatch, Any, None]:
+        to_skip = self.offset
+        remaining = self.limit
+        if remaining <= 0:
+            return
+        for batch in self.input.execute():
+            if to_skip >= batch.row_count:
+                to_skip -= batch.row_count
+                continue
+
+            if to_skip or batch.row_count - to_skip > remaining:
+                batch = batch.slice(to_skip, remaining)
+                to_skip = 0
+            remaining -= batch.row_count
             yield batch
+            if remaining <= 0:
+                return
 
     def __repr__(self):
-        return super().__repr__() + repr(self.order_by)
+        return super().__repr__() + f"limit={self.limit}, offset={self.offset}"
+
+
+class Sample(PhysicalPlan):
+    """
+    Keeps a random sample of the rows of the input.
+
+    With a `fraction`, every row is kept with that probability, unless the input is
+    a scan that already reads a sample (`sampled_input`). With `rows`, at most `rows`
+    rows are chosen uniformly with reservoir sampling, they are emitted once the input
+    is exhausted.
+
+    `scale_factor` is the number of input rows that every sampled row stands for, it's
+    known once the sample is executed. With `extrapolate`, the planner scales up
+    `SUM` and `COUNT` aggregates over the sample by it, see `Extrapolated`.
+
+    A `fallback` is the input without sampling, read when a sample of `rows` rows from
+    a sampled input has less rows than requested, e.g. when sampled blocks are few.
+    """
+
+    def __init__(
+        self,
+        input: PhysicalPlan,
+        fraction: float | None = None,
+        rows: int | None = None,
+        seed: int | None = None,
+        sampled_input: bool = False,
+        extrapolate: bool = False,
+        fallback: PhysicalPlan | None = None,
+    ):
+        self.input = input
+        self.fraction = fraction
+        self.rows = rows
+        self.seed = seed
+        self.sampled_input = sampled_input
+        self.extrapolate = extrapolate
+        self.fallback = fallback
+        self.scale_factor = 1 / fraction if fraction else 1.0
+
+    def schema(self) -> Schema:
+        return self.input.schema()
+
+    def children(self) -> list["PhysicalPlan"]:
+        return [self.input]
+
+    def execute(self) -> Generator[RecordBatch, Any, None]:
+        rng = random.Random(self.seed)
+        batches = self.input.execute()
+        if self.fraction is not None and not self.sampled_input:
+            batches = self.bernoulli_sample(batches, rng)
+        if self.rows is None:
+            yield from batches
+            return
+
+        schema, reservoir, seen = self.reservoir_sample(batches, rng)
+        scale_factor = self.scale_factor
+        if len(reservoir) < self.rows and self.fallback is not None:
+            schema, reservoir, seen = self.reservoir_sample(self.fallback.execute(), rng)
+            scale_factor = 1.0
+        if reservoir:
+            self.scale_factor = scale_factor * seen / len(reservoir)
+            yield RecordBatch.from_pylists(schema, [list(c) for c in zip(*reservoir)])
+
+    def reservoir_sample(
+        self, batches: Iterable[RecordBatch], rng: random.Random
+    ) -> tuple[Schema | None, list[tuple], int]:
+        """Samples `rows` rows uniformly with the algorithm R: the n-th row replaces a
+        sampled row with a probability of rows / n. Returns the schema of the rows, the
+        sampled rows and the number of rows read."""
+        reservoir = []
+        seen = 0
+        schema = None
+        for batch in batches:
+            schema = batch.schema
+            batch = batch.compact()
+            for row in zip(*(field.to_pylist() for field in batch.fields)):
+                seen += 1
+                if len(reservoir) < self.rows:
+                    reservoir.append(row)
+                else:
+                    i = rng.randrange(seen)
+                    if i < self.rows:
+                        reservoir[i] = row
+        return schema, reservoir, seen
+
+    def bernoulli_sample(
+        self, batches: Iterable[RecordBatch], rng: random.Random
+    ) -> Iterator[RecordBatch]:
+        """Keeps every row with a probability of `fraction`."""
+        for batch in batches:
+            flags = bytes(rng.random() < self.fraction for _ in batch.rows())
+            if not any(flags):
+                continue
+            # like a filter, the sampled rows are a selection of the batch.
+            yield RecordBatch(
+                batch.schema, batch.fields, array("q", compress(batch.rows(), flags))
+            )
+
+    def __repr__(self):
+        return super().__repr__() + (
+            f"fraction={self.fraction}, rows={self.rows}, seed={self.seed}, "
+            f"sampled_input={self.sampled_input}, extrapolate={self.extrapolate}"
+        )
+
+
+class JoinHashTable:
+    """
+    The hash table of the build side of a hash join, it maps the keys of the rows
+    to their indices.
+
+    Rows are stored compactly: the dictionary only holds the first row of every
+    key, and the other rows with the same key are chained in a typed buffer of
+    row indices, `next_rows[i]` is the next row with the key of row `i`, `-1` at
+    the end of the chain. Null keys never match, they are not stored.
+
+    Attributes
+    ----------
+    first_rows : dict
+        The first row of every key.
+    next_rows : array
+        The next row of every row with the same key.
+    unique : bool
+        Whether every key is the key of a single row.
+    """
+
+    def __init__(self, keys: list):
+        self.first_rows = {}
+        self.next_rows = array("q", [-1]) * len(keys)
+        self.unique = True
+        first_rows = self.first_rows
+        # rows are chained backwards, so the chains are in the order of the rows.
+        for i in range(len(keys) - 1, -1, -1):
+            key = keys[i]
+            if key is None:
+                continue
+            j = first_rows.get(key, -1)
+            if j >= 0:
+                self.next_rows[i] = j
+                self.unique = False
+            first_rows[key] = i
+
+    def __len__(self):
+        return len(self.next_rows)
+
+    def matches(self, keys: list) -> list[int]:
+        """The first matching row of every key, `-1` if it has no match."""
+        return list(map(self.first_rows.get, keys, repeat(-1)))
+
+    def probe(self, keys: list, outer: bool = False) -> tuple[array, array]:
+        """The pairs of matching rows, as the indices of the `keys` and the indices
+        of their matching rows. With `outer`, keys without a match are paired with
+        `-1`."""
+        probe_rows = array("q")
+        build_rows = array("q")
+        matches = self.matches(keys)
+        if self.unique:
+            if outer:
+                return array("q", range(len(keys))), array("q", matches)
+            probe_rows.extend(i for i, j in enumerate(matches) if j >= 0)
+            build_rows.extend(j for j in matches if j >= 0)
+            return probe_rows, build_rows
+
+        next_rows = self.next_rows
+        for i, j in enumerate(matches):
+            if j < 0 and outer:
+                probe_rows.append(i)
+                build_rows.append(-1)
+            while j >= 0:
+                probe_rows.append(i)
+                build_rows.append(j)
+                j = next_rows[j]
+        return probe_rows, build_rows
+
+
+class HashJoin(PhysicalPlan):
+    """
+    Joins two inputs with a hash table, see `querypy.planner.plans.logical.Join`.
+
+    The whole `build_side` input is read into a `JoinHashTable` of its keys, and the
+    other side, the probe side, is streamed batch by batch, every batch is joined
+    as soon as it's read. The planner builds the table on the smaller input.
+
+    When the table is built on the left input, the rows of a left, semi or anti
+    join that depend on the matches of the left rows are emitted once the probe side
+    is read.
+
+    Attributes
+    ----------
+    left : PhysicalPlan
+        The left input.
+    right : PhysicalPlan
+        The right input.
+    left_keys : list[PhysicalExpression]
+        The keys of the rows of the left input.
+    right_keys : list[PhysicalExpression]
+        The keys of the rows of the right input.
+    how : str
+        The type of the join, see `querypy.planner.plans.logical.JOIN_TYPES`.
+    right_columns : list[int]
+        The indices of the columns of the right input that are columns of the join.
+    build_side : str
+        The input the hash table is built on, 'left' or 'right'.
+    """
+
+    def __init__(
+        self,
+        left: PhysicalPlan,
+        right: PhysicalPlan,
+        left_keys: list[PhysicalExpression],
+        right_keys: list[PhysicalExpression],
+        how: str,
+        schema: Schema,
+        right_columns: list[int],
+        build_side: str = "right",
+    ):
+        self.left = left
+        self.right = right
+        self.left_keys = left_keys
+        self.right_keys = right_keys
+        self.how = how
+        self._schema = schema
+        self.right_columns = right_columns
+        self.build_side = build_side
+
+    def schema(self) -> Schema:
+        return self._schema
+
+    def children(self) -> list["PhysicalPlan"]:
+        return [self.left, self.right]
+
+    def execute(self) -> Generator[RecordBatch, Any, None]:
+        if self.build_side == "right":
+            build, build_keys = self.right, self.right_keys
+        else:
+            build, build_keys = self.left, self.left_keys
+        batches = [batch.compact() for batch in build.execute()]
+        batches = [batch for batch in batches if batch.row_count]
+        build_columns = [
+            concat_vectors([batch.get_field(i) for batch in batches])
+            if batches else ColumnVector.from_pylist(field.type, [])
+            for i, field in enumerate(build.schema().fields)
+        ]
+        table = JoinHashTable(
+            join_keys(RecordBatch(build.schema(), build_columns), build_keys)
+        )
+
+        if self.build_side == "right":
+            yield from self.probe_left(table, build_columns)
+        else:
+            yield from self.probe_right(table, build_columns)
+
+    def probe_left(
+        self, table: JoinHashTable, right_columns: list[ColumnVectorABC]
+    ) -> Iterator[RecordBatch]:
+        """Streams the left input through a hash table of the right input."""
+        for batch in self.left.execute():
+            batch = batch.compact()
+            keys = join_keys(batch, self.left_keys)
+            if self.how in ("semi", "anti"):
+                matched = self.how == "semi"
+                flags = bytes((j >= 0) is matched for j in table.matches(keys))
+                selection = array("q", compress(range(batch.row_count), flags))
+                if len(selection):
+                    yield RecordBatch(self._schema, batch.fields, selection)
+                continue
+
+            left_rows, right_rows = table.probe(keys, outer=self.how == "left")
+            if len(left_rows):
+                yield self.join_rows(batch.fields, left_rows, right_columns, right_rows)
+
+    def probe_right(
+        self, table: JoinHashTable, left_columns: list[ColumnVectorABC]
+    ) -> Iterator[RecordBatch]:
+        """Streams the right input through a hash table of the left input, the
+        matches of the left rows are recorded for the left, semi and anti joins."""
+        matched = bytearray(len(table))
+        for batch in self.right.execute():
+            batch = batch.compact()
+            right_rows, left_rows = table.probe(join_keys(batch, self.right_keys))
+            for j in left_rows:
+                matched[j] = 1
+            if self.how in ("inner", "left") and len(left_rows):
+                yield self.join_rows(left_columns, left_rows, batch.fields, right_rows)
+
+        if self.how == "inner":
+            return
+        flags = matched if self.how == "semi" else bytes(1 - m for m in matched)
+        left_rows = array("q", compress(range(len(table)), flags))
+        if not len(left_rows):
+            return
+        if self.how in ("semi", "anti"):
+            yield RecordBatch(self._schema, [c.take(left_rows) for c in left_columns])
+        else:
+            right_fields = self.right.schema().fields
+            right_nulls = [
+                ColumnVector.from_pylist(f.type, [None] * len(left_rows))
+                for f in right_fields
+            ]
+            yield self.join_rows(
+                left_columns, left_rows, right_nulls, range(len(left_rows))
+            )
+
+    def join_rows(
+        self,
+        left_columns: list[ColumnVectorABC],
+        left_rows: Sequence[int],
+        right_columns: list[ColumnVectorABC],
+        right_rows: Sequence[int],
+    ) -> RecordBatch:
+        """The batch of the pairs of rows, a right row of `-1` is a row of nulls."""
+        fields = [column.take(left_rows) for column in left_columns]
+        fields += [
+            take_nullable(right_columns[i], right_rows) for i in self.right_columns
+        ]
+        return RecordBatch(self._schema, fields)
+
+    def __repr__(self):
+        return super().__repr__() + (
+            f"how: {self.how}; on: {list(zip(self.left_keys, self.right_keys))}; "
+            f"build: {self.build_side}"
+        )
+
+
+def join_keys(batch: RecordBatch, keys: list[PhysicalExpression]) -> list:
+    """The join keys of the rows of a compacted batch, a value or a tuple of values
+    for many keys, `None` if any of them is null."""
+    columns = [key.evaluate(batch).to_pylist() for key in keys]
+    if len(columns) == 1:
+        return columns[0]
+    return [None if None in key else key for key in zip(*columns)]
+
+
+def take_nullable(vector: ColumnVectorABC, indices: Sequence[int]) -> ColumnVectorABC:
+    """The values of `vector` at `indices`, the index `-1` is a null."""
+    if not any(i < 0 for i in indices):
+        return vector.take(indices)
+    values = vector.to_pylist()
+    return ColumnVector.from_pylist(
+        vector.type, [values[i] if i >= 0 else None for i in indices]
+    )
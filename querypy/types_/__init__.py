@@ -1,6 +1,12 @@
 import abc
+import itertools
+import sys
 import typing
+from array import array
 from enum import Enum
+from itertools import compress
+
+from querypy.types_ import bitmap
 
 
 class ArrowType:
@@ -12,6 +18,13 @@ class ArrowType:
     def __repr__(self):
         return self.name or self.__class__.__name__
 
+    def __reduce__(self):
+        # Types are compared by identity, unpickling, e.g. record batches sent
+        # from a worker process, must return the `ArrowTypes` member.
+        if getattr(ArrowTypes, self.name, None) is self:
+            return getattr, (ArrowTypes, self.name)
+        return object.__reduce_ex__(self, 2)
+
 
 class IntType(ArrowType):
     def __init__(self, maxsize: int, some: bool):
@@ -89,63 +102,369 @@ class ArrowTypes(metaclass=NamedParameters):
             case _:
                 raise Exception(f"Type {v} not supported")
 
+    @classmethod
+    def typecode(cls, type: ArrowType) -> str | None:
+        """The `array` typecode used to store values of `type` in a contiguous
+        buffer, `None` if the type is stored as a list of Python objects."""
+        return _TYPECODES.get(type)
+
+
+# Numeric types are stored in typed `array.array` buffers (4-8 bytes per value)
+# instead of lists of boxed Python objects (~28 bytes per value plus the pointer).
+#
+# `FloatType` is what we infer for every Python float, which is already double
+# precision, storing it as 'f' would silently change the values.
+_TYPECODES = {
+    ArrowTypes.Int8Type: "b",
+    ArrowTypes.Int16Type: "h",
+    ArrowTypes.Int32Type: "i",
+    ArrowTypes.Int64Type: "q",
+    ArrowTypes.FloatType: "d",
+    ArrowTypes.DoubleType: "d",
+}
+
+
+def buffer_typecode(buffer) -> str | None:
+    """The typecode of a typed buffer (an `array` or a `memoryview` of one),
+    `None` for lists."""
+    if isinstance(buffer, array):
+        return buffer.typecode
+    if isinstance(buffer, memoryview):
+        return buffer.format
+    return None
+
 
 class ColumnVectorABC(abc.ABC):
     """
     Represents a Column holding a vector of the
     same type.
 
-    In the Python context, a vector is a list/tuple.
+    In the Python context, a vector is a list/tuple, or a typed `array.array`
+    for numeric types, see `ArrowTypes.typecode`.
+
+    Nulls are tracked in an optional packed validity bitmap (see `querypy.types_.bitmap`)
+    instead of `None` sentinels, so typed buffers stay dense: the slot of a null
+    value holds a placeholder (0 in typed buffers, `None` in lists). A vector without
+    a bitmap has no nulls, kernels can check `null_count == 0` to skip any
+    validity handling.
     """
 
-    def __init__(self, type: ArrowType, value: list, size: int):
+    def __init__(
+        self,
+        type: ArrowType,
+        value: list | array | memoryview,
+        size: int,
+        validity: bytearray | memoryview | None = None,
+    ):
         self.type = type
         self.size = size
         self.value = value
+        self.validity = validity
+        self._null_count = None if validity is not None else 0
 
     def __len__(self):
         return self.size
 
+    @property
+    def null_count(self) -> int:
+        """The number of null values, it's computed once from the bitmap."""
+        if self._null_count is None:
+            self._null_count = self.size - bitmap.count_set(self.validity, self.size)
+        return self._null_count
+
+    def is_valid(self, i) -> bool:
+        return self.validity is None or bitmap.is_set(self.validity, i)
+
     @abc.abstractmethod
     def get_value(self, i):
         pass
 
+    def raw_values(self) -> typing.Iterable:
+        """The stored values, including the placeholders of null values."""
+        return self.value
+
+    def filter(self, flags: typing.Iterable[int]) -> "ColumnVectorABC":
+        """A new vector with the values whose flag is set, `flags` holds a 0/1
+        flag per row, e.g. a boolean mask."""
+        flags = bytes(flags)
+        validity = None
+        if self.null_count:
+            validity = bitmap.from_flags(
+                compress(bitmap.to_flags(self.validity, self.size), flags)
+            )
+        return ColumnVector.from_pylist(
+            self.type, list(compress(self.raw_values(), flags)), validity
+        )
+
+    def take(self, indices: typing.Sequence[int]) -> "ColumnVectorABC":
+        """A new vector with the values at the given `indices` (in that order)."""
+        values = list(self.raw_values())
+        return ColumnVector.from_pylist(
+            self.type, [values[i] for i in indices], self.take_validity(indices)
+        )
+
+    @abc.abstractmethod
+    def slice(self, offset: int, length: int) -> "ColumnVectorABC":
+        """A vector of the `length` values starting at `offset`, typed buffers
+        are not copied: the new vector is a view over the same memory."""
+        pass
+
+    def slice_validity(self, offset: int, length: int) -> bytes | None:
+        if not self.null_count:
+            return None
+        return bitmap.slice(self.validity, offset, length)
+
+    def take_validity(self, indices: typing.Sequence[int]) -> bytearray | None:
+        """The validity bitmap of the values at the given `indices`."""
+        if not self.null_count:
+            return None
+        return bitmap.from_flags(
+            map(bitmap.to_flags(self.validity, self.size).__getitem__, indices)
+        )
+
+    def to_pylist(self) -> list:
+        """The values of the vector as a list of Python objects, nulls are `None`."""
+        values = list(self.raw_values())
+        if self.null_count:
+            for i, valid in enumerate(bitmap.to_flags(self.validity, self.size)):
+                if not valid:
+                    values[i] = None
+        return values
+
+    def nbytes(self) -> int:
+        """An estimate of the memory held by the vector: its buffers, and the
+        Python objects of list values."""
+        return _nbytes(self.value) + _nbytes(self.validity)
+
     def __repr__(self):
         max_width = 60
-        repr_ = repr(self.value)
+        # Only the head of the vector is shown, avoid converting whole buffers.
+        repr_ = repr([self.get_value(i) for i in range(min(self.size, max_width))])
         if len(repr_) > max_width:
             repr_ = repr_[:max_width] + "..."
             if not repr_.endswith("]"):
                 repr_ += "]"
         return repr_
 
+    def __eq__(self, other):
+        if isinstance(other, list):
+            return self.to_pylist() == other
+        return self is other
+
 
 class ColumnVector(ColumnVectorABC):
+    @classmethod
+    def from_pylist(
+        cls, type: ArrowType, values: list, validity: bytearray | None = None
+    ) -> "ColumnVector":
+        """Builds a vector from a list of values, numeric types are packed
+        into a typed buffer.
+
+        `None` values are nulls, they are recorded in the validity bitmap, unless
+        a `validity` is given, in which case `values` are expected to already hold
+        placeholders.
+
+        If the values do not fit the buffer of `type`, e.g. a value that overflows
+        an `Int32Type` or a non-numeric value, the list is kept as is.
+        """
+        typecode = ArrowTypes.typecode(type)
+        if validity is None and None in values:
+            nulls = [i for i, v in enumerate(values) if v is None]
+            validity = bitmap.from_nulls(nulls, len(values))
+            if typecode is not None:
+                values = [0 if v is None else v for v in values]
+
+        if typecode is not None:
+            try:
+                values = array(typecode, values)
+            except (TypeError, OverflowError):
+                pass
+        return cls(type, values, len(values), validity)
+
     def get_value(self, i):
         if 0 > i <= len(self):
             raise IndexError()
+        if self.validity is not None and not bitmap.is_set(self.validity, i):
+            return None
         return self.value[i]
 
-    def __eq__(self, other):
-        if isinstance(other, list):
-            return self.value == other
-        return self == other
+    def take(self, indices: typing.Sequence[int]) -> "ColumnVector":
+        values = map(self.value.__getitem__, indices)
+        typecode = buffer_typecode(self.value)
+        if typecode is not None:
+            values = array(typecode, values)
+        else:
+            values = list(values)
+        return ColumnVector(self.type, values, len(values), self.take_validity(indices))
+
+    def slice(self, offset: int, length: int) -> "ColumnVector":
+        end = min(offset + length, self.size)
+        if isinstance(self.value, array):
+            values = memoryview(self.value)[offset:end]
+        else:
+            # memoryviews and lists, lists can't be viewed, only the references
+            # to the values are copied.
+            values = self.value[offset:end]
+        return ColumnVector(
+            self.type, values, len(values), self.slice_validity(offset, len(values))
+        )
+
 
 
 class LiteralValueVector(ColumnVectorABC):
     """
     Represents a vector that holds just a literal value, in every get_value
-    it returns the value.
+    it returns the value. A `None` value is a vector of nulls.
     """
 
     def __init__(self, type: ArrowType, value: typing.Any, size: int):
-        super().__init__(type, value, size)
+        validity = bytearray(bitmap.num_bytes(size)) if value is None else None
+        super().__init__(type, value, size, validity)
 
     def get_value(self, i):
         if 0 > i <= self.size:
             raise IndexError()
         return self.value
 
+    def raw_values(self) -> typing.Iterable:
+        return itertools.repeat(self.value, self.size)
+
+    def filter(self, flags: typing.Iterable[int]) -> "LiteralValueVector":
+        return LiteralValueVector(self.type, self.value, sum(flags))
+
+    def take(self, indices: typing.Sequence[int]) -> "LiteralValueVector":
+        return LiteralValueVector(self.type, self.value, len(indices))
+
+    def slice(self, offset: int, length: int) -> "LiteralValueVector":
+        return LiteralValueVector(
+            self.type, self.value, max(0, min(length, self.size - offset))
+        )
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.value)
+
+    def __repr__(self):
+        return repr(self.value)
+
+
+class DictionaryVector(ColumnVectorABC):
+    """
+    A dictionary-encoded vector, every value is stored as an integer code (index)
+    into a small vector of distinct values: the dictionary.
+
+    Low cardinality columns like a country or a status flag are stored as a typed
+    buffer of small integers instead of a list of repeated strings, and kernels
+    can work with the codes, e.g. evaluating a comparison once per distinct value.
+
+    Example
+    -------
+    DictionaryVector(ArrowTypes.StringType, array('b', [0, 1, 0]), ColumnVector(..., ['ES', 'FR']))
+    represents ['ES', 'FR', 'ES']
+    """
+
+    def __init__(
+        self,
+        type: ArrowType,
+        indices: array | memoryview,
+        dictionary: ColumnVector,
+        validity: bytearray | None = None,
+    ):
+        super().__init__(type, indices, len(indices), validity)
+        self.indices = indices
+        self.dictionary = dictionary
+
+    def get_value(self, i):
+        if 0 > i <= len(self):
+            raise IndexError()
+        if self.validity is not None and not bitmap.is_set(self.validity, i):
+            return None
+        return self.dictionary.value[self.indices[i]]
+
+    def raw_values(self) -> typing.Iterable:
+        return map(self.dictionary.value.__getitem__, self.indices)
+
+    def filter(self, flags: typing.Iterable[int]) -> "DictionaryVector":
+        # Only the codes are filtered, the dictionary is shared.
+        flags = bytes(flags)
+        validity = None
+        if self.null_count:
+            validity = bitmap.from_flags(
+                compress(bitmap.to_flags(self.validity, self.size), flags)
+            )
+        indices = array(buffer_typecode(self.indices), compress(self.indices, flags))
+        return DictionaryVector(self.type, indices, self.dictionary, validity)
+
+    def take(self, indices: typing.Sequence[int]) -> "DictionaryVector":
+        codes = array(
+            buffer_typecode(self.indices), map(self.indices.__getitem__, indices)
+        )
+        return DictionaryVector(
+            self.type, codes, self.dictionary, self.take_validity(indices)
+        )
+
+    def slice(self, offset: int, length: int) -> "DictionaryVector":
+        codes = memoryview(self.indices)[offset : offset + length]
+        return DictionaryVector(
+            self.type, codes, self.dictionary, self.slice_validity(offset, len(codes))
+        )
+
+    def nbytes(self) -> int:
+        return super().nbytes() + self.dictionary.nbytes()
+
+
+def _nbytes(buffer) -> int:
+    if buffer is None:
+        return 0
+    if isinstance(buffer, (list, tuple)):
+        return sys.getsizeof(buffer) + sum(map(sys.getsizeof, buffer))
+    return memoryview(buffer).nbytes
+
+
+def concat_vectors(vectors: list[ColumnVectorABC]) -> ColumnVectorABC:
+    """Concatenates vectors of the same type into a single vector, e.g. the
+    columns of many record batches.
+
+    If any of them is dictionary-encoded, the values are encoded again with
+    a dictionary shared by all of them.
+    """
+    type = vectors[0].type
+    values = list(itertools.chain.from_iterable(v.to_pylist() for v in vectors))
+    if any(isinstance(v, DictionaryVector) for v in vectors):
+        max_cardinality = sum(
+            len(v.dictionary) if isinstance(v, DictionaryVector) else v.size
+            for v in vectors
+        )
+        return dictionary_encode(type, values, max_cardinality)
+    return ColumnVector.from_pylist(type, values)
+
+
+def dictionary_encode(
+    type: ArrowType, values: list, max_cardinality: int
+) -> ColumnVectorABC:
+    """Dictionary-encodes `values` if they have at most `max_cardinality` distinct
+    values, otherwise a plain `ColumnVector` is returned.
+
+    `None` values are nulls, like in `ColumnVector.from_pylist`.
+    """
+    distinct = dict.fromkeys(values)
+    distinct.pop(None, None)
+    if not distinct or len(distinct) > max_cardinality:
+        return ColumnVector.from_pylist(type, values)
+
+    codes = {value: code for code, value in enumerate(distinct)}
+    validity = None
+    if None in values:
+        validity = bitmap.from_nulls(
+            [i for i, v in enumerate(values) if v is None], len(values)
+        )
+        # The code of a null is just a placeholder.
+        codes[None] = 0
+
+    typecode = "b" if len(codes) <= 0x7F else "h" if len(codes) <= 0x7FFF else "i"
+    indices = array(typecode, map(codes.__getitem__, values))
+    dictionary = ColumnVector.from_pylist(type, list(distinct))
+    return DictionaryVector(type, indices, dictionary, validity)
+
 
 class Field:
     """
@@ -205,11 +524,22 @@ class RecordBatch:
          | 3 | 'c' |
          +---+-----+
 
+    A batch can have a selection vector, the indices of the rows of `fields`
+    that belong to the batch, e.g. the rows that passed a filter. It allows
+    filtering a batch without copying its columns, the fields keep every (physical)
+    row and operators only look at the selected ones. `compact` materializes the
+    selection into new columns.
     """
 
-    def __init__(self, schema: Schema, fields: list[ColumnVector]):
+    def __init__(
+        self,
+        schema: Schema,
+        fields: list[ColumnVector],
+        selection: array | None = None,
+    ):
         self.schema = schema
         self.fields = fields
+        self.selection = selection
 
     def column_names(self) -> list[str]:
         return list(map(lambda x: x.name, self.schema.fields))
@@ -224,21 +554,55 @@ class RecordBatch:
         """
         columns = []
         for column, values in zip(schema.fields, values):
-            columns.append(ColumnVector(column.type, values, len(values)))
+            columns.append(ColumnVector.from_pylist(column.type, values))
         return cls(schema, columns)
 
     @property
     def row_count(self):
         """
-        The depth of rows of the columns.
+        The depth of rows of the columns, only selected rows are counted.
 
         The total amount of rows of a RecordBatch can
          be calculated by `row_count x column_count`
         """
+        if self.selection is not None:
+            return len(self.selection)
+        return self.physical_row_count
+
+    @property
+    def physical_row_count(self):
+        """The number of rows of the fields, selected or not."""
         if not self.fields:
             return 0
         return self.fields[0].size
 
+    def rows(self) -> typing.Iterable[int]:
+        """The indices of the (selected) rows of the fields."""
+        if self.selection is not None:
+            return self.selection
+        return range(self.physical_row_count)
+
+    def slice(self, offset: int, length: int) -> "RecordBatch":
+        """A batch of the `length` rows starting at `offset`, it shares the
+        buffers of this batch, see `ColumnVectorABC.slice`."""
+        if self.selection is not None:
+            return RecordBatch(
+                self.schema,
+                self.fields,
+                memoryview(self.selection)[offset : offset + length],
+            )
+        return RecordBatch(
+            self.schema, [field.slice(offset, length) for field in self.fields]
+        )
+
+    def compact(self) -> "RecordBatch":
+        """A batch whose fields only hold the selected rows."""
+        if self.selection is None:
+            return self
+        return RecordBatch(
+            self.schema, [field.take(self.selection) for field in self.fields]
+        )
+
     @property
     def column_count(self):
         return len(self.fields)
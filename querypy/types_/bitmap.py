@@ -0,0 +1,78 @@
+"""
+Packed validity bitmaps.
+
+A bitmap holds one bit per row, the bit of row `i` lives in byte `i // 8` at
+position `i % 8` (least significant bit first, same layout as Arrow). A set bit
+means that the value is valid, an unset bit means that the value is null.
+
+Bitmaps are combined as Python integers, so operations like AND-ing the validity
+of two columns happen in C over the whole buffer instead of row by row.
+"""
+
+from typing import Iterable
+
+# One byte per bit of every possible bitmap byte, e.g. 0b101 -> b'\x01\x00\x01\x00...'
+_FLAGS = [bytes((b >> i) & 1 for i in range(8)) for b in range(256)]
+_TO_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+def num_bytes(length: int) -> int:
+    """The number of bytes needed to hold `length` bits."""
+    return (length + 7) // 8
+
+
+def from_nulls(null_indices: Iterable[int], length: int) -> bytearray:
+    """Builds a bitmap of `length` valid rows, except for the `null_indices`."""
+    bitmap = bytearray(b"\xff" * num_bytes(length))
+    for i in null_indices:
+        bitmap[i >> 3] &= ~(1 << (i & 7))
+    return bitmap
+
+
+def from_flags(flags: Iterable[int]) -> bytearray:
+    """Packs an iterable of 0/1 flags (one per row) into a bitmap."""
+    flags = bytes(flags)
+    if not flags:
+        return bytearray()
+    # The reversed digits are the binary representation of the bitmap.
+    n = int(flags.translate(_TO_DIGITS)[::-1], 2)
+    return bytearray(n.to_bytes(num_bytes(len(flags)), "little"))
+
+
+def to_flags(bitmap: bytes, length: int) -> bytes:
+    """Unpacks a bitmap into one 0/1 byte per row, it can be used as a mask
+    by `itertools.compress`."""
+    return b"".join(map(_FLAGS.__getitem__, bitmap))[:length]
+
+
+def slice(bitmap: bytes, offset: int, length: int) -> bytes:
+    """The bitmap of `length` rows starting at `offset`. Byte aligned offsets
+    return a view of `bitmap`, others need to shift the bits into a new bitmap."""
+    if offset % 8 == 0:
+        return memoryview(bitmap)[offset >> 3 : (offset >> 3) + num_bytes(length)]
+    n = int.from_bytes(bitmap, "little") >> offset
+    n &= (1 << length) - 1
+    return bytearray(n.to_bytes(num_bytes(length), "little"))
+
+
+def is_set(bitmap: bytes, i: int) -> bool:
+    return bool(bitmap[i >> 3] & (1 << (i & 7)))
+
+
+def count_set(bitmap: bytes, length: int) -> int:
+    """The number of set bits (valid rows) in the first `length` bits."""
+    n = int.from_bytes(bitmap[: num_bytes(length)], "little")
+    return (n & ((1 << length) - 1)).bit_count()
+
+
+def bitmap_and(
+    left: bytes | None, right: bytes | None, length: int
+) -> bytearray | None:
+    """The validity of a row computed from two columns, a missing bitmap means
+    that every row is valid."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    n = int.from_bytes(left, "little") & int.from_bytes(right, "little")
+    return bytearray(n.to_bytes(num_bytes(length), "little"))
@@ -1,3 +1,4 @@
+from typing import Iterator
 from unittest.mock import MagicMock
 
 from querypy.planner.expressions import LogicalPlan, PhysicalPlan
@@ -66,8 +67,8 @@ def create_physical_test_plan(values: list[list] | list) -> PhysicalPlan:
         def schema(self) -> Schema:
             return self.record_batch.schema
 
-        def execute(self) -> list[RecordBatch]:
-            return [self.record_batch]
+        def execute(self) -> Iterator[RecordBatch]:
+            yield self.record_batch
 
     rb = create_rb(values)
     return DummyPlan(rb)
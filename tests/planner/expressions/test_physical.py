@@ -1,5 +1,8 @@
 from unittest.mock import MagicMock
 
+import pytest
+
+from querypy.datasources.memory import MemoryDataSource, register_table
 from querypy.planner.dataframe import DataFrame
 from querypy.planner.expressions import PhysicalPlan
 
@@ -10,12 +13,16 @@ from querypy.planner.expressions.physical import (
     Divide,
     Add,
     Alias,
-    Column, Max, Avg, Count, Sum
+    Column, Max, Avg, Count, Sum, Gt, Eq, Lt, LiteralString,
+    NullableAwareCountAccumulator, SumAccumulator
 )
-from querypy.planner.planner import create_physical_expr
-from querypy.planner.plans.physical import Projection, OrderBy, HashAggregate
+from querypy.planner.expressions.compiler import CompiledExpression, compile_expression
+from querypy.planner.planner import create_physical_expr, create_physical_plan
+from querypy.planner.plans.physical import Projection, OrderBy, HashAggregate, Filter, \
+    Limit, HashJoin, JoinHashTable
 from querypy.planner.expressions import logical
-from querypy.types_ import RecordBatch, Schema, Field, ArrowTypes, ColumnVector
+from querypy.types_ import RecordBatch, Schema, Field, ArrowTypes, ColumnVector, \
+    LiteralValueVector, dictionary_encode
 from tests import create_rb, create_logical_test_plan, create_physical_test_plan
 
 
@@ -109,7 +116,8 @@ def test_aggregations_correctness():
         schema=dummy_plan.schema()
     ).execute()
 
-    assert (aggr_result[0].fields
+    aggr_result, = aggr_result
+    assert (aggr_result.fields
             == [['c', 'b', 'a'], [2, 2, 31]])
     # Avg
     aggr_result = HashAggregate(
@@ -119,7 +127,8 @@ def test_aggregations_correctness():
         schema=dummy_plan.schema()
     ).execute()
 
-    assert (aggr_result[0].fields
+    aggr_result, = aggr_result
+    assert (aggr_result.fields
             == [['c', 'b', 'a'], [1.5, 2.0, 12.666666666666666]])
 
     # Count
@@ -130,7 +139,8 @@ def test_aggregations_correctness():
         schema=dummy_plan.schema()
     ).execute()
 
-    assert (aggr_result[0].fields
+    aggr_result, = aggr_result
+    assert (aggr_result.fields
             == [['c', 'b', 'a'], [2, 1, 3]])
 
     # Sum
@@ -141,5 +151,354 @@ def test_aggregations_correctness():
         schema=dummy_plan.schema()
     ).execute()
 
-    assert (aggr_result[0].fields
-            == [['c', 'b', 'a'], [3, 2, 38]])
\ No newline at end of file
+    aggr_result, = aggr_result
+    assert (aggr_result.fields
+            == [['c', 'b', 'a'], [3, 2, 38]])
+
+
+def test_nulls():
+    schema = Schema([Field("a", ArrowTypes.Int32Type), Field("b", ArrowTypes.StringType)])
+    rb = RecordBatch.from_pylists(schema, [[1, None, 3, 4], ["x", "y", None, "x"]])
+
+    result = Add(Column(0), LiteralInteger(1)).evaluate(rb)
+    assert result == [2, None, 4, 5]
+    assert result.null_count == 1
+
+    mask = Gt(Column(0), LiteralInteger(1)).evaluate(rb)
+    assert mask == [0, None, 1, 1]
+
+    filtered = Filter(MagicMock(execute=lambda: [rb]), Gt(Column(0), LiteralInteger(1)))
+    rb_filtered = list(filtered.execute())[0]
+    assert rb_filtered.row_count == 2
+    assert list(rb_filtered.selection) == [2, 3]
+    assert rb_filtered.compact().fields == [[3, 4], [None, "x"]]
+
+    accumulator = NullableAwareCountAccumulator()
+    accumulator.accumulate_vector(rb.get_field(1))
+    assert accumulator.final_value() == 3
+
+    accumulator = SumAccumulator()
+    accumulator.accumulate_vector(rb.get_field(0))
+    assert accumulator.final_value() == 8
+
+
+def test_dictionary_vectors():
+    schema = Schema([Field("country", ArrowTypes.StringType), Field("salary", ArrowTypes.Int32Type)])
+    countries = dictionary_encode(ArrowTypes.StringType, ["ES", "FR", "ES", "IT", "FR"], 10)
+    salaries = ColumnVector.from_pylist(ArrowTypes.Int32Type, [10, 20, 30, 40, 50])
+    rb = RecordBatch(schema, [countries, salaries])
+
+    assert Eq(Column(0), LiteralString("ES")).evaluate(rb) == [1, 0, 1, 0, 0]
+    assert Gt(LiteralString("FR"), Column(0)).evaluate(rb) == [1, 0, 1, 0, 0]
+
+    aggr_result = HashAggregate(
+        MagicMock(execute=lambda: [rb]),
+        group_expr=[Column(0)],
+        aggregate_expr=[Sum(Column(1))],
+        schema=schema,
+    ).execute()
+    assert list(aggr_result)[0].fields == [["ES", "FR", "IT"], [40, 70, 40]]
+
+
+def test_selection_vectors():
+    a = [1, 2, 3, 4, 31, 2]
+    b = ["c", "b", "a", "a", "a", "c"]
+    plan = create_physical_test_plan([a, b])
+
+    filtered = Filter(plan, Gt(Column(0), LiteralInteger(1)))
+    rb = list(filtered.execute())[0]
+    # the columns are not copied.
+    assert rb.fields[0] is plan.record_batch.fields[0]
+    assert list(rb.selection) == [1, 2, 3, 4, 5]
+    assert rb.row_count == 5
+
+    # filters compose selections.
+    filtered = Filter(filtered, Gt(LiteralInteger(4), Column(0)))
+    assert list(list(filtered.execute())[0].selection) == [1, 2, 5]
+
+    projection = Projection(filtered, plan.schema(), [Column(1)])
+    assert list(projection.execute())[0].fields == [["b", "a", "c"]]
+
+    orderby = OrderBy(filtered, order_by=[[Column(1), True]])
+    assert list(orderby.execute())[0].fields == [[3, 2, 2], ["a", "b", "c"]]
+
+    aggr_result = HashAggregate(
+        filtered,
+        group_expr=[Column(1)],
+        aggregate_expr=[Count(Column(0))],
+        schema=plan.schema(),
+    ).execute()
+    assert list(aggr_result)[0].fields == [["b", "a", "c"], [1, 1, 1]]
+
+
+def test_filtered_rows_are_not_evaluated():
+    # the division by zero of the filtered out row is never computed.
+    plan = create_physical_test_plan([[1, 2, 3, 4], [2, 0, 3, 4], [1, 1, 2, 2]])
+    filtered = Filter(plan, Gt(Column(1), LiteralInteger(0)))
+    guarded = Filter(filtered, Gt(Divide(Column(0), Column(1)), LiteralInteger(0)))
+    assert list(list(guarded.execute())[0].selection) == [0, 2, 3]
+
+    divide = Divide(Column(0), Column(1))
+    compiled = compile_expression(Add(Divide(Column(0), Column(1)), LiteralInteger(1)))
+    assert isinstance(compiled, CompiledExpression)
+    rb, = Projection(filtered, plan.schema(), [divide, compiled]).execute()
+    assert rb.fields == [[0.5, 1.0, 1.0], [1.5, 2.0, 2.0]]
+
+    aggr_result = HashAggregate(
+        filtered, group_expr=[Column(2)], aggregate_expr=[Sum(divide)],
+        schema=plan.schema(),
+    ).execute()
+    assert list(aggr_result)[0].fields == [[1, 2], [0.5, 2.0]]
+
+
+def test_limit():
+    plan = create_physical_test_plan([list(range(10))])
+    plan.execute = lambda: [plan.record_batch, plan.record_batch]
+
+    rb, = Limit(plan, 3).execute()
+    assert rb.fields == [[0, 1, 2]]
+
+    rbs = list(Limit(plan, 5, offset=8).execute())
+    assert [rb.fields for rb in rbs] == [[[8, 9]], [[0, 1, 2]]]
+
+    # no more batches are pulled once the limit is reached.
+    pulled = []
+
+    def execute():
+        for _ in range(3):
+            pulled.append(plan.record_batch)
+            yield plan.record_batch
+
+    plan.execute = execute
+    assert len(list(Limit(plan, 10).execute())) == 1
+    assert len(pulled) == 1
+    assert list(Limit(plan, 0).execute()) == []
+    assert len(pulled) == 1
+
+
+def test_streaming(monkeypatch):
+    schema = Schema([Field("k", ArrowTypes.Int32Type), Field("v", ArrowTypes.Int32Type)])
+    batches = [
+        RecordBatch.from_pylists(schema, [[i % 3 for i in range(s, s + 4)], list(range(s, s + 4))])
+        for s in range(0, 12, 4)
+    ]
+    pulled = []
+
+    def execute():
+        for batch in batches:
+            pulled.append(batch)
+            yield batch
+
+    plan = MagicMock(execute=execute)
+
+    # non-blocking operators pull the input as their output is pulled.
+    filtered = Filter(plan, Gt(Column(1), LiteralInteger(1))).execute()
+    assert next(filtered).row_count == 2
+    assert len(pulled) == 1
+
+    # blocking operators emit once, after reading the whole input.
+    pulled.clear()
+    aggr_result = list(HashAggregate(
+        plan, group_expr=[Column(0)], aggregate_expr=[Sum(Column(1))], schema=schema
+    ).execute())
+    assert len(pulled) == 3
+    assert [rb.fields for rb in aggr_result] == [[[0, 1, 2], [18, 22, 26]]]
+
+    rbs = list(OrderBy(plan, order_by=[[Column(0), False], [Column(1), True]]).execute())
+    assert len(rbs) == 1
+    assert rbs[0].fields == [
+        [2, 2, 2, 2, 1, 1, 1, 1, 0, 0, 0, 0], [2, 5, 8, 11, 1, 4, 7, 10, 0, 3, 6, 9]
+    ]
+
+    # a global aggregation accumulates whole vectors, rows are never built.
+    monkeypatch.setattr(ColumnVector, "to_pylist", MagicMock(side_effect=AssertionError))
+    aggr_result = list(HashAggregate(
+        plan, group_expr=[], aggregate_expr=[Sum(Column(1)), Count(Column(1))],
+        schema=schema,
+    ).execute())
+    assert [list(f.value) for f in aggr_result[0].fields] == [[66], [12]]
+    monkeypatch.undo()
+
+    # a global aggregation of no rows is a single row.
+    empty = MagicMock(execute=lambda: iter([]))
+    aggr_result = list(HashAggregate(
+        empty, group_expr=[], aggregate_expr=[Count(Column(1))],
+        schema=Schema([Field("count", ArrowTypes.Int64Type)]),
+    ).execute())
+    assert [rb.fields for rb in aggr_result] == [[[0]]]
+
+
+
+def test_small_batches():
+    # 10 rows in batches of 4: blocking operators see every batch.
+    schema = Schema([Field("k", ArrowTypes.Int32Type), Field("v", ArrowTypes.Int32Type)])
+    rows = [[i % 3 for i in range(10)], [(7 * i) % 10 for i in range(10)]]
+    batches = [
+        RecordBatch.from_pylists(schema, [column[s:s + 4] for column in rows])
+        for s in range(0, 10, 4)
+    ]
+    register_table("small_batches", MemoryDataSource(schema, batches))
+
+    df = DataFrame.table("small_batches").aggregate(
+        [logical.Column("k")], [logical.Sum(logical.Column("v"))]
+    )
+    rbs = list(create_physical_plan(df.logical_plan()).execute())
+    assert len(rbs) == 1
+    assert [f.to_pylist() for f in rbs[0].fields] == [[0, 1, 2], [6, 24, 15]]
+
+    df = DataFrame.table("small_batches").order_by([("v", True)])
+    rbs = list(create_physical_plan(df.logical_plan()).execute())
+    assert [rb.get_field(1).to_pylist() for rb in rbs] == [list(range(10))]
+
+    df = DataFrame.table("small_batches").order_by([("v", False)]).limit(3, offset=1)
+    rbs = list(create_physical_plan(df.logical_plan()).execute())
+    assert [v for rb in rbs for v in rb.get_field(1).to_pylist()] == [8, 7, 6]
+
+
+def test_kernels():
+    schema = Schema([Field("a", ArrowTypes.Int32Type), Field("b", ArrowTypes.StringType),
+                     Field("c", ArrowTypes.FloatType)])
+    rb = RecordBatch.from_pylists(
+        schema, [[1, None, 3, 4], ["x", None, "z", "y"], [0.5, 1.5, 2.5, None]]
+    )
+
+    # column against literal, in both directions, and columns of different types.
+    assert Gt(Column(0), LiteralInteger(2)).evaluate(rb) == [0, None, 1, 1]
+    assert Gt(LiteralInteger(2), Column(0)).evaluate(rb) == [1, None, 0, 0]
+    assert Lt(Column(0), Column(2)).evaluate(rb) == [0, None, 0, None]
+    # null placeholders of lists are never compared.
+    assert Eq(Column(1), LiteralString("z")).evaluate(rb) == [0, None, 1, 0]
+
+    result = Divide(Column(0), LiteralInteger(2)).evaluate(rb)
+    assert result.type is ArrowTypes.FloatType
+    assert result == [0.5, None, 1.5, 2.0]
+    assert Multiply(Column(0), Column(2)).evaluate(rb) == [0.5, None, 7.5, None]
+
+    # literals are computed once, and are not expanded.
+    result = Add(LiteralInteger(1), LiteralInteger(2)).evaluate(rb)
+    assert isinstance(result, LiteralValueVector)
+    assert result.size == 4 and result.get_value(3) == 3
+    assert Lt(LiteralInteger(1), LiteralInteger(2)).evaluate(rb) == [1, 1, 1, 1]
+
+    # the result has the type of the widest operand.
+    wide = Schema([Field("a", ArrowTypes.Int64Type), Field("b", ArrowTypes.Int8Type),
+                   Field("c", ArrowTypes.DoubleType)])
+    rb = RecordBatch.from_pylists(wide, [[2**40, 1], [1, 0], [0.5, 1.5]])
+    pairs = [(0, 0), (0, 1), (1, 1), (0, 2)]
+    assert [Add(Column(i), Column(j)).evaluate(rb).type for i, j in pairs] == [
+        ArrowTypes.Int64Type, ArrowTypes.Int64Type, ArrowTypes.Int32Type,
+        ArrowTypes.DoubleType,
+    ]
+    assert Add(Column(0), Column(0)).evaluate(rb).value.typecode == "q"
+
+    # a null literal, e.g. a missing partition value, is null in any operation.
+    nulls = Schema([Field("a", ArrowTypes.Int32Type), Field("y", ArrowTypes.Int32Type)])
+    rb = RecordBatch(nulls, [ColumnVector.from_pylist(ArrowTypes.Int32Type, [1, 2]),
+                             LiteralValueVector(ArrowTypes.Int32Type, None, 2)])
+    assert rb.get_field(1).null_count == 2
+    assert Add(Column(0), Column(1)).evaluate(rb) == [None, None]
+    assert Add(Column(1), LiteralInteger(1)).evaluate(rb) == [None, None]
+    assert Gt(Column(1), Column(0)).evaluate(rb) == [None, None]
+
+
+def test_compiled_expressions():
+    schema = Schema([Field("price", ArrowTypes.FloatType), Field("discount", ArrowTypes.FloatType),
+                     Field("tax", ArrowTypes.FloatType)])
+    rb = RecordBatch.from_pylists(schema, [[10.0, 20.0, 30.0], [0.1, 0.0, 0.5], [0.2, 0.1, 0.0]])
+
+    # price * (1 - discount) * (1 + tax)
+    expr = Multiply(
+        Multiply(Column(0), Subtract(LiteralInteger(1), Column(1))),
+        Add(LiteralInteger(1), Column(2)),
+    )
+    compiled = compile_expression(expr)
+    assert isinstance(compiled, CompiledExpression)
+    assert repr(compiled) == repr(expr)
+    assert compiled.evaluate(rb) == expr.evaluate(rb).to_pylist()
+    assert compiled.evaluate(rb).type is ArrowTypes.FloatType
+
+    # trees that only differ in their literals share the function.
+    other = compile_expression(Multiply(
+        Multiply(Column(0), Subtract(LiteralInteger(2), Column(1))),
+        Add(LiteralInteger(3), Column(2)),
+    ))
+    assert other.function is compiled.function
+    assert other.evaluate(rb) == [10.0 * 1.9 * 3.2, 20.0 * 2.0 * 3.1, 30.0 * 1.5 * 3.0]
+
+    mask = compile_expression(Gt(Multiply(Column(0), Column(1)), LiteralInteger(5)))
+    assert mask.evaluate(rb) == [0, 0, 1]
+
+    # a single operator is already a kernel.
+    assert not isinstance(compile_expression(Gt(Column(0), LiteralInteger(5))), CompiledExpression)
+
+    # nulls are evaluated node by node.
+    rb = RecordBatch.from_pylists(schema, [[10.0, None], [0.5, 0.5], [0.0, 0.0]])
+    assert compiled.evaluate(rb) == [5.0, None]
+
+    # so are unsupported types.
+    rb = RecordBatch.from_pylists(
+        Schema([Field("a", ArrowTypes.StringType)] + schema.fields[1:]), [["a"], [0.5], [0.0]]
+    )
+    with pytest.raises(TypeError):
+        compiled.evaluate(rb)
+
+
+def test_hash_join():
+    orders_schema = Schema([Field("id", ArrowTypes.Int32Type),
+                            Field("customer", ArrowTypes.Int32Type)])
+    customers_schema = Schema([Field("customer", ArrowTypes.Int32Type),
+                               Field("name", ArrowTypes.StringType)])
+    orders = MemoryDataSource(orders_schema, [
+        RecordBatch.from_pylists(orders_schema, [[1, 2, 3], [10, 20, 10]]),
+        RecordBatch.from_pylists(orders_schema, [[4, 5, 6], [30, None, 20]]),
+    ])
+    customers = MemoryDataSource(customers_schema, [
+        RecordBatch.from_pylists(customers_schema, [[10, 20], ["a", "b"]]),
+        RecordBatch.from_pylists(customers_schema, [[20, 40], ["c", "d"]]),
+    ])
+    register_table("orders", orders)
+    register_table("customers", customers)
+
+    def rows(plan):
+        return sorted(
+            row for rb in plan.execute()
+            for row in zip(*(f.to_pylist() for f in rb.compact().fields))
+        )
+
+    expected = {
+        "inner": [(1, 10, "a"), (2, 20, "b"), (2, 20, "c"), (3, 10, "a"),
+                  (6, 20, "b"), (6, 20, "c")],
+        "left": [(1, 10, "a"), (2, 20, "b"), (2, 20, "c"), (3, 10, "a"),
+                 (4, 30, None), (5, None, None), (6, 20, "b"), (6, 20, "c")],
+        "semi": [(1, 10), (2, 20), (3, 10), (6, 20)],
+        "anti": [(4, 30), (5, None)],
+    }
+    for how, result in expected.items():
+        df = DataFrame.table("orders").join(DataFrame.table("customers"), "customer", how)
+        plan = create_physical_plan(df.logical_plan())
+        assert isinstance(plan, HashJoin)
+        assert [f.name for f in plan.schema().fields] == (
+            ["id", "customer", "name"] if how in ("inner", "left") else ["id", "customer"]
+        )
+        # both build sides give the same rows.
+        for build_side in ("left", "right"):
+            plan.build_side = build_side
+            assert rows(plan) == result, (how, build_side)
+
+    # the hash table is built on the smaller input.
+    df = DataFrame.table("orders").join(DataFrame.table("customers"), "customer")
+    assert create_physical_plan(df.logical_plan()).build_side == "right"
+    df = DataFrame.table("customers").join(DataFrame.table("orders"), "customer")
+    assert create_physical_plan(df.logical_plan()).build_side == "left"
+
+    # keys of many columns, and a build side without rows.
+    table = JoinHashTable([(1, "a"), None, (1, "b"), (1, "a")])
+    assert not table.unique
+    assert [list(r) for r in table.probe([(1, "a"), None, (2, "a")])] == [[0, 0], [0, 3]]
+    empty = MemoryDataSource(customers_schema, [])
+    register_table("empty", empty)
+    df = DataFrame.table("orders").join(DataFrame.table("empty"), "customer", "left")
+    assert [row[2] for row in rows(create_physical_plan(df.logical_plan()))] == [None] * 6
+
+    with pytest.raises(ValueError):
+        DataFrame.table("orders").join(DataFrame.table("customers"), "customer", "full")
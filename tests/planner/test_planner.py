@@ -2,9 +2,10 @@ import pytest
 
 from querypy.exceptions import UnknownColumnError
 from querypy.planner.expressions.logical import Alias, Column, Subtract, \
-    LiteralInteger
+    LiteralInteger, LiteralString, And, Eq, Gt, Lt
 from querypy.planner.expressions.physical import Subtract as PhysicalSubtract
-from querypy.planner.planner import create_physical_expr, create_physical_plan
+from querypy.planner.planner import create_physical_expr, create_physical_plan, \
+    extract_scan_filters
 from querypy.planner.plans import logical as logical_plans
 from querypy.planner.plans import physical as physical_plans
 from querypy.types_ import ArrowTypes, Field, Schema
@@ -72,4 +73,29 @@ def test_orderby():
         ]
     )
     with pytest.raises(UnknownColumnError):
-        create_physical_plan(orderby)
\ No newline at end of file
+        create_physical_plan(orderby)
+
+
+def test_filter_pushdown():
+    plan = create_logical_test_plan(
+        schema=Schema(
+            [
+                Field("a", ArrowTypes.Int32Type),
+                Field("b", ArrowTypes.StringType),
+            ]
+        )
+    )
+    expr = Gt(Column("a"), LiteralInteger(1))
+    filter_plan = create_physical_plan(logical_plans.Filter(plan, expr))
+
+    # the filter still applies, fused with the scan, and its conditions reach it.
+    assert isinstance(filter_plan, physical_plans.FusedScan)
+    assert isinstance(filter_plan.scan, physical_plans.Scan)
+    assert filter_plan.scan.filters == [("a", ">", 1)]
+
+    expr = And(
+        Gt(Column("a"), LiteralInteger(1)),
+        And(Eq(LiteralString("x"), Column("b")), Lt(LiteralInteger(5), Column("a"))),
+    )
+    assert extract_scan_filters(expr) == [("a", ">", 1), ("b", "=", "x"), ("a", ">", 5)]
+    assert extract_scan_filters(Gt(Column("a"), Column("b"))) == []
@@ -45,7 +45,7 @@ def test_tphc_1():
 
     print(get_text_tree(create_physical_plan(df.logical_plan())))
 
-    data: list[RecordBatch] = create_physical_plan(df.logical_plan()).execute()
+    data: list[RecordBatch] = list(create_physical_plan(df.logical_plan()).execute())
 
     # We know we'll produce only one recordbatch
 
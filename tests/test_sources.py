@@ -1,6 +1,42 @@
+import bz2
+import json
+import gzip
+import lzma
+import os
+import sqlite3
 import tempfile
+import time
 
+import pytest
+
+from querypy.datasources.catalog import Catalog
+from querypy.datasources.columnar import ColumnarFileDataSource
+from querypy.datasources.columnar import write_columnar
+from querypy.datasources import csv as csv_source
 from querypy.datasources.csv import CSVDataSource
+from querypy.datasources.csv import infer_type
+from querypy.datasources.io import BackgroundIterator
+from querypy.datasources.io import detect_compression
+from querypy.datasources.jsonl import JsonLinesDataSource
+from querypy.datasources.memory import CachedDataSource
+from querypy.datasources.memory import MemoryDataSource
+from querypy.datasources.memory import ScanCache
+from querypy.datasources.memory import register_table
+from querypy.datasources.partitioned import PartitionedDataSource
+from querypy.datasources.prefetch import PrefetchingDataSource
+from querypy.datasources.sqlite import SQLiteDataSource
+from querypy.datasources.statistics import DistinctCounter
+from querypy.datasources.statistics import estimate_distinct_count
+from querypy.exceptions import ParseError, UnknownTableError
+from querypy.planner.dataframe import DataFrame
+from querypy.planner.expressions.logical import Column, Count, Eq, LiteralString, Sum
+from querypy.planner.expressions.logical import LiteralInteger as LogicalLiteralInteger
+from querypy.planner.expressions.logical import Multiply
+from querypy.planner.planner import create_physical_plan
+from querypy.planner.expressions.physical import Column as PhysicalColumn
+from querypy.planner.expressions.physical import Gt, LiteralInteger
+from querypy.planner.plans.physical import FusedScan, Scan
+from querypy.types_ import ArrowTypes, DictionaryVector, Field, RecordBatch, Schema
 
 import csv
 
@@ -26,13 +62,13 @@ def test_csv():
         assert len(header) == len(schema.fields)
         assert header == list(map(lambda f: f.name, schema.fields))
 
-        rbs = source.scan([])
+        rbs = list(source.scan([]))
         assert sum(map(lambda rb: rb.row_count, rbs)) == 4
         assert sum(map(lambda rb: rb.column_count, rbs)) == 4
-        assert rbs[0].get_field(0).value == ['a', 'b', 'c', 'd']
-        assert rbs[0].get_field(1).value == [1, 2, 3, 4]
-        assert rbs[0].get_field(2).value == ['True', 'False', None, 'True']
-        assert rbs[0].get_field(3).value == [1.0, 2.3, 33.5, 46.4]
+        assert rbs[0].get_field(0).to_pylist() == ['a', 'b', 'c', 'd']
+        assert rbs[0].get_field(1).to_pylist() == [1, 2, 3, 4]
+        assert rbs[0].get_field(2).to_pylist() == ['True', 'False', None, 'True']
+        assert rbs[0].get_field(3).to_pylist() == [1.0, 2.3, 33.5, 46.4]
 
 
 def test_csv_col_index():
@@ -58,9 +94,715 @@ def test_csv_col_index():
         assert len(header) == len(schema.fields)
         assert header == list(map(lambda f: f.name, schema.fields))
 
-        rbs = source.scan([])
+        rbs = list(source.scan([]))
         assert sum(map(lambda rb: rb.row_count, rbs)) == 4
         assert sum(map(lambda rb: rb.column_count, rbs)) == 4
-        assert rbs[0].get_field(0).value == ['a', 'b', 'c', 'd']
-        assert rbs[0].get_field(1).value == [1, 2, 3, 4]
-        assert rbs[0].get_field(2).value == ['True', 'False', None, 'True']
+        assert rbs[0].get_field(0).to_pylist() == ['a', 'b', 'c', 'd']
+        assert rbs[0].get_field(1).to_pylist() == [1, 2, 3, 4]
+        assert rbs[0].get_field(2).to_pylist() == ['True', 'False', None, 'True']
+
+
+def test_csv_batches():
+    header = ["id", "name"]
+    rows = [[i, f"name{i}"] for i in range(10)]
+
+    with tempfile.NamedTemporaryFile(mode="w+", newline="") as temp:
+        writer = csv.writer(temp)
+        writer.writerow(header)
+        writer.writerows(rows)
+        temp.seek(0)
+
+        source = CSVDataSource(temp.name, batch_size=4)
+        batches = source.scan([])
+        first = next(batches)
+        assert first.row_count == 4
+
+        rbs = [first, *batches]
+        assert [rb.row_count for rb in rbs] == [4, 4, 2]
+        assert sum((rb.get_field(0).to_pylist() for rb in rbs), []) == list(range(10))
+
+
+def test_csv_parallel():
+    header = ["id", "name", "score"]
+    rows = [[i, f"name{i % 3}", i / 2] for i in range(1, 1001)]
+
+    with tempfile.NamedTemporaryFile(mode="w+", newline="") as temp:
+        writer = csv.writer(temp)
+        writer.writerow(header)
+        writer.writerows(rows)
+        temp.seek(0)
+
+        sequential = list(CSVDataSource(temp.name, batch_size=100).scan([]))
+        source = CSVDataSource(temp.name, batch_size=100, workers=2, range_size=1024)
+        parallel = list(source.scan([]))
+
+        assert len(parallel) > 2
+        assert parallel[0].schema.fields[0].type is sequential[0].schema.fields[0].type
+        for i in range(3):
+            values = sum((rb.get_field(i).to_pylist() for rb in parallel), [])
+            assert values == sum((rb.get_field(i).to_pylist() for rb in sequential), [])
+
+        source.ordered = False
+        ids = sum((rb.get_field(0).to_pylist() for rb in source.scan([])), [])
+        assert sorted(ids) == list(range(1, 1001))
+
+
+def test_csv_schema_inference():
+    header = ["a", "b", "c", "d"]
+    rows = [
+        [1, 1, "x", ""],
+        [2, 2.5, "y", ""],
+        [-3, 2**40, 1, ""],
+    ]
+
+    with tempfile.NamedTemporaryFile(mode="w+", newline="") as temp:
+        writer = csv.writer(temp)
+        writer.writerow(header)
+        writer.writerows(rows)
+        temp.seek(0)
+
+        schema = CSVDataSource(temp.name).get_schema()
+        # int -> int64 -> float -> string.
+        assert [f.type for f in schema.fields] == [
+            ArrowTypes.Int32Type,
+            ArrowTypes.FloatType,
+            ArrowTypes.StringType,
+            ArrowTypes.StringType,
+        ]
+
+        # The sample only sees the first row.
+        schema = CSVDataSource(temp.name, sample_size=1).get_schema()
+        assert schema.fields[1].type is ArrowTypes.Int32Type
+        with pytest.raises(ParseError):
+            list(CSVDataSource(temp.name, sample_size=1).scan([]))
+
+        explicit = Schema([Field(name, ArrowTypes.StringType) for name in header])
+        source = CSVDataSource(temp.name, schema=explicit)
+        assert source.get_schema() is explicit
+        rb, = source.scan([])
+        assert rb.get_field(0).to_pylist() == ["1", "2", "-3"]
+        assert rb.get_field(3).to_pylist() == [None, None, None]
+
+    # numbers with underscores or surrounding spaces are strings, "nan" is a float.
+    assert [infer_type(v) for v in ["1_000", " 1", "1 ", "1.5_0", "nan"]] == [
+        ArrowTypes.StringType] * 4 + [ArrowTypes.FloatType]
+    with tempfile.NamedTemporaryFile(mode="w+", newline="") as temp:
+        temp.write("a,b\n1,2\n1_000, 3\n")
+        temp.seek(0)
+        schema = CSVDataSource(temp.name).get_schema()
+        assert [f.type for f in schema.fields] == [ArrowTypes.StringType] * 2
+        typed = Schema([Field("a", ArrowTypes.Int32Type), Field("b", ArrowTypes.FloatType)])
+        for column in ["a", "b"]:
+            with pytest.raises(ParseError):
+                list(CSVDataSource(temp.name, schema=typed).scan([column]))
+
+    # arithmetic on a column widened to int64.
+    with tempfile.NamedTemporaryFile(mode="w+", newline="") as temp:
+        temp.write("a,b\n1,5000000000\n2,3\n")
+        temp.seek(0)
+        df = DataFrame.scan_csv(temp.name).select(
+            [Column("b") + LogicalLiteralInteger(1), Column("a") + Column("b")]
+        )
+        rb, = create_physical_plan(df.logical_plan()).execute()
+        assert rb.fields == [[5000000001, 4], [5000000001, 5]]
+        assert [f.type for f in rb.fields] == [ArrowTypes.Int64Type] * 2
+
+
+def test_csv_projection():
+    header = ["a", "b", "c", "d"]
+    rows = [[1, "x", 1.5, "p"], [2, "y", 2.5, "q"], [3, "z"]]
+
+    with tempfile.NamedTemporaryFile(mode="w+", newline="") as temp:
+        writer = csv.writer(temp)
+        writer.writerow(header)
+        writer.writerows(rows)
+        temp.seek(0)
+
+        source = CSVDataSource(temp.name)
+        rb, = source.scan(["c", "b"])
+        # columns keep the order of the file.
+        assert rb.column_names() == ["b", "c"]
+        assert rb.fields == [["x", "y", "z"], [1.5, 2.5, None]]
+
+        rb, = source.scan(["d"])
+        assert rb.fields == [["p", "q", None]]
+
+
+
+def test_columnar_file():
+    header = ["id", "name", "price", "country"]
+    rows = [
+        [1, "a", 1.5, "ES"],
+        [2, "ñ", "", "US"],
+        [3, "", 3.5, "ES"],
+        [4, "d", 4.5, "ES"],
+        [2**40, "e", 5.5, "FR"],
+    ]
+
+    with (tempfile.NamedTemporaryFile(mode="w+", newline="") as temp,
+          tempfile.NamedTemporaryFile() as columnar):
+        writer = csv.writer(temp)
+        writer.writerow(header)
+        writer.writerows(rows)
+        temp.seek(0)
+
+        source = CSVDataSource(temp.name, batch_size=4)
+        write_columnar(columnar.name, source, row_group_size=2)
+
+        columnar_source = ColumnarFileDataSource(columnar.name)
+        assert ([(f.name, f.type) for f in columnar_source.get_schema().fields]
+                == [(f.name, f.type) for f in source.get_schema().fields])
+
+        # batches of 4 rows are written in row groups of 2 rows.
+        batches = list(columnar_source.scan([]))
+        assert [rb.row_count for rb in batches] == [2, 2, 1]
+        rows = [zip(*(f.to_pylist() for f in rb.fields)) for rb in batches]
+        assert [row for batch_rows in rows for row in batch_rows] == [
+            (1, "a", 1.5, "ES"),
+            (2, "ñ", None, "US"),
+            (3, None, 3.5, "ES"),
+            (4, "d", 4.5, "ES"),
+            (2**40, "e", 5.5, "FR"),
+        ]
+
+        # typed buffers are views of the file.
+        rb = batches[0]
+        assert isinstance(rb.get_field(0).value, memoryview)
+        assert isinstance(rb.get_field(3), DictionaryVector)
+
+        rb, _, _ = ColumnarFileDataSource(columnar.name).scan(["price", "id"])
+        assert rb.column_names() == ["id", "price"]
+        assert rb.fields == [[1, 2], [1.5, None]]
+
+        # batches bigger than row groups are sliced.
+        source = ColumnarFileDataSource(columnar.name, batch_size=1)
+        assert len(list(source.scan(["id"]))) == 5
+
+
+def test_csv_zone_maps(tmp_path):
+    path = str(tmp_path / "sorted.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name"])
+        writer.writerows([i, f"name{i}"] for i in range(10))
+
+    source = CSVDataSource(path, batch_size=3, catalog=Catalog())
+    assert source.zone_maps() is None
+
+    # the first scan reads every batch and builds the zone maps.
+    batches = list(source.scan(["id"], [("id", ">", 6)]))
+    assert [rb.fields for rb in batches] == [[[0, 1, 2]], [[3, 4, 5]], [[6, 7, 8]], [[9]]]
+    zones = source.zone_maps()
+    assert [zone["statistics"]["id"] for zone in zones] == [
+        [0, 2, 0], [3, 5, 0], [6, 8, 0], [9, 9, 0]
+    ]
+
+    # later scans skip the batches that can't match.
+    batches = list(source.scan(["id"], [("id", ">", 6)]))
+    assert [rb.fields for rb in batches] == [[[6, 7, 8]], [[9]]]
+    batches = list(source.scan(["name", "id"], [("id", ">=", 3), ("id", "<", 5)]))
+    assert [rb.fields for rb in batches] == [[[3, 4, 5], ["name3", "name4", "name5"]]]
+
+    # zone maps are kept in the catalog.
+    source = CSVDataSource(path, batch_size=3, catalog=source.catalog)
+    assert source.zone_maps() == zones
+
+    # and discarded if the file changes.
+    with open(path, "a", newline="") as f:
+        csv.writer(f).writerow([10, "name10"])
+    assert source.zone_maps() is None
+    assert len(list(source.scan(["id"], [("id", "=", 10)]))) == 4
+
+
+def test_csv_scan_filtered(tmp_path):
+    path = str(tmp_path / "prices.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "price"])
+        # the prices of the rows that are filtered out can't be parsed.
+        writer.writerows([i, f"name{i}", i * 10 if i > 2 else "x"] for i in range(6))
+    schema = Schema([
+        Field("id", ArrowTypes.Int32Type),
+        Field("name", ArrowTypes.StringType),
+        Field("price", ArrowTypes.Int32Type),
+    ])
+    source = CSVDataSource(path, batch_size=4, schema=schema, catalog=Catalog())
+    with pytest.raises(ParseError):
+        list(source.scan([]))
+
+    plan = FusedScan(
+        Scan(source, []),
+        Gt(PhysicalColumn(0), LiteralInteger(2)),
+        [PhysicalColumn(2), PhysicalColumn(1)],
+        schema.select(["price", "name"]),
+    )
+    assert [rb.fields for rb in plan.execute()] == [
+        [[30], ["name3"]], [[40, 50], ["name4", "name5"]]
+    ]
+
+    # other sources filter the scanned batches.
+    memory = MemoryDataSource(schema, [RecordBatch.from_pylists(schema, [[1, 5], ["a", "b"], [1, 2]])])
+    batches = list(memory.scan_filtered(
+        ["id", "price"], ["id"], lambda rb: [i for i in range(2) if rb.fields[0].get_value(i) > 2]
+    ))
+    assert [rb.compact().fields for rb in batches] == [[[5], [2]]]
+
+
+def test_columnar_zone_maps(tmp_path):
+    path = str(tmp_path / "sorted.qpy")
+    schema = Schema([Field("id", ArrowTypes.Int64Type)])
+    write_columnar(
+        path,
+        [RecordBatch.from_pylists(schema, [list(range(10))])],
+        row_group_size=4,
+    )
+
+    source = ColumnarFileDataSource(path)
+    assert [rb.fields for rb in source.scan([], [("id", ">", 6)])] == [[[4, 5, 6, 7]],
+                                                                        [[8, 9]]]
+    assert list(source.scan([], [("id", "<", 0)])) == []
+
+    # a failed write leaves no file behind.
+    def failing_batches():
+        yield RecordBatch.from_pylists(schema, [[1, 2]])
+        raise OSError("read error")
+
+    with pytest.raises(OSError):
+        write_columnar(str(tmp_path / "failed.qpy"), failing_batches())
+    assert not os.path.exists(tmp_path / "failed.qpy")
+
+
+def test_catalog(tmp_path):
+    path = str(tmp_path / "data.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["a", "b"])
+        writer.writerows([[1, "x"], [2, "y"]])
+
+    catalog = Catalog(sidecar=True)
+    schema = CSVDataSource(path, catalog=catalog).get_schema()
+    # new sources over the same file don't read it again to get the schema.
+    source = CSVDataSource(path, catalog=catalog)
+    assert source.get_schema() is schema
+    assert source.catalog_entry().row_count is None
+    list(source.scan([]))
+    assert source.catalog_entry().row_count == 2
+
+    # other catalogs, e.g. of other processes, load the sidecar file.
+    entry = Catalog(sidecar=True).entry(path, "csv:1000")
+    assert entry.row_count == 2
+    assert [f.type for f in entry.schema.fields] == [f.type for f in schema.fields]
+
+    # entries of changed files are discarded.
+    with open(path, "a", newline="") as f:
+        csv.writer(f).writerow([3.5, "z"])
+    assert source.get_schema() is not schema
+    assert source.get_schema().fields[0].type is ArrowTypes.FloatType
+    assert source.catalog_entry().row_count is None
+
+    source.reset_schema_cache()
+    assert not os.path.exists(path + ".querypy")
+
+
+def test_partitioned(tmp_path):
+    for day in ["2024-01-01", "2024-01-02", "2024-01-03"]:
+        for part in range(2):
+            directory = tmp_path / "sales" / f"dt={day}" / f"store={part}"
+            directory.mkdir(parents=True)
+            with open(directory / "part-0.csv", "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["item", "amount"])
+                writer.writerows([["a", 1], ["b", 2]])
+    (tmp_path / "sales" / "_SUCCESS").touch()
+
+    source = PartitionedDataSource(str(tmp_path / "sales"))
+    assert len(source.files()) == 6
+    schema = source.get_schema()
+    assert [(f.name, f.type) for f in schema.fields] == [
+        ("item", ArrowTypes.StringType),
+        ("amount", ArrowTypes.Int32Type),
+        ("dt", ArrowTypes.StringType),
+        ("store", ArrowTypes.Int32Type),
+    ]
+
+    batches = list(source.scan(["store", "amount"], [("dt", "=", "2024-01-02")]))
+    # only the files of the partition are read.
+    assert len(batches) == 2
+    assert [rb.fields for rb in batches] == [[[1, 2], [0, 0]], [[1, 2], [1, 1]]]
+
+    batches = list(source.scan(["dt"], [("dt", ">", "2024-01-01"), ("store", "<", 1)]))
+    assert [rb.fields for rb in batches] == [[["2024-01-02"] * 2], [["2024-01-03"] * 2]]
+
+    # a glob pattern, read in parallel.
+    source = PartitionedDataSource(str(tmp_path / "sales" / "dt=*" / "store=1" / "*.csv"),
+                                   workers=2)
+    assert len(list(source.scan([]))) == 3
+
+    df = DataFrame.scan_csv(str(tmp_path / "sales")).filter(
+        Eq(Column("dt"), LiteralString("2024-01-03"))
+    )
+    batches = list(create_physical_plan(df.logical_plan()).execute())
+    assert sum(rb.row_count for rb in batches) == 4
+
+    # a file outside of the partition directories has null partition values, and
+    # every file is read with the schema of the first one.
+    os.makedirs(tmp_path / "years" / "year=2024")
+    with open(tmp_path / "years" / "year=2024" / "p.csv", "w") as f:
+        f.write("v\n1\n2\n")
+    with open(tmp_path / "years" / "p.csv", "w") as f:
+        f.write("v\n1.5\n")
+    source = PartitionedDataSource(str(tmp_path / "years"))
+    assert source.file_source(str(tmp_path / "years" / "p.csv")).schema == \
+        source.file_schema()
+    batches = list(source.scan(["year"]))
+    assert [rb.get_field(0).null_count for rb in batches] == [1, 0]
+    source = PartitionedDataSource(str(tmp_path / "years"), options={"schema": None})
+    batches = list(source.scan(["v"]))
+    assert [rb.fields for rb in batches] == [[[1.5]], [[1.0, 2.0]]]
+    assert [rb.get_field(0).type for rb in batches] == [ArrowTypes.FloatType] * 2
+    df = DataFrame.scan_csv(str(tmp_path / "years")).aggregate(
+        [], [Sum(Column("year")), Count(Column("year"))]
+    )
+    batches = list(create_physical_plan(df.logical_plan()).execute())
+    assert batches[0].fields == [[4048], [2]]
+
+
+def test_memory_source():
+    schema = Schema([Field("a", ArrowTypes.Int32Type), Field("b", ArrowTypes.StringType)])
+    source = MemoryDataSource(
+        schema,
+        [
+            RecordBatch.from_pylists(schema, [[1, 2], ["x", "y"]]),
+            RecordBatch.from_pylists(schema, [[3, 4], ["z", "w"]]),
+        ],
+    )
+    assert [rb.fields for rb in source.scan(["b"])] == [[["x", "y"]], [["z", "w"]]]
+    assert [rb.fields for rb in source.scan([], [("a", ">", 2)])] == [[[3, 4], ["z", "w"]]]
+
+    register_table("memory", source)
+    assert DataFrame.table("memory").schema() is schema
+    with pytest.raises(UnknownTableError):
+        DataFrame.table("unknown")
+
+
+def test_scan_cache(tmp_path):
+    path = str(tmp_path / "data.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["a", "b", "c"])
+        writer.writerows([i, f"b{i}", i / 2] for i in range(5))
+
+    cache = ScanCache()
+    source = CachedDataSource(CSVDataSource(path, batch_size=2), cache=cache)
+    batches = list(source.scan(["a", "c"]))
+    assert [rb.fields for rb in batches] == [
+        [[0, 1], [0.0, 0.5]], [[2, 3], [1.0, 1.5]], [[4], [2.0]]
+    ]
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    # a narrower projection is served from the cache.
+    batches = list(source.scan(["c"]))
+    assert [rb.fields for rb in batches] == [[[0.0, 0.5]], [[1.0, 1.5]], [[2.0]]]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # only the missing columns are read.
+    batches = list(source.scan(["a", "b"]))
+    assert [rb.fields for rb in batches][0] == [[0, 1], ["b0", "b1"]]
+    assert (cache.hits, cache.misses) == (2, 3)
+    assert cache.nbytes > 0
+
+    # entries of changed files are discarded.
+    with open(path, "a", newline="") as f:
+        csv.writer(f).writerow([5, "b5", 2.5])
+    assert sum(rb.row_count for rb in source.scan(["a"])) == 6
+    assert (cache.hits, cache.misses) == (2, 4)
+
+    # least recently used columns are evicted when over budget.
+    cache.max_bytes = cache.nbytes
+    list(source.scan(["a", "b", "c"]))
+    assert cache.nbytes <= cache.max_bytes
+
+
+@pytest.mark.parametrize("codec", [gzip, bz2, lzma])
+def test_csv_compressed(tmp_path, codec):
+    text = "a,b\n" + "".join(f"{i},name{i}\n" for i in range(10))
+    path = str(tmp_path / "data.csv.compressed")
+    with codec.open(path, "wt", newline="") as f:
+        f.write(text)
+
+    source = CSVDataSource(path, batch_size=4)
+    schema = source.get_schema()
+    assert [f.type for f in schema.fields] == [ArrowTypes.Int32Type, ArrowTypes.StringType]
+    batches = list(source.scan(["a"]))
+    assert [rb.fields for rb in batches] == [[[0, 1, 2, 3]], [[4, 5, 6, 7]], [[8, 9]]]
+    # filters don't skip batches of compressed files.
+    assert len(list(source.scan(["a"], [("a", ">", 8)]))) == 3
+
+    # with workers, the file is decompressed in a background thread.
+    source = CSVDataSource(path, batch_size=4, workers=2)
+    assert [rb.fields for rb in source.scan(["a"])] == [[[0, 1, 2, 3]], [[4, 5, 6, 7]],
+                                                         [[8, 9]]]
+    source = CSVDataSource(path, batch_size=4, read_ahead=True)
+    assert source.read_ahead
+    assert len(list(source.scan(["a"]))) == 3
+
+
+def test_csv_magic_header(tmp_path):
+    # a text file that starts like a bz2 file, without its block size.
+    path = str(tmp_path / "data.csv")
+    with open(path, "w") as f:
+        f.write("BZhx,b\n1,2\n")
+    assert detect_compression(path) is None
+    assert [rb.fields for rb in CSVDataSource(path).scan(["BZhx"])] == [[[1]]]
+
+
+def test_csv_gzip_members(tmp_path):
+    path = str(tmp_path / "data.csv.gz")
+    with open(path, "wb") as f:
+        f.write(gzip.compress(b"a\n1\n2\n"))
+        f.write(gzip.compress(b"3\n"))
+    source = CSVDataSource(path, workers=2)
+    assert [rb.fields for rb in source.scan([])] == [[[1, 2, 3]]]
+
+
+def test_prefetching_source():
+    class SlowSource(MemoryDataSource):
+        def scan(self, projection, filters=None):
+            for batch in super().scan(projection, filters):
+                time.sleep(0.01)
+                yield batch
+
+    schema = Schema([Field("a", ArrowTypes.Int32Type)])
+    batches = [RecordBatch.from_pylists(schema, [[i]]) for i in range(5)]
+    source = PrefetchingDataSource(SlowSource(schema, batches), depth=2)
+    assert [rb.fields for rb in source.scan([])] == [[[i]] for i in range(5)]
+    assert source.batches == 5
+    assert source.waits > 0
+    assert source.wait_time > 0
+
+    # the background thread stops when the iterator is closed.
+    batches = BackgroundIterator(SlowSource(schema, batches).scan([]), depth=1)
+    next(batches)
+    batches.close()
+    assert not batches._thread.is_alive()
+
+    class FailingSource(MemoryDataSource):
+        def scan(self, projection, filters=None):
+            yield from super().scan(projection, filters)
+            raise ParseError("a", ArrowTypes.Int32Type)
+
+    with pytest.raises(ParseError):
+        list(PrefetchingDataSource(FailingSource(schema, batches)).scan([]))
+
+
+def test_sqlite_source(tmp_path):
+    path = str(tmp_path / "data.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE t (id INTEGER, name VARCHAR(10), price REAL)")
+    connection.executemany(
+        "INSERT INTO t VALUES (?, ?, ?)",
+        [(i, f"n{i}", i / 2 if i != 3 else None) for i in range(5)],
+    )
+    connection.commit()
+    connection.close()
+
+    source = SQLiteDataSource(path, "t", batch_size=2)
+    assert [(f.name, f.type) for f in source.get_schema().fields] == [
+        ("id", ArrowTypes.Int64Type),
+        ("name", ArrowTypes.StringType),
+        ("price", ArrowTypes.DoubleType),
+    ]
+    assert [rb.fields for rb in source.scan(["id", "price"])] == [
+        [[0, 1], [0.0, 0.5]], [[2, 3], [1.0, None]], [[4], [2.0]]
+    ]
+    # the filters are evaluated by SQLite.
+    assert [rb.fields for rb in source.scan(["name"], [("id", ">=", 3)])] == [
+        [["n3", "n4"]]
+    ]
+    statistics = source.statistics()
+    assert statistics.exact
+    assert statistics.row_count == 5
+    assert statistics.columns["price"].null_fraction == 0.2
+    assert source.query(source.get_schema().select(["id"]), [("id", "=", 1)]) == (
+        'SELECT "id" FROM "t" WHERE "id" = ?', [1]
+    )
+
+    df = DataFrame.scan_sqlite(path, "t").filter("id > 2").select(["name"])
+    plan = create_physical_plan(df.logical_plan())
+    assert [v for rb in plan.execute() for v in rb.fields[0].to_pylist()] == ["n3", "n4"]
+
+    # arithmetic on INTEGER (int64) and REAL (double) columns.
+    df = DataFrame.scan_sqlite(path, "t").select([
+        Column("id") + LogicalLiteralInteger(1),
+        Multiply(Column("price"), LogicalLiteralInteger(2)),
+    ])
+    batches = list(create_physical_plan(df.logical_plan()).execute())
+    assert [f.type for f in batches[0].fields] == [ArrowTypes.Int64Type,
+                                                   ArrowTypes.DoubleType]
+    rows = [row for rb in batches for row in zip(*(f.to_pylist() for f in rb.fields))]
+    assert rows == [(1, 0.0), (2, 1.0), (3, 2.0), (4, None), (5, 4.0)]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_jsonl_source(tmp_path, workers):
+    path = str(tmp_path / "events.jsonl")
+    with open(path, "w") as f:
+        for i in range(5):
+            f.write(
+                json.dumps(
+                    {"id": i, "event": "login" if i % 2 else "logout", "ok": i > 2}
+                    | ({"duration": i / 2, "user": {"name": f"u{i}"}} if i != 3 else {})
+                )
+                + "\n"
+            )
+        f.write("\n")
+
+    source = JsonLinesDataSource(path, batch_size=2, workers=workers, range_size=64)
+    assert [(f.name, f.type) for f in source.get_schema().fields] == [
+        ("id", ArrowTypes.Int32Type),
+        ("event", ArrowTypes.StringType),
+        ("ok", ArrowTypes.BooleanType),
+        ("duration", ArrowTypes.FloatType),
+        ("user", ArrowTypes.StringType),
+    ]
+    rows = [
+        row
+        for rb in source.scan(["id", "duration", "user"])
+        for row in zip(*(f.to_pylist() for f in rb.fields))
+    ]
+    assert rows == [
+        (0, 0.0, '{"name": "u0"}'),
+        (1, 0.5, '{"name": "u1"}'),
+        (2, 1.0, '{"name": "u2"}'),
+        (3, None, None),
+        (4, 2.0, '{"name": "u4"}'),
+    ]
+
+    # large integers are int64, arithmetic works on them.
+    big_path = str(tmp_path / "big.jsonl")
+    with open(big_path, "w") as f:
+        f.write('{"n": 5000000000}\n{"n": 1}\n')
+    df = DataFrame.scan_jsonl(big_path, workers=workers).select(
+        [Column("n") + LogicalLiteralInteger(1)]
+    )
+    rb, = create_physical_plan(df.logical_plan()).execute()
+    assert rb.fields == [[5000000001, 2]]
+    assert rb.fields[0].type is ArrowTypes.Int64Type
+
+    schema = source.get_schema()
+    with open(path, "a") as f:
+        f.write('{"id": "x"}\n')
+    with pytest.raises(ParseError):
+        list(JsonLinesDataSource(path, schema=schema).scan(["id"]))
+
+
+def test_statistics(tmp_path):
+    path = str(tmp_path / "data.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["a", "b", "c"])
+        writer.writerows(
+            [i, f"b{i % 10}", i if i % 4 else ""] for i in range(1000, 2000)
+        )
+
+    source = CSVDataSource(path, sample_size=100, catalog=Catalog())
+    statistics = source.statistics()
+    assert not statistics.exact
+    assert statistics.size_bytes == os.path.getsize(path)
+    assert 900 <= statistics.row_count <= 1100
+    assert statistics.columns["b"].distinct_count == 10
+    assert statistics.columns["c"].null_fraction == 0.25
+    assert (statistics.columns["a"].min, statistics.columns["a"].max) == (1000, 1099)
+
+    # a scan building the zone maps counts the rows and the exact min and max.
+    list(source.scan(["a"], [("a", ">", 0)]))
+    statistics = source.statistics()
+    assert statistics.row_count == 1000
+    assert (statistics.columns["a"].min, statistics.columns["a"].max) == (1000, 1999)
+
+    columnar_path = str(tmp_path / "data.qpy")
+    write_columnar(columnar_path, source, row_group_size=300)
+    statistics = ColumnarFileDataSource(columnar_path).statistics()
+    assert statistics.row_count == 1000
+    assert statistics.columns["a"].distinct_count == 1000
+    assert statistics.columns["b"].distinct_count == 10
+    assert statistics.columns["c"].null_fraction == 0.25
+
+    memory = MemoryDataSource.from_source(CSVDataSource(path, batch_size=300))
+    statistics = memory.statistics()
+    assert statistics.exact
+    assert statistics.row_count == 1000
+    assert statistics.columns["c"].distinct_count == 750
+
+    os.makedirs(tmp_path / "parts" / "k=1")
+    os.makedirs(tmp_path / "parts" / "k=2")
+    for k in (1, 2):
+        with open(tmp_path / "parts" / f"k={k}" / "p.csv", "w") as f:
+            f.write("a\n" + "".join(f"{i}\n" for i in range(k * 10)))
+    statistics = PartitionedDataSource(str(tmp_path / "parts")).statistics()
+    assert statistics.row_count == 30
+    assert statistics.columns["a"].max == 19
+    assert (statistics.columns["k"].min, statistics.columns["k"].distinct_count) == (1, 2)
+
+
+def test_distinct_count_estimates():
+    assert estimate_distinct_count([1, 1, 2], 3) == 2
+    # values seen once in a small sample are likely to be many more.
+    assert estimate_distinct_count(list(range(10)), 1000) == 100
+
+    counter = DistinctCounter(k=256)
+    counter.update(range(100))
+    assert counter.estimate() == 100
+    counter.update(i % 100_000 for i in range(200_000))
+    assert 80_000 <= counter.estimate() <= 120_000
+
+
+def test_sample(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_source, "SAMPLE_BLOCK_SIZE", 1024)
+    path = str(tmp_path / "data.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["a", "b"])
+        writer.writerows([i, i % 10] for i in range(10_000))
+
+    # only some blocks are read, the same seed reads the same blocks.
+    source = CSVDataSource(path)
+    sampled = [v for rb in source.scan_sample(["a"], 0.1, seed=1) for v in rb.fields[0].to_pylist()]
+    assert 500 <= len(sampled) <= 1500
+    assert set(sampled) < set(range(10_000))
+    assert sampled == [
+        v for rb in source.scan_sample(["a"], 0.1, seed=1) for v in rb.fields[0].to_pylist()
+    ]
+
+    df = DataFrame.scan_csv(path).sample(fraction=0.1, seed=1, extrapolate=True)
+    plan = create_physical_plan(
+        df.aggregate([], [Count(Column("a")), Sum(Column("b"))]).logical_plan()
+    )
+    assert plan.input.input.sample == (0.1, 1)
+    (count, total), = zip(*(f.to_pylist() for f in list(plan.execute())[-1].fields))
+    assert count == len(sampled) * 10
+    assert 7_000 <= count <= 13_000
+    assert 30_000 <= total <= 60_000
+
+    # a number of rows, from a sample of the file twice as big, the number of
+    # rows of the file is known from its statistics.
+    df = DataFrame.scan_csv(path).sample(rows=100, seed=2)
+    plan = create_physical_plan(df.logical_plan())
+    assert plan.input.sample is not None
+    rows = [v for rb in plan.execute() for v in rb.fields[0].to_pylist()]
+    assert len(rows) == 100
+    assert 50 <= plan.scale_factor <= 200
+
+    df = DataFrame.scan_csv(path).filter("b = 1").sample(rows=2000, seed=2)
+    plan = create_physical_plan(df.logical_plan())
+    assert isinstance(plan.input, FusedScan)
+    rows = [v for rb in plan.execute() for v in rb.fields[0].to_pylist()]
+    assert len(rows) == 1000
+    assert plan.scale_factor == 1
+
+    columnar_path = str(tmp_path / "data.qpy")
+    write_columnar(columnar_path, source)
+    columnar = ColumnarFileDataSource(columnar_path, batch_size=100)
+    batches = list(columnar.scan_sample(["a"], 0.5, seed=3))
+    assert 20 <= len(batches) <= 80
+    assert all(rb.row_count == 100 for rb in batches)
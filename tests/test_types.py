@@ -0,0 +1,109 @@
+from array import array
+
+from querypy.types_ import ArrowTypes, ColumnVector, Field, RecordBatch, Schema
+from querypy.types_ import DictionaryVector, concat_vectors, dictionary_encode
+from querypy.types_ import bitmap
+
+
+def test_numeric_vectors_are_typed_buffers():
+    schema = Schema(
+        [
+            Field("int", ArrowTypes.Int64Type),
+            Field("float", ArrowTypes.FloatType),
+            Field("str", ArrowTypes.StringType),
+        ]
+    )
+    rb = RecordBatch.from_pylists(schema, [[1, 2, 3], [1.5, 2.5, 3.5], ["a", "b", "c"]])
+
+    ints, floats, strings = rb.fields
+    assert isinstance(ints.value, array) and ints.value.typecode == "q"
+    assert isinstance(floats.value, array) and floats.value.typecode == "d"
+    assert isinstance(strings.value, list)
+
+    assert ints.get_value(1) == 2
+    assert floats == [1.5, 2.5, 3.5]
+    assert strings.to_pylist() == ["a", "b", "c"]
+
+
+def test_typed_buffer_fallback():
+    # Values that do not fit the buffer of the type are kept as a list.
+    vector = ColumnVector.from_pylist(ArrowTypes.Int32Type, [1, 2**40])
+    assert isinstance(vector.value, list)
+    assert vector == [1, 2**40]
+
+
+def test_validity_bitmap():
+    vector = ColumnVector.from_pylist(ArrowTypes.Int64Type, [1, None, 3, None])
+    assert isinstance(vector.value, array)
+    assert vector.null_count == 2
+    assert vector.is_valid(0) and not vector.is_valid(1)
+    assert vector.get_value(1) is None
+    assert vector == [1, None, 3, None]
+
+    no_nulls = ColumnVector.from_pylist(ArrowTypes.Int64Type, [1, 2])
+    assert no_nulls.validity is None
+    assert no_nulls.null_count == 0
+
+
+def test_bitmap():
+    bm = bitmap.from_nulls([1, 9], 10)
+    assert bitmap.count_set(bm, 10) == 8
+    assert bitmap.to_flags(bm, 10) == bytes([1, 0, 1, 1, 1, 1, 1, 1, 1, 0])
+    packed = bitmap.from_flags(bitmap.to_flags(bm, 10))
+    assert bitmap.to_flags(packed, 10) == bitmap.to_flags(bm, 10)
+
+    other = bitmap.from_nulls([0], 10)
+    assert bitmap.count_set(bitmap.bitmap_and(bm, other, 10), 10) == 7
+    assert bitmap.bitmap_and(None, other, 10) is other
+
+
+def test_dictionary_encode():
+    vector = dictionary_encode(ArrowTypes.StringType, ["ES", "FR", None, "ES"], 10)
+    assert isinstance(vector, DictionaryVector)
+    assert vector.dictionary == ["ES", "FR"]
+    assert list(vector.indices) == [0, 1, 0, 0]
+    assert vector == ["ES", "FR", None, "ES"]
+    assert vector.filter([1, 0, 1, 1]) == ["ES", None, "ES"]
+
+    # too many distinct values.
+    vector = dictionary_encode(ArrowTypes.StringType, ["a", "b", "c"], 2)
+    assert isinstance(vector, ColumnVector)
+
+
+def test_slice():
+    schema = Schema([Field("int", ArrowTypes.Int64Type), Field("str", ArrowTypes.StringType)])
+    rb = RecordBatch.from_pylists(schema, [list(range(20)), [str(i) for i in range(20)]])
+    rb.fields[0] = ColumnVector.from_pylist(ArrowTypes.Int64Type, [None, *range(1, 20)])
+
+    sliced = rb.slice(8, 5)
+    assert sliced.row_count == 5
+    assert sliced.fields == [[8, 9, 10, 11, 12], ["8", "9", "10", "11", "12"]]
+    # the typed buffer is shared.
+    assert sliced.fields[0].value.obj is rb.fields[0].value
+
+    assert rb.slice(0, 3).fields[0] == [None, 1, 2]
+    assert rb.slice(18, 10).row_count == 2
+
+    vector = dictionary_encode(ArrowTypes.StringType, ["a", "b", "a", "a"], 2)
+    assert vector.slice(1, 2) == ["b", "a"]
+
+
+def test_concat_vectors():
+    vectors = [
+        ColumnVector.from_pylist(ArrowTypes.Int64Type, [1, None]),
+        ColumnVector.from_pylist(ArrowTypes.Int64Type, [3]).slice(0, 1),
+    ]
+    column = concat_vectors(vectors)
+    assert column.to_pylist() == [1, None, 3]
+    assert isinstance(column.value, array)
+    assert column.nbytes() == 3 * 8 + 1
+
+    # dictionaries are merged.
+    vectors = [
+        dictionary_encode(ArrowTypes.StringType, ["a", "b", "a"], 2),
+        dictionary_encode(ArrowTypes.StringType, ["c", None, "a"], 2),
+    ]
+    column = concat_vectors(vectors)
+    assert isinstance(column, DictionaryVector)
+    assert column.to_pylist() == ["a", "b", "a", "c", None, "a"]
+    assert column.dictionary.to_pylist() == ["a", "b", "c"]